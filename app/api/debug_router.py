@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.utils.read_write_lock import named_locks
+
+router = APIRouter()
+
+
+@router.get("/locks")
+def get_locks():
+    """
+    Every named lock with its current holders and waiters (and for how long) plus
+    cumulative wait and hold statistics, to see who is blocking whom.
+    """
+    return [lock.report() for lock in named_locks()]
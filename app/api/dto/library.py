@@ -1,9 +1,9 @@
 from datetime import datetime
 from uuid import uuid4, UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Any, Dict, List, Optional
 
-from app.core.Chunk import Chunk
+from app.core.Chunk import EMBEDDING_DIM, Chunk
 from app.core.Filter import Condition
 from enum import Enum
 
@@ -15,6 +15,7 @@ class LibraryListItem(BaseModel):
     name: str = Field(..., description="Name of the Library")
     metadata: dict[str, Any] = Field(default_factory=dict, description="Metadata associated with the Library")
     index_name: str = Field(..., description="The index type of this library")
+    dimension: int = Field(EMBEDDING_DIM, description="Length of every embedding in this library")
     # created_at: datetime = Field(..., description="UTC timestamp when the library was created")
 
     class Config:
@@ -24,6 +25,11 @@ class LibraryListItem(BaseModel):
 class IndexName(str, Enum):
         BruteForceIndex = "BruteForceIndex"
         BallTreeIndex = "BallTreeIndex"
+        Auto = "auto"
+
+class VectorDType(str, Enum):
+        float32 = "float32"
+        float16 = "float16"
 
 class LibraryCreate(BaseModel):
     """
@@ -32,8 +38,25 @@ class LibraryCreate(BaseModel):
     name: str = Field(..., description="Name of the Library")
     metadata: Optional[dict[str, Any]] = Field(default_factory=dict, description="Metadata associated with the Library")
     index_name: Optional[IndexName] = Field(
-        None, description="Name of the index to be used for this Library, if applicable"
+        None, description="Name of the index to be used for this Library; defaults to `auto`, which picks one based on library size"
+    )
+    dimension: Optional[int] = Field(
+        None, ge=1, description=f"Length of every embedding in this Library, fixed at creation; defaults to {EMBEDDING_DIM}. Smaller embedding models get proportionally cheaper storage and search"
+    )
+    matryoshka_dim: Optional[int] = Field(
+        None, ge=1,
+        description="If set, search a second matrix of only the first `matryoshka_dim` dimensions (renormalized) and rescore the candidates on the full embedding; for Matryoshka-trained embedding models"
+    )
+    dtype: Optional[VectorDType] = Field(
+        None, description="Precision to store embeddings at; `float16` halves memory and scan bandwidth of brute-force search at about 1e-3 score error. Not supported by `BallTreeIndex`. Defaults to `float32`"
     )
+
+    @model_validator(mode="after")
+    def _check_matryoshka_dim(self) -> "LibraryCreate":
+        dimension = self.dimension or EMBEDDING_DIM
+        if self.matryoshka_dim is not None and self.matryoshka_dim > dimension:
+            raise ValueError(f"matryoshka_dim must not exceed the library dimension ({dimension})")
+        return self
     
     class Config:
         from_attributes = True
@@ -50,6 +73,8 @@ class LibraryResponse(BaseModel):
     index_name: Optional[str] = Field(
         None, description="Name of the index used for this Library, if applicable"
     )
+    dimension: int = Field(EMBEDDING_DIM, description="Length of every embedding in this Library")
+    dtype: str = Field("float32", description="Precision embeddings are stored at")
     
     class Config:
         from_attributes = True
@@ -100,4 +125,48 @@ class QueryDto(BaseModel):
     query: list[float] = Field(..., description="Query vector for searching chunks")
     filters: Optional[Dict[str, Condition]] = Field(
         None, description="Optional filters to apply when querying chunks"
-    )
\ No newline at end of file
+    )
+    max_leaves: Optional[int] = Field(
+        None, ge=1, description="Approximate search: stop after scanning this many leaves (BallTreeIndex only)"
+    )
+    max_distance_evals: Optional[int] = Field(
+        None, ge=1, description="Approximate search: stop after this many distance computations (BallTreeIndex only)"
+    )
+    slack: Optional[float] = Field(
+        None, ge=0, description="Approximate search: relative slack applied when pruning (BallTreeIndex only); 0 is exact"
+    )
+    oversample: Optional[int] = Field(
+        None, ge=1, description="Two-stage search: candidates fetched per result before exact reranking (RerankingIndex only)"
+    )
+
+    def search_params(self) -> dict[str, Any]:
+        """Index tuning knobs that were set on this query."""
+        return self.model_dump(include={"max_leaves", "max_distance_evals", "slack", "oversample"}, exclude_none=True)
+
+class RangeQueryDto(BaseModel):
+    """
+    Data Transfer Object (DTO) for a similarity-threshold query: every chunk at least
+    `min_similarity` close to the query, rather than a fixed top-k.
+    """
+    query: list[float] = Field(..., description="Query vector for searching chunks")
+    min_similarity: float = Field(..., ge=-1, le=1, description="Return every chunk with cosine similarity >= this")
+    limit: Optional[int] = Field(None, ge=1, description="Return at most this many of the best matches")
+    filters: Optional[Dict[str, Condition]] = Field(
+        None, description="Optional filters to apply when querying chunks"
+    )
+
+class FederatedQueryDto(QueryDto):
+    """
+    Data Transfer Object (DTO) for querying several libraries at once.
+    """
+    library_ids: list[UUID] = Field(
+        ..., min_length=1, description="Libraries to search; their results are merged into one top-k"
+    )
+
+class FederatedSearchHit(BaseModel):
+    """
+    One result of a multi-library search, tagged with the library it came from.
+    """
+    library_id: UUID = Field(..., description="Library the chunk belongs to")
+    chunk: Chunk = Field(..., description="The matching chunk")
+    score: float = Field(..., description="Cosine similarity to the query")
\ No newline at end of file
@@ -1,8 +1,11 @@
+import json
 from uuid import UUID, uuid4
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.core.Filter import Filter
 from app.core.Chunk import EMBEDDING_DIM, Chunk
 from app.core.Library import Library
+from app.api.routing import TracedRoute
 from app.services.VectorStore import VectorStore
 from app.services.LibraryService import (
     list_libraries_service,
@@ -15,12 +18,13 @@ from app.services.LibraryService import (
     delete_chunks_by_library_service,
     count_chunks_by_library_service,
     search_chunks_by_library_service,
+    range_search_chunks_by_library_service,
 )
 
 # DTOs for different operations on a Library
-from app.api.dto.Library import DeleteChunksDto, LibraryListItem, LibraryCreate, LibraryResponse, QueryDto, UpsertChunksDto
+from app.api.dto.Library import DeleteChunksDto, LibraryListItem, LibraryCreate, LibraryResponse, QueryDto, RangeQueryDto, UpsertChunksDto
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=list[LibraryListItem])
@@ -96,8 +100,25 @@ async def count_chunks_by_library(lib_id: str):
 
 
 @router.post("/{lib_id}/search")
-async def search_chunks_by_library(lib_id: str, queryDto: QueryDto, k: int = 5):
+async def search_chunks_by_library(lib_id: str, queryDto: QueryDto, k: int = 5, explain: bool = False):
     """
     Search for chunks in a library by its ID using a query string. Optionally specify `k`, the number of results to return await (default is 5).
+    With `explain=true` the response is `{"results": [...], "explain": {...}}`, where `explain` reports the index,
+    the work it did (nodes visited/pruned, distance computations), candidates before and after filtering,
+    and the time spent in each stage.
     """
-    return await search_chunks_by_library_service(lib_id, queryDto, k)
+    return await search_chunks_by_library_service(lib_id, queryDto, k, explain)
+
+
+@router.post("/{lib_id}/range_search")
+async def range_search_chunks_by_library(lib_id: str, rangeQueryDto: RangeQueryDto):
+    """
+    Find every chunk in a library whose cosine similarity to the query is at least `min_similarity`.
+    Results are streamed best first as newline-delimited JSON, one `{"chunk": ..., "score": ...}` per line.
+    """
+    results = await range_search_chunks_by_library_service(lib_id, rangeQueryDto)
+    lines = (
+        json.dumps({"chunk": chunk.model_dump(mode="json"), "score": score}) + "\n"
+        for chunk, score in results
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
@@ -0,0 +1,100 @@
+import functools
+import json
+import logging
+import os
+import random
+import time
+
+from app.utils import metrics, tracing
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts and latency per route template
+    (e.g. `/library/{lib_id}/search`, never the concrete path, so label cardinality stays
+    bounded). The route is read from the scope after the router has matched it.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            metrics.HTTP_REQUEST_SECONDS.labels(method, route).observe(time.perf_counter() - start)
+            metrics.HTTP_REQUESTS.labels(method, route, status).inc()
+
+
+@functools.lru_cache(maxsize=None)
+def _trace_log(path: str) -> logging.Logger:
+    """A logger writing bare JSON lines to `path`."""
+    logger = logging.getLogger(f"app.trace.{path}")
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware that opens a `tracing.Trace` for each request and returns its
+    spans in a `Server-Timing` header (`parse;dur=0.210, lock;dur=0.004, search;dur=1.730,
+    ..., total;dur=2.480`, in milliseconds; spans with the same name are summed).
+
+    With `TRACE_LOG_PATH` set, a `TRACE_SAMPLE_RATE` fraction of requests (default all of
+    them) is also appended to that file as one JSON line each, including spans that end
+    after the headers were sent, such as a streamed body.
+    """
+
+    LOG_PATH = os.getenv("TRACE_LOG_PATH")
+    SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE") or 1.0)
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace, token = tracing.start_trace()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = trace.server_timing(time.perf_counter() - trace.start)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            tracing.end_trace(token)
+            if self.LOG_PATH and random.random() < self.SAMPLE_RATE:
+                _trace_log(self.LOG_PATH).info(json.dumps({
+                    "time": time.time(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": status,
+                    "duration_ms": (time.perf_counter() - trace.start) * 1000,
+                    **trace.to_dict(),
+                }))
@@ -0,0 +1,56 @@
+import asyncio
+import functools
+import time
+from typing import Callable
+
+from fastapi.routing import APIRoute
+
+from app.utils import tracing
+
+
+def _mark_endpoint(endpoint: Callable) -> Callable:
+    """Wrap an async endpoint so the current trace learns when it started and returned."""
+    if not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def marked(*args, **kwargs):
+        trace = tracing.current_trace()
+        start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if trace is not None:
+                trace.endpoint = (start, time.perf_counter())
+
+    return marked
+
+
+class TracedRoute(APIRoute):
+    """
+    Route that splits FastAPI's request handling into trace spans: `parse` (reading the
+    body and pydantic validation, everything before the endpoint runs) and `encode`
+    (serializing the return value into a response, everything after). The endpoint's own
+    work is traced by the spans recorded inside it.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        super().__init__(path, _mark_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            trace = tracing.current_trace()
+            if trace is None:
+                return await handler(request)
+            start = time.perf_counter()
+            response = await handler(request)
+            end = time.perf_counter()
+            if trace.endpoint is not None:
+                endpoint_start, endpoint_end = trace.endpoint
+                trace.add("parse", start, endpoint_start - start)
+                trace.add("encode", endpoint_end, end - endpoint_end)
+            return response
+
+        return traced_handler
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.api.routing import TracedRoute
+from app.services.LibraryService import search_libraries_service
+from app.api.dto.Library import FederatedQueryDto, FederatedSearchHit
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.post("/search", response_model=list[FederatedSearchHit])
+async def search_libraries(queryDto: FederatedQueryDto, k: int = 5):
+    """
+    Search several libraries at once and return one merged top-`k`, each hit tagged with its library ID.
+    """
+    return await search_libraries_service(queryDto, k)
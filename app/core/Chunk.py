@@ -6,6 +6,9 @@ from pydantic import BaseModel, ConfigDict, Field, field_validator, model_valida
 import numpy as np
 
 EMBEDDING_DIM = 1536
+"""
+Default embedding dimension of a Library; each Library fixes its own at creation.
+"""
 
 
 class Chunk(BaseModel):
@@ -30,10 +33,11 @@ class Chunk(BaseModel):
     @field_validator('embedding')
     def _validate_embedding(cls, v: List[float]) -> List[float]:
         """
-        Validate that the embedding is a numpy array of the correct shape.
+        Validate that the embedding is not empty. Its length is checked against the
+        dimension of the Library it is upserted into.
         """
-        if len(v) != EMBEDDING_DIM:
-            raise ValueError(f"Embedding must have shape ({EMBEDDING_DIM},)")
+        if not len(v):
+            raise ValueError("Embedding must not be empty")
         return v
 
     @field_validator('metadata')
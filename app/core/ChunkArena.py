@@ -0,0 +1,102 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .Chunk import Chunk
+
+
+class ChunkArena:
+    """
+    A Library's row -> Chunk storage (None for dead rows), in fixed-size blocks.
+
+    Published versions hold a `freeze`d view that shares the blocks with the writer.
+    Replacing a row afterwards copies only the block that row lives in, so a metadata
+    update or delete costs O(BLOCK_SIZE) rather than a copy of every row. Appends past
+    the frozen length write in place: readers never look beyond their own length.
+    """
+
+    BLOCK_SIZE = 1024
+    # gathers averaging fewer rows than this per block look rows up one by one
+    GROUPED_GATHER_ROWS_PER_BLOCK = 8
+
+    def __init__(self, chunks: Iterable[Optional[Chunk]] = ()) -> None:
+        self._blocks: List[np.ndarray] = []
+        self._owned: List[bool] = []  # per block: False while a frozen view may share it
+        self._size = 0
+        for chunk in chunks:
+            self.append(chunk)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Optional[Chunk]]:
+        for start in range(0, self._size, self.BLOCK_SIZE):
+            yield from self._blocks[start // self.BLOCK_SIZE][:min(self.BLOCK_SIZE, self._size - start)]
+
+    def __getitem__(self, rows: int | Sequence[int] | np.ndarray) -> Optional[Chunk] | np.ndarray:
+        """
+        The chunk at an int row, or an object array of the chunks at an array of rows.
+
+        Rows within one block (any library under `BLOCK_SIZE` rows) are a single
+        fancy-index. Gathers with many rows per block, like a rebuild's, fancy-index each
+        block once. A few rows scattered over many blocks, the usual search result, are
+        still looked up one by one: per-block numpy calls cost more than they save there
+        (about 90us against 25us for 40 rows over a 200k-row library).
+        """
+        if isinstance(rows, (int, np.integer)):
+            if not 0 <= rows < self._size:
+                raise IndexError(f"row {rows} out of range")
+            return self._blocks[rows // self.BLOCK_SIZE][rows % self.BLOCK_SIZE]
+        rows = np.asarray(rows, dtype=np.intp)
+        if not rows.size:
+            return np.empty(0, dtype=object)
+        if rows.min() < 0 or rows.max() >= self._size:
+            raise IndexError("row out of range")
+        blocks, offsets = np.divmod(rows, self.BLOCK_SIZE)
+        if blocks.min() == blocks.max():
+            return self._blocks[blocks[0]][offsets]
+        out = np.empty(len(rows), dtype=object)
+        if len(rows) < self.GROUPED_GATHER_ROWS_PER_BLOCK * len(self._blocks):
+            out[:] = [self._blocks[b][o] for b, o in zip(blocks.tolist(), offsets.tolist())]
+            return out
+        order = np.argsort(blocks, kind="stable")
+        starts = np.flatnonzero(np.diff(blocks[order])) + 1
+        for group in np.split(order, starts):
+            out[group] = self._blocks[blocks[group[0]]][offsets[group]]
+        return out
+
+    def __setitem__(self, row: int, chunk: Optional[Chunk]) -> None:
+        """Replace the chunk at an existing row, copying its block first if it is shared."""
+        if not 0 <= row < self._size:
+            raise IndexError(f"row {row} out of range")
+        block = row // self.BLOCK_SIZE
+        if not self._owned[block]:
+            self._blocks[block] = self._blocks[block].copy()
+            self._owned[block] = True
+        self._blocks[block][row % self.BLOCK_SIZE] = chunk
+
+    def append(self, chunk: Optional[Chunk]) -> int:
+        """Store `chunk` at a new row, returned."""
+        row = self._size
+        if row % self.BLOCK_SIZE == 0:
+            self._blocks.append(np.empty(self.BLOCK_SIZE, dtype=object))
+            self._owned.append(True)
+        self._blocks[-1][row % self.BLOCK_SIZE] = chunk
+        self._size += 1
+        return row
+
+    def freeze(self) -> ChunkArena:
+        """
+        Read-only view of the current rows for a published version. From now on the
+        writer copies a block before replacing any of its rows.
+        """
+        view = ChunkArena()
+        view._blocks = list(self._blocks)
+        view._owned = [False] * len(self._blocks)
+        view._size = self._size
+        self._owned = [False] * len(self._blocks)
+        return view
+
+    def tolist(self) -> List[Optional[Chunk]]:
+        return list(self)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+from typing import Iterable, List, Optional
+from uuid import UUID
+
+import numpy as np
+
+# one row id -> UUID entry: the UUID's raw 16 bytes
+UUID_DTYPE = np.dtype([("bytes", "V16")])
+
+
+def gather_uuids(ids: np.ndarray, rows: np.ndarray) -> List[UUID]:
+    """Resolve int32 `rows` against an `IdTable.ids` array in one vectorized gather."""
+    return [UUID(bytes=b) for b in ids["bytes"][rows].tolist()]
+
+
+class IdTable:
+    """
+    A Library's mapping between chunk UUIDs and dense int32 row ids.
+
+    Indexes only ever see row ids; the table turns them back into UUIDs. Rows are
+    append-only: re-assigning a UUID appends a new row and leaves the old one dead, so a
+    view of `ids` taken earlier keeps resolving correctly while the table grows. Dead rows
+    are only dropped when the Library compacts, by building a fresh table.
+    """
+
+    def __init__(self, ids: Iterable[UUID] = ()) -> None:
+        ids = list(ids)
+        self._rows: dict[UUID, int] = {uid: row for row, uid in enumerate(ids)}
+        self._ids = np.frombuffer(b"".join(uid.bytes for uid in ids), dtype=UUID_DTYPE).copy()
+        self._size = len(ids)
+
+    @classmethod
+    def from_array(cls, ids: np.ndarray, live: Optional[np.ndarray] = None) -> IdTable:
+        """
+        Table over an existing `ids` array (e.g. from a snapshot); only the rows set in
+        the boolean mask `live` are mapped back from their UUIDs.
+        """
+        table = cls()
+        table._ids = np.array(ids, dtype=UUID_DTYPE)
+        table._size = len(table._ids)
+        rows = np.arange(table._size) if live is None else np.flatnonzero(live)
+        table._rows = {
+            UUID(bytes=b): int(row) for row, b in zip(rows, table._ids["bytes"][rows].tolist())
+        }
+        return table
+
+    def __len__(self) -> int:
+        """Number of rows assigned, dead ones included."""
+        return self._size
+
+    def __contains__(self, uid: UUID) -> bool:
+        return uid in self._rows
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Row id -> UUID array over the assigned rows (a view; never rewritten in place)."""
+        return self._ids[:self._size]
+
+    def row(self, uid: UUID) -> Optional[int]:
+        """Live row of `uid`, or None."""
+        return self._rows.get(uid)
+
+    def append(self, uid: UUID) -> int:
+        """Assign `uid` a new row (its previous row, if any, becomes dead)."""
+        if self._size == len(self._ids):
+            # grow into a new buffer so views handed out earlier stay untouched
+            grown = np.empty(max(16, 2 * self._size), dtype=UUID_DTYPE)
+            grown[:self._size] = self._ids[:self._size]
+            self._ids = grown
+        row = self._size
+        self._ids["bytes"][row] = uid.bytes
+        self._rows[uid] = row
+        self._size += 1
+        return row
+
+    def discard(self, uid: UUID) -> Optional[int]:
+        """Unmap `uid`; returns the row it held, which is now dead."""
+        return self._rows.pop(uid, None)
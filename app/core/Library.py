@@ -1,27 +1,174 @@
 # app/domain/library.py
 
 from __future__ import annotations
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, List, Optional, Tuple
+from typing import Any, ClassVar, List, Literal, Optional, Tuple
 from uuid import uuid4, UUID
 
 import numpy as np
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
 
 from app.indexes.BallTreeIndex import BallTreeIndex
 from app.indexes.BruteForceIndex import BruteForceIndex
 
 from .Chunk import EMBEDDING_DIM, Chunk
+from .ChunkArena import ChunkArena
+from .IdTable import IdTable, gather_uuids
 from ..indexes.BaseIndex import BaseIndex
 
 
+@dataclass(frozen=True, slots=True)
+class LibraryVersion:
+    """
+    An immutable, point-in-time view of a Library. Searches run against a version without
+    taking any lock; writers never touch a published version, they publish a new one.
+    """
+    seq: int # write seq this version reflects
+    index: Optional[BaseIndex] # never mutated once built; holds rows [0, indexed_count)
+    indexed_count: int # number of vectors in `index`
+    tombstones: Optional[np.ndarray] # (indexed_count,) bool, index rows that are stale; None if none are
+    delta_rows: np.ndarray # int32 rows of pending upserts, parallel to `delta_matrix` rows
+    delta_matrix: Optional[np.ndarray] # (len(delta_rows), d) unit-norm in the library dtype, read-only
+    row_ids: np.ndarray # row -> UUID, see `IdTable.ids`
+    row_chunks: ChunkArena # row -> Chunk (None for dead rows), a frozen view
+    chunk_count: int # number of live chunks
+
+    def search_rows(
+        self,
+        query_vector: List[float],
+        k: int,
+        **search_params: Any
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k-NN search over the index plus a brute-force scan of the delta buffer.
+        Returns the int32 rows of the hits and their similarities, best first.
+        Tombstoned index rows (deleted or re-embedded since the build) are skipped by
+        the index itself.
+        """
+        return self.search_rows_batch([query_vector], k, **search_params)[0]
+
+    def search_rows_batch(
+        self,
+        query_vectors: List[List[float]],
+        k: int,
+        **search_params: Any
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        `search_rows` for several queries at once; the index and the delta buffer are
+        each scanned once for the whole batch.
+        """
+        if self.index is None:
+            raise RuntimeError("Index has not been built yet")
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        hits: List[List[Tuple[int, float]]] = [[] for _ in queries]
+        if self.indexed_count:
+            hits = self.index.search_batch(
+                queries, k, exclude=self.tombstones, row_vectors=self.row_vectors, **search_params
+            )
+        if self.delta_matrix is not None:
+            if search_params.get("stats") is not None:
+                search_params["stats"].distance_computations += len(queries) * len(self.delta_rows)
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            delta_scores = (queries / norms) @ self.delta_matrix.T
+            delta_top = np.argsort(-delta_scores, axis=1)[:, :k]
+
+        results = []
+        for i, query_hits in enumerate(hits):
+            rows = np.fromiter((row for row, _ in query_hits), dtype=np.int32, count=len(query_hits))
+            scores = np.fromiter((score for _, score in query_hits), dtype=np.float32, count=len(query_hits))
+            if self.delta_matrix is not None:
+                rows = np.concatenate([rows, self.delta_rows[delta_top[i]]])
+                scores = np.concatenate([scores, delta_scores[i, delta_top[i]]])
+            order = np.argsort(-scores, kind="stable")[:k]
+            results.append((rows[order], scores[order]))
+        return results
+
+    def search(
+        self,
+        query_vector: List[float],
+        k: int,
+        **search_params: Any
+    ) -> List[Tuple[UUID, float]]:
+        """`search_rows`, with the rows resolved to chunk ids."""
+        rows, scores = self.search_rows(query_vector, k, **search_params)
+        return list(zip(gather_uuids(self.row_ids, rows), scores.tolist()))
+
+    def range_search_rows(
+        self,
+        query_vector: List[float],
+        min_similarity: float,
+        limit: int | None = None,
+        **search_params: Any
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows of every live chunk with similarity >= `min_similarity`, and their
+        similarities, best first; at most `limit` of them.
+        """
+        if self.index is None:
+            raise RuntimeError("Index has not been built yet")
+        rows = np.empty(0, dtype=np.int32)
+        scores = np.empty(0, dtype=np.float32)
+        if self.indexed_count:
+            hits = self.index.range_search(
+                query_vector, min_similarity, limit=limit, exclude=self.tombstones,
+                row_vectors=self.row_vectors, **search_params
+            )
+            rows = np.fromiter((row for row, _ in hits), dtype=np.int32, count=len(hits))
+            scores = np.fromiter((score for _, score in hits), dtype=np.float32, count=len(hits))
+        if self.delta_matrix is not None:
+            q = np.asarray(query_vector, dtype=np.float32)
+            delta_scores = self.delta_matrix @ (q / (np.linalg.norm(q) or 1.0))
+            above = np.flatnonzero(delta_scores >= min_similarity)
+            rows = np.concatenate([rows, self.delta_rows[above]])
+            scores = np.concatenate([scores, delta_scores[above]])
+        order = np.argsort(-scores, kind="stable")[:limit]
+        return rows[order], scores[order]
+
+    def get_all_chunks(self) -> Tuple[Chunk, ...]:
+        """Every live chunk, in row order."""
+        return tuple(chunk for chunk in self.row_chunks if chunk is not None)
+
+    def row_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Full-precision float32 embeddings of the live `rows`, read from their chunks;
+        passed to the index as the `row_vectors` search param (see `RerankingIndex`).
+        """
+        return np.array([chunk.embedding for chunk in self.row_chunks[rows]], dtype=np.float32)
+
+
 class Library(BaseModel):
     """
     Aggregate root: owns Chunks a vector-index instance.
+
+    Chunks live in a row arena: an `IdTable` gives every chunk a dense int32 row, and
+    indexes are built over, and answer with, rows. Rows are append-only between
+    compactions; updating a chunk's embedding gives it a new row and kills the old one.
+
+    Writes don't rebuild the index. Every chunk written since the index was built is
+    recorded in a small delta buffer that searches scan by brute force, while the index
+    itself is rebuilt off the request path and swapped in with `swap_index`. Deleting
+    (or re-embedding) an indexed chunk only sets its row in a tombstone bitmap that the
+    index skips at search time; once enough rows are tombstoned, the background rebuild
+    compacts them away.
+
+    Readers never lock: every write ends by publishing a new immutable `LibraryVersion`,
+    and searches run against whichever version was current when they started. Writers
+    are still serialized by the per-library write lock.
     """
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    DELTA_REBUILD_THRESHOLD: ClassVar[int] = 256
+    """
+    Number of writes since the last build after which the index should be rebuilt.
+    """
+    COMPACTION_RATIO: ClassVar[float] = 0.2
+    """
+    Fraction of tombstoned index rows after which the index should be rebuilt without them.
+    """
+
     id: UUID = Field(
         default_factory=uuid4,
         description="Unique identifier for this Library"
@@ -34,9 +181,21 @@ class Library(BaseModel):
         default_factory=dict,
         description="Arbitrary metadata for the Library"
     )
-    chunks: List[Chunk] = Field(
+    initial_chunks: List[Chunk] = Field(
         default_factory=list,
-        description="Ordered list of Chunks belonging to this Library"
+        alias="chunks",
+        exclude=True,
+        repr=False,
+        description="Chunks to create the Library with; read them back with `chunks`"
+    )
+    dimension: int = Field(
+        default=EMBEDDING_DIM,
+        ge=1,
+        description="Length of every embedding in this Library, fixed at creation"
+    )
+    dtype: Literal["float32", "float16"] = Field(
+        default="float32",
+        description="Precision embeddings are kept at in the delta buffer and brute-force scans; float16 halves their memory"
     )
     index: Optional[BaseIndex | BruteForceIndex | BallTreeIndex] = Field(
         default=BallTreeIndex(),
@@ -47,72 +206,314 @@ class Library(BaseModel):
     #     description="UTC timestamp when the library was created"
     # )
 
+    # chunk id <-> row, and row -> Chunk (None once the row is dead)
+    _table: IdTable = PrivateAttr(default_factory=IdTable)
+    _row_chunks: ChunkArena = PrivateAttr(default_factory=ChunkArena)
+    _chunk_count: int = PrivateAttr(default=0)
+    # monotonically increasing counter, bumped on every chunk write or delete
+    _write_seq: int = PrivateAttr(default=0)
+    # write seq the current index was built from, and how many rows it holds
+    _index_seq: int = PrivateAttr(default=0)
+    _indexed_count: int = PrivateAttr(default=0)
+    # chunk id -> seq of its latest write, for every write the index hasn't caught up with
+    _pending: dict[UUID, int] = PrivateAttr(default_factory=dict)
+    # row -> unit-norm embedding for live rows appended since the build
+    _delta: dict[int, np.ndarray] = PrivateAttr(default_factory=dict)
+    # which of the index's rows are stale
+    _tombstones: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros(0, dtype=bool))
+    _tombstone_count: int = PrivateAttr(default=0)
+    # the published, read-only view searches run against; replaced wholesale by `_publish`
+    _version: Optional[LibraryVersion] = PrivateAttr(default=None)
+
     @field_validator("metadata", mode="before")
     def _ensure_created_at(cls, v: dict[str, Any]) -> dict[str, Any]:
         if "created_at" not in v:
             v["created_at"] = datetime.now(timezone.utc).isoformat()
         return v
 
+    def model_post_init(self, __context: Any) -> None:
+        # chunks passed to the constructor are searchable before the first build
+        self._check_dimension(self.initial_chunks)
+        for chunk in self.initial_chunks:
+            self._upsert(chunk)
+        self.initial_chunks = []
+        self._publish()
+
+    @property
+    def chunks(self) -> List[Chunk]:
+        """Every live chunk, in row order."""
+        return list(self._version.get_all_chunks())
+
+    @property
+    def chunk_count(self) -> int:
+        return self._chunk_count
+
+    def _check_dimension(self, chunks: List[Chunk]) -> None:
+        if not all(len(chunk.embedding) == self.dimension for chunk in chunks):
+            raise ValueError(f"All chunks must have {self.dimension} dimensions")
+
+    def _set_row_chunk(self, row: int, chunk: Optional[Chunk]) -> None:
+        """Replace the chunk stored at an existing row; the arena copies the block if it is published."""
+        self._row_chunks[row] = chunk
+
+    def _append_row(self, chunk: Chunk) -> int:
+        """Give `chunk` a new row and put its embedding in the delta buffer."""
+        row = self._table.append(chunk.id)
+        self._row_chunks.append(chunk)
+        vec = np.asarray(chunk.embedding, dtype=np.float32)
+        self._delta[row] = (vec / (np.linalg.norm(vec) or 1.0)).astype(self.dtype, copy=False)
+        return row
+
+    def _kill_row(self, row: int) -> None:
+        """Mark `row` dead: tombstoned if the index holds it, else dropped from the delta."""
+        self._set_row_chunk(row, None)
+        if row >= self._indexed_count:
+            self._delta.pop(row, None)
+            return
+        if self._tombstones[row]:
+            return
+        if self._version is not None and self._version.tombstones is self._tombstones:
+            # the bitmap is shared with a published version; copy on write
+            self._tombstones = self._tombstones.copy()
+        self._tombstones[row] = True
+        self._tombstone_count += 1
+
+    def _upsert(self, chunk: Chunk) -> None:
+        """
+        Store `chunk`. Replacing a chunk whose embedding is unchanged (e.g. re-tagging its
+        metadata) only swaps the stored chunk; anything else gets a new row.
+        """
+        row = self._table.row(chunk.id)
+        if row is not None and self._row_chunks[row].embedding == chunk.embedding:
+            self._set_row_chunk(row, chunk)
+        else:
+            if row is None:
+                self._chunk_count += 1
+            else:
+                self._kill_row(row)
+            self._append_row(chunk)
+        self._write_seq += 1
+        self._pending[chunk.id] = self._write_seq
+
+    def _delete(self, chunk_id: UUID) -> None:
+        row = self._table.discard(chunk_id)
+        if row is None:
+            return
+        self._kill_row(row)
+        self._chunk_count -= 1
+        self._write_seq += 1
+        self._pending[chunk_id] = self._write_seq
+
+    def _publish(self) -> None:
+        """
+        Freeze the current state into a new `LibraryVersion` and make it visible to readers.
+        The single attribute assignment is the atomic swap.
+        """
+        delta_matrix = None
+        if self._delta:
+            delta_matrix = np.stack(list(self._delta.values()))
+            delta_matrix.flags.writeable = False
+        tombstones = None
+        if self._tombstone_count:
+            tombstones = self._tombstones
+            tombstones.flags.writeable = False
+        self._version = LibraryVersion(
+            seq=self._write_seq,
+            index=self.index,
+            indexed_count=self._indexed_count,
+            tombstones=tombstones,
+            delta_rows=np.fromiter(self._delta.keys(), dtype=np.int32, count=len(self._delta)),
+            delta_matrix=delta_matrix,
+            row_ids=self._table.ids,
+            row_chunks=self._row_chunks.freeze(),
+            chunk_count=self._chunk_count,
+        )
+
+    @property
+    def version(self) -> LibraryVersion:
+        """The latest published version; safe to read without holding any lock."""
+        return self._version
+
+    @property
+    def needs_compaction(self) -> bool:
+        """Whether enough index rows are tombstoned to rebuild the index without them."""
+        return self._tombstone_count > 0 and (
+            self._tombstone_count >= self.COMPACTION_RATIO * self._indexed_count
+        )
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """
+        Whether enough writes have piled up in the delta buffer, or enough rows have been
+        tombstoned, to rebuild the index.
+        """
+        return len(self._delta) >= self.DELTA_REBUILD_THRESHOLD or self.needs_compaction
+
     def upsert_chunks(self, chunks_to_upsert: List[Chunk]) -> None:
         """
-        Upsert (insert or update) Chunks in the Library's chunk list.
-        If a chunk with the same ID exists, it is replaced; otherwise, it is appended.
+        Upsert (insert or update) Chunks in the Library.
+        A chunk with a new ID is appended; an existing one is replaced. Replacing a chunk
+        whose embedding is unchanged (e.g. re-tagging its metadata) doesn't touch the
+        vector index at all.
         """
         if not chunks_to_upsert:
             return
-        if not all(len(chunk.embedding) == EMBEDDING_DIM for chunk in chunks_to_upsert):
-            raise ValueError(f"All chunks must have {EMBEDDING_DIM} dimensions")
-        
-        # Build a mapping from chunk ID to index for efficient lookup
-        id_to_index = {chunk.id: idx for idx, chunk in enumerate(self.chunks)}
+        self._check_dimension(chunks_to_upsert)
         for chunk in chunks_to_upsert:
-            if chunk.id in id_to_index:
-                self.chunks[id_to_index[chunk.id]] = chunk
-            else:
-                self.chunks.append(chunk)
-        
-        # Rebuild index
-        if self.index is not None:
-            self.build_index(self.index.__class__())
-        else:
-            self.build_index(BallTreeIndex())
-        
+            self._upsert(chunk)
+        self._publish()
 
     def delete_chunks(self, chunk_ids: List[UUID] | None = None) -> None:
         """
         Unified method to delete Chunks by ID, list of IDs, or all Chunks.
+        Deleting by ID costs O(deleted) and leaves the index alone: the deleted rows are
+        tombstoned and physically removed by a later rebuild (see `needs_compaction`).
         """
         if chunk_ids is None:
-            self.chunks.clear()
+            self._table = IdTable()
+            self._row_chunks = ChunkArena()
+            self._chunk_count = 0
+            self._indexed_count = 0
+            self._tombstones = np.zeros(0, dtype=bool)
+            self._tombstone_count = 0
+            self._delta = {}
+            self._write_seq += 1
+            self._publish()
+            self.build_index(self.index.empty_copy() if self.index else BallTreeIndex())
         elif isinstance(chunk_ids, list):
-            self.chunks = [chunk for chunk in self.chunks if chunk.id not in chunk_ids]
-        self.build_index(self.index.__class__() if self.index else BallTreeIndex())
+            for chunk_id in chunk_ids:
+                self._delete(chunk_id)
+            self._publish()
 
     def get_all_chunks(self) -> Tuple[Chunk, ...]:
         """Get all chunks in this Library as immutable tuples."""
-        return tuple(self.chunks)
+        return self._version.get_all_chunks()
+
+    def snapshot_for_rebuild(self) -> Tuple[int, List[List[float]], IdTable, np.ndarray]:
+        """
+        Capture what an index rebuild needs: the current write seq, the embeddings of the
+        live chunks, and a compacted id table and chunk arena numbering them 0..n-1.
+        Taken from the published version, so it needs no lock and can be built into a
+        new index while writes continue.
+        """
+        version = self._version
+        live = np.fromiter(
+            (chunk is not None for chunk in version.row_chunks), dtype=bool, count=len(version.row_chunks)
+        )
+        rows = np.flatnonzero(live)
+        row_chunks = version.row_chunks[rows]
+        table = IdTable.from_array(version.row_ids[rows])
+        return version.seq, [chunk.embedding for chunk in row_chunks], table, row_chunks
+
+    def swap_index(self, index: BaseIndex, seq: int, table: IdTable, row_chunks: np.ndarray) -> bool:
+        """
+        Install an index built from `snapshot_for_rebuild` at write seq `seq`, together
+        with the compacted `table` and `row_chunks` its rows refer to. Writes that arrived
+        after the snapshot are replayed on top: re-embedded and deleted chunks tombstone
+        their rows in the new index, new embeddings go back to the delta buffer.
+        Returns False (and keeps the current index) if a newer index is already in place.
+        """
+        if seq < self._index_seq:
+            return False
+        pending = {cid: s for cid, s in self._pending.items() if s > seq}
+        current = {}
+        for cid in pending:
+            row = self._table.row(cid)
+            current[cid] = None if row is None else self._row_chunks[row]
+
+        self.index = index
+        self._index_seq = seq
+        self._indexed_count = len(table)
+        self._table = table
+        self._row_chunks = ChunkArena(row_chunks)
+        self._tombstones = np.zeros(len(table), dtype=bool)
+        self._tombstone_count = 0
+        self._delta = {}
+        for cid, chunk in current.items():
+            row = table.row(cid)
+            if chunk is not None and row is not None and row_chunks[row].embedding == chunk.embedding:
+                self._set_row_chunk(row, chunk)
+                continue
+            if row is not None:
+                table.discard(cid)
+                self._kill_row(row)
+            if chunk is not None:
+                self._append_row(chunk)
+        self._chunk_count = len(table) - self._tombstone_count
+        self._pending = pending
+        self._publish()
+        return True
 
     def build_index(self, index: BaseIndex) -> None:
         """
         (Re)build the in-memory index for this Library.
         """
-        all_chunks = self.get_all_chunks()
-        all_embeddings = [chunk.embedding for chunk in all_chunks]
-        all_ids = [chunk.id for chunk in all_chunks]
-        index.build(all_embeddings, all_ids)
-        self.index = index
+        seq, all_embeddings, table, row_chunks = self.snapshot_for_rebuild()
+        index.build(all_embeddings, np.arange(len(table), dtype=np.int32))
+        self.swap_index(index, seq, table, row_chunks)
 
     def search(
         self,
         query_vector: List[float],
-        k: int
+        k: int,
+        **search_params: Any
     ) -> List[Tuple[UUID, float]]:
         """
-        k-NN search over the built index. Raises if index is None.
+        k-NN search over the latest published version. Raises if index is None.
+        `search_params` are passed through to the index (e.g. BallTreeIndex budgets).
         """
-        if self.index is None:
-            raise RuntimeError("Index has not been built yet")
-        return self.index.search(query_vector, k)
+        return self._version.search(query_vector, k, **search_params)
+
+    def to_snapshot(self) -> dict[str, Any]:
+        """
+        Plain-data state of this Library for on-disk snapshots. The index is left out;
+        it is persisted separately with `BaseIndex.save`, and only its configuration is
+        kept here, to rebuild it should the saved index be lost. Restore with `from_snapshot`.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "metadata": self.metadata,
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+            "index_config": self.index.to_config() if self.index is not None else None,
+            "row_ids": self._table.ids.copy(),
+            "row_chunks": self._row_chunks.tolist(),
+            "write_seq": self._write_seq,
+            "index_seq": self._index_seq,
+            "indexed_count": self._indexed_count,
+            "pending": dict(self._pending),
+            "delta": dict(self._delta),
+            "tombstones": self._tombstones.copy(),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: dict[str, Any], index: Optional[BaseIndex]) -> Library:
+        """
+        Rebuild a Library from `to_snapshot` output and the index that was saved with it,
+        without re-indexing or re-scanning its chunks. Snapshots from before the row arena
+        only carry a chunk list; those chunks are loaded into the delta buffer and the
+        caller is expected to rebuild the index.
+        """
+        config = {"dimension": state.get("dimension", EMBEDDING_DIM), "dtype": state.get("dtype", "float32")}
+        if "row_chunks" not in state:
+            return cls(id=state["id"], name=state["name"], metadata=state["metadata"],
+                       index=index, chunks=state["chunks"], **config)
+        library = cls(id=state["id"], name=state["name"], metadata=state["metadata"], index=index, **config)
+        row_chunks = state["row_chunks"]
+        live = np.fromiter((chunk is not None for chunk in row_chunks), dtype=bool, count=len(row_chunks))
+        library._table = IdTable.from_array(state["row_ids"], live)
+        library._row_chunks = ChunkArena(row_chunks)
+        library._chunk_count = int(np.count_nonzero(live))
+        library._write_seq = state["write_seq"]
+        library._index_seq = state["index_seq"]
+        library._indexed_count = state["indexed_count"]
+        library._pending = state["pending"]
+        library._delta = state["delta"]
+        library._tombstones = state["tombstones"]
+        library._tombstone_count = int(np.count_nonzero(library._tombstones))
+        library._publish()
+        return library
 
     def to_dict(self) -> dict[str, Any]:
         """JSON-serialisable representation of the Library."""
@@ -124,4 +525,5 @@ class Library(BaseModel):
 
     @property
     def index_name(self) -> str:
-        return getattr(self.index, "name", "Unknown")
+        describe = getattr(self.index, "describe", None)
+        return describe() if describe else getattr(self.index, "name", "Unknown")
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .BaseIndex import BaseIndex
+from .BallTreeIndex import BallTreeIndex
+from .BruteForceIndex import BruteForceIndex
+
+# below this many vectors brute force always wins; no need to benchmark
+MIN_TREE_SIZE = 1024
+# library sizes the calibration benchmark tries, smallest first
+CALIBRATION_SIZES = (1024, 4096, 16384)
+CALIBRATION_QUERIES = 20
+
+
+def _clustered_unit_vectors(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Synthetic stand-in for real embeddings: unit-norm points around a few dozen topics.
+    Uniformly random vectors would be a worst case no tree can prune.
+    """
+    centers = rng.standard_normal((32, dim)).astype(np.float32)
+    points = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def _median_query_seconds(index: BaseIndex, queries: np.ndarray) -> float:
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, 10)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+@lru_cache(maxsize=None)
+def calibrate_threshold(dim: int) -> int | None:
+    """
+    Smallest library size at which a BallTreeIndex query beats a brute-force scan on this
+    host, for `dim`-dimensional embeddings. Returns None if the tree never wins within
+    `CALIBRATION_SIZES`. Measured once per dimension per process; the `AUTO_INDEX_THRESHOLD`
+    environment variable skips the benchmark entirely.
+    """
+    if os.getenv("AUTO_INDEX_THRESHOLD"):
+        return int(os.environ["AUTO_INDEX_THRESHOLD"])
+    rng = np.random.default_rng(0)
+    for n in CALIBRATION_SIZES:
+        data = _clustered_unit_vectors(n, dim, rng)
+        ids = np.arange(n, dtype=np.int32)
+        queries = data[rng.integers(0, n, CALIBRATION_QUERIES)]
+        brute, tree = BruteForceIndex(), BallTreeIndex()
+        brute.build(list(data), ids)
+        tree.build(list(data), ids)
+        if _median_query_seconds(tree, queries) < _median_query_seconds(brute, queries):
+            return n
+    return None
+
+
+class AutoIndex(BaseIndex):
+    """
+    Picks the index implementation at build time from the number of vectors: brute force
+    for small libraries, a ball tree once the library reaches `threshold` vectors.
+
+    Every rebuild decides again, so a library migrates to the tree as it grows through
+    the normal background rebuilds, without any request waiting on it.
+
+    Parameters
+    ----------
+    threshold : int | None
+        Library size at which to switch to the tree. Defaults to the crossover measured
+        by `calibrate_threshold` on this host.
+    dtype : str
+        Storage dtype for the brute-force index (`"float32"` or `"float16"`); the ball
+        tree always stores float32.
+    """
+
+    name = "AutoIndex"
+
+    def __init__(self, threshold: int | None = None, dtype: str = "float32") -> None:
+        self.threshold = threshold
+        self.dtype = dtype
+        self._inner: BaseIndex | None = None
+
+    def empty_copy(self) -> AutoIndex:
+        return AutoIndex(threshold=self.threshold, dtype=self.dtype)
+
+    @property
+    def inner_name(self) -> str | None:
+        """Name of the index currently doing the work, if built."""
+        return self._inner.name if self._inner is not None else None
+
+    def _choose(self, n: int, dim: int) -> BaseIndex:
+        threshold = self.threshold
+        if threshold is None:
+            if n < MIN_TREE_SIZE:
+                return BruteForceIndex(dtype=self.dtype)
+            threshold = calibrate_threshold(dim)
+        if threshold is not None and n >= threshold:
+            return BallTreeIndex()
+        return BruteForceIndex(dtype=self.dtype)
+
+    def build(self, vectors: List[List[float]], ids: Sequence[int]) -> None:
+        dim = len(vectors[0]) if len(vectors) else 0
+        inner = self._choose(len(vectors), dim)
+        inner.build(vectors, ids)
+        self._inner = inner
+
+    def search(
+        self, query: List[float], k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[Tuple[int, float]]:
+        if self._inner is None:
+            raise RuntimeError("Index has not been built yet")
+        return self._inner.search(query, k, exclude=exclude, **params)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[List[Tuple[int, float]]]:
+        if self._inner is None:
+            raise RuntimeError("Index has not been built yet")
+        return self._inner.search_batch(queries, k, exclude=exclude, **params)
+
+    def range_search(
+        self,
+        query: List[float],
+        min_similarity: float,
+        limit: int | None = None,
+        exclude: np.ndarray | None = None,
+        **params,
+    ) -> List[Tuple[int, float]]:
+        if self._inner is None:
+            raise RuntimeError("Index has not been built yet")
+        return self._inner.range_search(query, min_similarity, limit=limit, exclude=exclude, **params)
+
+    def _get_state(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray | BaseIndex]]:
+        config = {"threshold": self.threshold, "dtype": self.dtype}
+        return config, ({"inner": self._inner} if self._inner is not None else {})
+
+    def _set_state(self, arrays: Dict[str, np.ndarray | BaseIndex]) -> None:
+        self._inner = arrays.get("inner")
@@ -1,155 +1,381 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Tuple
-from uuid import UUID
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
 import numpy as np
 
-from .BaseIndex import BaseIndex
+from .BaseIndex import BaseIndex, SearchStats
+
+_NO_CHILD = -1
 
-@dataclass(slots=True)
-class _Ball:
-    """
-    A `Node` in the ball-tree, which may be a leaf or an internal node.
-    - `Leaf` if both `left` and `right` are None, containing <= leaf_size points.
-    - `Internal` if it has children, containing more than leaf_size points.
-    """
-    idx_list: List[int] # indices of the original vectors
-    center: List[float] # center of the ball/node
-    radius: float # radius of the ball (max cosine distance to center from points in idx_list)
-    left: _Ball | None = None
-    right: _Ball | None = None
 
 class BallTreeIndex(BaseIndex):
     """
     Ball-tree with cosine distance.
 
+    The tree is stored as parallel NumPy arrays rather than node objects. Node `i` has
+    - `_centers[i]`: center of the ball (unit-norm)
+    - `_radii[i]`: max cosine distance from the center to any point in the ball
+    - `_left[i]`, `_right[i]`: child node ids, `-1` for leaves
+    - `_start[i]`, `_end[i]`: the `[start, end)` range of points the node covers
+
+    Points are permuted at build time so every node covers a contiguous range; `_perm`
+    maps a position in that order back to the build order (and hence the row id). A leaf
+    is therefore a contiguous slice of `_vectors`.
+
     Parameters
     ----------
     leaf_size : int
         When a node holds <= `leaf_size` points, stop splitting and make it a leaf.
+    n_jobs : int | None
+        Threads used to build independent subtrees; defaults to the CPU count.
     """
 
     name = "BallTreeIndex"
 
-    def __init__(self, leaf_size: int = 16) -> None:
+    # subtrees smaller than this are never worth handing to another thread
+    PARALLEL_MIN_POINTS = 2048
+
+    def __init__(self, leaf_size: int = 16, n_jobs: int | None = None) -> None:
+        if leaf_size < 1:
+            raise ValueError("leaf_size must be at least 1")
         self.leaf_size = leaf_size
-        self._vectors: List[float] | None = None        # (n, d) float32 unit-norm
-        self._ids: list[UUID] = []                  # parallel list of UUIDs
-        self._root: _Ball | None = None             # top of the tree
+        self.n_jobs = n_jobs                        # build threads; None = one per CPU
+        self._vectors: np.ndarray | None = None     # (n, d) float32 unit-norm, in tree order
+        self._ids: np.ndarray | None = None         # (n,) int32 row ids, in build order
+        self._perm: np.ndarray | None = None        # (n,) tree position -> build row
+        self._centers: np.ndarray | None = None     # (nodes, d)
+        self._radii: np.ndarray | None = None       # (nodes,)
+        self._left: np.ndarray | None = None        # (nodes,)
+        self._right: np.ndarray | None = None       # (nodes,)
+        self._start: np.ndarray | None = None       # (nodes,)
+        self._end: np.ndarray | None = None         # (nodes,)
 
-    def build(self, vectors: List[List[float]], ids: List[UUID]) -> None:
+    def empty_copy(self) -> BallTreeIndex:
+        return BallTreeIndex(leaf_size=self.leaf_size, n_jobs=self.n_jobs)
+
+    @property
+    def node_count(self) -> int:
+        return 0 if self._radii is None else int(self._radii.shape[0])
+
+    def build(self, vectors: List[List[float]], ids: Sequence[int]) -> None:
         """
         Build the ball tree in O(n log n).
 
         Steps
         -----
         1.  stack all vectors into one dense matrix + L2-normalize.
-        2.  recursively split: (#TODO: verify recursion!!!)
+        2.  split the range [start, end) of `perm` for each node:
               - calculate center
               - radius = max cosine distance to center
               - if no of points > leaf_size:
                     - project points onto center
-                    - plit by median of that projection
+                    - `argpartition` the projections so the lower half goes left,
+                      reordering `perm` in place
+        3.  store the vectors in tree order.
+
+        Every split puts exactly `size // 2` points on the left, so the shape of the
+        tree depends only on `n`. Node ids are assigned in pre-order up front, which
+        lets independent subtrees be built on a thread pool straight into the
+        preallocated node arrays (NumPy releases the GIL for the heavy ops).
         """
         if len(vectors) != len(ids):
             raise ValueError("vectors and ids length mismatch")
-        if not vectors:
-            self._vectors, self._ids, self._root = None, [], None
+        self._ids = np.asarray(ids, dtype=np.int32)
+        if not len(vectors):
+            self._vectors = self._perm = None
+            self._centers = self._radii = None
+            self._left = self._right = self._start = self._end = None
             return
 
         mat = np.stack([np.array(v).astype(np.float32, copy=False) for v in vectors])
         mat /= np.linalg.norm(mat, axis=1, keepdims=True)
-        self._vectors, self._ids = mat, list(ids)
+        n, dim = mat.shape
+        perm = np.arange(n, dtype=np.int32)
 
-        def build_rec(idxs: List[float]) -> _Ball:
+        @lru_cache(maxsize=None)
+        def count_nodes(size: int) -> int:
+            """Number of nodes in a subtree over `size` points."""
+            if size <= self.leaf_size:
+                return 1
+            return 1 + count_nodes(size // 2) + count_nodes(size - size // 2)
+
+        total = count_nodes(n)
+        centers = np.empty((total, dim), dtype=np.float32)
+        radii = np.empty(total, dtype=np.float32)
+        left = np.full(total, _NO_CHILD, dtype=np.int32)
+        right = np.full(total, _NO_CHILD, dtype=np.int32)
+        start = np.empty(total, dtype=np.int32)
+        end = np.empty(total, dtype=np.int32)
+
+        def build_node(node: int, lo: int, hi: int) -> list[tuple[int, int, int]]:
             """
-            Recursively build a ball tree node from the given indices.
+            Fill in the node covering perm[lo:hi]; returns the (node, lo, hi) of its children.
             """
-            points = mat[idxs]
+            points = mat[perm[lo:hi]]
             center = points.mean(axis=0)
             center /= (np.linalg.norm(center) or 1.0) # default to unit vector
             # cosine distance = 1 – dot, so radius in same units
-            radius = float(np.max(1.0 - points @ center))
-
-            node = _Ball(idx_list=idxs, center=center, radius=radius)
+            proj = points @ center
+            centers[node] = center
+            radii[node] = np.max(1.0 - proj)
+            start[node], end[node] = lo, hi
 
             # split if too many points
-            if len(idxs) > self.leaf_size:
-                proj = points @ center
-                median = np.median(proj)
-                left_mask = proj <= median
-                node.left = build_rec(idxs[left_mask])
-                node.right = build_rec(idxs[~left_mask])
-            return node
+            if hi - lo <= self.leaf_size:
+                return []
+            half = (hi - lo) // 2
+            perm[lo:hi] = perm[lo:hi][np.argpartition(proj, half)]
+            left[node] = node + 1
+            right[node] = node + 1 + count_nodes(half)
+            return [(int(left[node]), lo, lo + half), (int(right[node]), lo + half, hi)]
 
-        self._root = build_rec(np.arange(mat.shape[0]))
+        def build_subtree(node: int, lo: int, hi: int) -> None:
+            stack = [(node, lo, hi)]
+            while stack:
+                stack.extend(build_node(*stack.pop()))
 
-    def search(self, query: List[float], k: int) -> List[Tuple[UUID, float]]:
+        # split the top levels serially until there is enough independent work for the pool
+        workers = self.n_jobs or os.cpu_count() or 1
+        subtrees = [(0, 0, n)]
+        while workers > 1 and len(subtrees) < 2 * workers:
+            large = [t for t in subtrees if t[2] - t[1] >= self.PARALLEL_MIN_POINTS]
+            if not large:
+                break
+            subtrees = [t for t in subtrees if t[2] - t[1] < self.PARALLEL_MIN_POINTS]
+            subtrees += [child for t in large for child in build_node(*t)]
+
+        if len(subtrees) <= 1:
+            for subtree in subtrees:
+                build_subtree(*subtree)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda subtree: build_subtree(*subtree), subtrees))
+
+        self._perm = perm
+        self._vectors = mat[perm]
+        self._centers, self._radii = centers, radii
+        self._left, self._right = left, right
+        self._start, self._end = start, end
+
+    def search(
+        self,
+        query: List[float],
+        k: int,
+        max_leaves: int | None = None,
+        max_distance_evals: int | None = None,
+        slack: float = 0.0,
+        exclude: np.ndarray | None = None,
+        stats: SearchStats | None = None,
+        **params,
+    ) -> List[Tuple[int, float]]:
         """
-        Return top-k nearest neighbors: (UUID, cosine_similarity).
+        Return top-k nearest neighbors: (row id, cosine_similarity).
         # TODO: consider returning chunk, similarity tuples instead?
 
+        Traversal is best-first: nodes are popped from a priority queue ordered by
+        their lower bound, so the most promising leaves are scanned first and the
+        top-k tightens as early as possible.
+
         Pruning logic:
         --------------
-        If lower_bound(query, node) >= worst_best_so_far, skip subtree.
+        lower_bound(query, node) = 1 - cos(max(0, angle(query, center) - angle(radius)))
+        If lower_bound(query, node) * (1 + slack) >= worst_best_so_far, skip subtree.
+        Since the queue is ordered by lower bound, the first pruned node ends the search.
+
+        Approximate search
+        ------------------
+        With the defaults the search is exact. Any of these trade recall for latency:
+        - `max_leaves`: stop after scanning this many leaves.
+        - `max_distance_evals`: stop once this many points have been scored.
+        - `slack`: prune nodes whose lower bound is within a factor `1 + slack` of
+          the current worst distance.
+        When a budget runs out the best results found so far are returned.
+
+        Rows set in the `exclude` tombstone bitmap are skipped when leaves are scored.
+        With `stats`, the traversal is counted into it (see `SearchStats`).
         """
-        if self._root is None or self._vectors is None:
+        if self._vectors is None:
             raise RuntimeError("Index not built")
         if k <= 0:
             return []
+        if slack < 0:
+            raise ValueError("slack must be non-negative")
 
         # normalise query (cosine)
         q = np.array(query, dtype=np.float32)
         q /= (np.linalg.norm(q) or 1.0)
+        prune_factor = 1.0 + slack
+        leaves_scanned = distance_evals = 0
+        nodes_visited = nodes_pruned = center_evals = 0
+
+        vectors, centers, radii, perm = self._vectors, self._centers, self._radii, self._perm
+        left, right, start, end = self._left, self._right, self._start, self._end
+
+        # bounded max-heap of the current top-k, stored as (-distance, tree position)
+        best: list[tuple[float, int]] = []
+        # min-heap of nodes to visit, keyed by lower bound; node id breaks ties
+        frontier: list[tuple[float, int]] = [(0.0, 0)]
+
+        while frontier:
+            lb, node = heapq.heappop(frontier)
+            if len(best) == k and lb * prune_factor >= -best[0][0]:
+                nodes_pruned += 1 + len(frontier)
+                break  # nothing left in the queue can beat current worst
+
+            if left[node] == _NO_CHILD:
+                if max_leaves is not None and leaves_scanned >= max_leaves:
+                    nodes_pruned += 1 + len(frontier)
+                    break
+                if max_distance_evals is not None and distance_evals >= max_distance_evals:
+                    nodes_pruned += 1 + len(frontier)
+                    break
+                nodes_visited += 1
+                # score the whole leaf (a contiguous slice) with one mat-vec
+                lo = int(start[node])
+                hi = int(end[node])
+                dists = 1.0 - vectors[lo:hi] @ q
+                leaves_scanned += 1
+                distance_evals += len(dists)
+                if exclude is not None:
+                    dists[exclude[perm[lo:hi]]] = np.inf
+                bound = -best[0][0] if len(best) == k else np.inf
+                for j in np.flatnonzero(dists < bound):
+                    item = (-float(dists[j]), lo + int(j))
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item[0] > best[0][0]:
+                        heapq.heapreplace(best, item)
+                continue
+
+            nodes_visited += 1
+            center_evals += 2
+            children = [int(left[node]), int(right[node])]
+            child_lbs = self._lower_bounds(centers[children] @ q, radii[children])
+            for child, child_lb in zip(children, child_lbs):
+                child_lb = float(child_lb)
+                if len(best) < k or child_lb * prune_factor < -best[0][0]:
+                    heapq.heappush(frontier, (child_lb, child))
+                else:
+                    nodes_pruned += 1
 
-        # top-k
-        best_idx: list[int] = []
-        best_dst: list[float] = []
-
-        def push(i: int, dist: float) -> None:
-            """Insert into heap."""
-            if len(best_idx) < k:
-                best_idx.append(i); best_dst.append(dist)
-            elif dist < max(best_dst):
-                worst = best_dst.index(max(best_dst))
-                best_idx[worst] = i; best_dst[worst] = dist
-
-        def visit(node: _Ball) -> None:
-            """DFS with pruning."""
-            lb = max(0.0, 1.0 - float(q @ node.center) - node.radius)
-            if len(best_dst) == k and lb >= max(best_dst):
-                return  # nothing inside can beat current worst;
-
-            if node.left is None and node.right is None:
-                for i in node.idx_list:
-                    d = 1.0 - float(q @ self._vectors[i])
-                    push(int(i), d)
-                return
-
-            l_dist = 1.0 - float(q @ node.left.center) if node.left else float("inf")
-            r_dist = 1.0 - float(q @ node.right.center) if node.right else float("inf")
-            first, second = (node.left, node.right) if l_dist < r_dist else (node.right, node.left)
-            visit(first)
-            if second:
-                visit(second)
-
-        visit(self._root)
+        if stats is not None:
+            stats.nodes_visited += nodes_visited
+            stats.nodes_pruned += nodes_pruned
+            stats.leaves_scanned += leaves_scanned
+            stats.distance_computations += distance_evals + center_evals
 
         # convert to similarity and sort in desc order
-        order = np.argsort(best_dst)
-        return [(self._ids[best_idx[i]], 1.0 - best_dst[i]) for i in order]
+        best.sort(reverse=True)
+        return [(int(self._ids[perm[pos]]), 1.0 + neg_dist) for neg_dist, pos in best]
+
+    def range_search(
+        self,
+        query: List[float],
+        min_similarity: float,
+        limit: int | None = None,
+        exclude: np.ndarray | None = None,
+        **params,
+    ) -> List[Tuple[int, float]]:
+        """
+        Every point with cosine similarity >= `min_similarity`, best first, at most
+        `limit` of them.
+
+        Same best-first traversal as `search`, but a node is pruned once its lower bound
+        exceeds the distance threshold `1 - min_similarity` (or, when `limit` results are
+        already in hand, the worst of them).
+        """
+        if self._vectors is None:
+            raise RuntimeError("Index not built")
+        q = np.array(query, dtype=np.float32)
+        q /= (np.linalg.norm(q) or 1.0)
+        max_dist = 1.0 - min_similarity
+
+        vectors, centers, radii, perm = self._vectors, self._centers, self._radii, self._perm
+        left, right, start, end = self._left, self._right, self._start, self._end
+
+        # max-heap of (-distance, tree position); bounded to `limit` entries if given
+        found: list[tuple[float, int]] = []
+        frontier: list[tuple[float, int]] = [(0.0, 0)]
+
+        def bound() -> float:
+            if limit is not None and len(found) == limit:
+                return min(max_dist, -found[0][0])
+            return max_dist
+
+        while frontier:
+            lb, node = heapq.heappop(frontier)
+            if lb > bound():
+                break
+
+            if left[node] == _NO_CHILD:
+                lo = int(start[node])
+                hi = int(end[node])
+                dists = 1.0 - vectors[lo:hi] @ q
+                if exclude is not None:
+                    dists[exclude[perm[lo:hi]]] = np.inf
+                for j in np.flatnonzero(dists <= bound()):
+                    item = (-float(dists[j]), lo + int(j))
+                    if limit is None or len(found) < limit:
+                        heapq.heappush(found, item)
+                    elif item[0] > found[0][0]:
+                        heapq.heapreplace(found, item)
+                continue
+
+            children = [int(left[node]), int(right[node])]
+            child_lbs = self._lower_bounds(centers[children] @ q, radii[children])
+            for child, child_lb in zip(children, child_lbs):
+                if float(child_lb) <= bound():
+                    heapq.heappush(frontier, (float(child_lb), child))
+
+        found.sort(reverse=True)
+        return [(int(self._ids[perm[pos]]), 1.0 + neg_dist) for neg_dist, pos in found]
+
+    # float32 rounding in the stored radii and dot products; bounds are loosened by this much
+    _BOUND_EPS = 1e-6
+
+    @classmethod
+    def _lower_bounds(cls, center_sims: np.ndarray, radii: np.ndarray) -> np.ndarray:
+        """
+        Smallest cosine distance from the query to any point in each ball, given the
+        query's similarity to the ball centers.
+
+        Cosine distance isn't a metric, so `distance(q, center) - radius` can overshoot;
+        angles are, so the closest point is at least `angle(q, center) - angle(radius)` away.
+        """
+        center_angles = np.arccos(np.clip(np.asarray(center_sims, dtype=np.float64), -1.0, 1.0))
+        radius_angles = np.arccos(np.clip(1.0 - np.asarray(radii, dtype=np.float64) - cls._BOUND_EPS, -1.0, 1.0))
+        gap = np.maximum(center_angles - radius_angles, 0.0)
+        return np.maximum(1.0 - np.cos(gap) - cls._BOUND_EPS, 0.0)
+
+    _ARRAYS = ("vectors", "ids", "perm", "centers", "radii", "left", "right", "start", "end")
+
+    def _get_state(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        config = {"leaf_size": self.leaf_size, "n_jobs": self.n_jobs}
+        if self._vectors is None:
+            return config, {}
+        return config, {name: getattr(self, f"_{name}") for name in self._ARRAYS}
+
+    def _set_state(self, arrays: Dict[str, np.ndarray]) -> None:
+        if "vectors" not in arrays:
+            return
+        for name in self._ARRAYS:
+            setattr(self, f"_{name}", arrays[name])
 
     def to_string(self) -> str:
         """
         Return a string representation of the index; debugging util
         """
-        def _to_str(node: _Ball, depth: int = 0) -> str:
+        def _to_str(node: int, depth: int = 0) -> str:
             indent = "  " * depth
-            if node.left is None and node.right is None:
-                return f"{indent}Leaf: {len(node.idx_list)} points, center={node.center}, radius={node.radius}\n"
-            left_str = _to_str(node.left, depth + 1) if node.left else ""
-            right_str = _to_str(node.right, depth + 1) if node.right else ""
-            return f"{indent}Node: {len(node.idx_list)} points, center={node.center}, radius={node.radius}\n{left_str}{right_str}"
+            size = int(self._end[node] - self._start[node])
+            if self._left[node] == _NO_CHILD:
+                return f"{indent}Leaf: {size} points, center={self._centers[node]}, radius={self._radii[node]}\n"
+            left_str = _to_str(int(self._left[node]), depth + 1)
+            right_str = _to_str(int(self._right[node]), depth + 1)
+            return f"{indent}Node: {size} points, center={self._centers[node]}, radius={self._radii[node]}\n{left_str}{right_str}"
 
-        return _to_str(self._root) if self._root else "Empty BallTreeIndex"
\ No newline at end of file
+        return _to_str(0) if self.node_count else "Empty BallTreeIndex"
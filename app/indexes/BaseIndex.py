@@ -1,11 +1,29 @@
 # app/index/base.py
 
+import os
 from abc import ABC, abstractmethod
-from typing import List, Tuple
-from uuid import UUID
-
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Sequence, Tuple
 import numpy as np
 
+from app.utils.array_store import load_arrays, save_arrays
+
+
+@dataclass
+class SearchStats:
+    """
+    Work counters for explaining a search. Pass one as the `stats` search param and
+    the indexes that support it add to it; the others leave it untouched.
+    """
+    nodes_visited: int = 0  # tree nodes popped from the frontier (BallTreeIndex)
+    nodes_pruned: int = 0  # subtrees skipped by their bound or by a search budget (BallTreeIndex)
+    leaves_scanned: int = 0  # leaves scored (BallTreeIndex)
+    distance_computations: int = 0  # query-to-vector similarities, including ball centers and reranking
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
 class BaseIndex(ABC):
     """
     Abstract base class for vector indexes.
@@ -13,6 +31,8 @@ class BaseIndex(ABC):
     Concrete implementations must provide:
       - build: ingest a collection of vectors and their identifiers.
       - search: return top-k nearest neighbors for a query vector.
+      - _get_state / _set_state: expose the built structure as flat NumPy arrays,
+        which is what `save` and `load` persist.
     """
 
     name: str
@@ -21,23 +41,154 @@ class BaseIndex(ABC):
     """
 
     @abstractmethod
-    def build(self, vectors: List[List[float]], ids: List[UUID]) -> None:
+    def build(self, vectors: List[List[float]], ids: Sequence[int]) -> None:
         """
         Build or rebuild the index from scratch.
 
         :param vectors: list of numpy arrays representing embeddings
-        :param ids: list of UUIDs corresponding to each embedding
+        :param ids: int32 row ids corresponding to each embedding; indexes never see
+            chunk UUIDs, the owning Library's `IdTable` maps rows back to them
         """
         ...
 
     @abstractmethod
-    def search(self, query: List[float], k: int) -> List[Tuple[UUID, float]]:
+    def search(
+        self, query: List[float], k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[Tuple[int, float]]:
         """
         Query the index to find the k most similar vectors.
 
         :param query: numpy array representing the query embedding
         :param k: number of nearest neighbors to return
-        :return: list of (UUID, similarity_score) tuples sorted by score descending
+        :param exclude: optional tombstone bitmap, a boolean mask parallel to the vectors
+            passed to `build`; rows set to True are never returned
+        :param params: optional index-specific tuning knobs (e.g. search budgets),
+            `stats`, a `SearchStats` to count the work into, and `row_vectors`, a callable
+            mapping an int32 array of row ids to their full-precision vectors, for
+            indexes that rescore on them; indexes ignore knobs they don't support
+        :return: list of (row id, similarity_score) tuples sorted by score descending
         """
         ...
 
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Run `search` for every row of the (m, d) `queries` matrix. The default loops;
+        indexes that can score a whole batch with one matrix-matrix product override it.
+        """
+        return [self.search(query, k, exclude=exclude, **params) for query in queries]
+
+    def range_search(
+        self,
+        query: List[float],
+        min_similarity: float,
+        limit: int | None = None,
+        exclude: np.ndarray | None = None,
+        **params,
+    ) -> List[Tuple[int, float]]:
+        """
+        Every vector with cosine similarity >= `min_similarity` to `query`, best first,
+        at most `limit` of them.
+
+        The default grows a top-k search until its tail drops below the threshold;
+        indexes that can prune on the threshold directly override it.
+        """
+        k = min(limit, 64) if limit else 64
+        while True:
+            hits = self.search(query, k, exclude=exclude, **params)
+            if len(hits) < k or hits[-1][1] < min_similarity or k == limit:
+                break
+            k = min(2 * k, limit) if limit else 2 * k
+        return [hit for hit in hits if hit[1] >= min_similarity]
+
+    def describe(self) -> str:
+        """
+        Display name including any inner index, e.g. `AutoIndex(BallTreeIndex)`.
+        """
+        inner = getattr(self, "inner_name", None)
+        return f"{self.name}({inner})" if inner else self.name
+
+    def empty_copy(self) -> "BaseIndex":
+        """
+        Return a new, unbuilt index with the same configuration, used for rebuilds.
+        """
+        return self.__class__()
+
+    @abstractmethod
+    def _get_state(self) -> Tuple[Dict[str, Any], Dict[str, "np.ndarray | BaseIndex"]]:
+        """
+        Return `(config, arrays)`: constructor kwargs needed to recreate an equivalent
+        empty index, and the built structure as flat NumPy arrays. Wrapper indexes may
+        return their inner indexes as values too; those are saved to sub-directories.
+        """
+        ...
+
+    @abstractmethod
+    def _set_state(self, arrays: Dict[str, "np.ndarray | BaseIndex"]) -> None:
+        """
+        Restore the built structure from arrays produced by `_get_state`. The arrays may
+        be read-only memory maps and must be used as-is, not copied.
+        """
+        ...
+
+    def save(self, path: str) -> None:
+        """
+        Persist the built index as raw `.npy` arrays under the directory `path`.
+        """
+        config, state = self._get_state()
+        children = [name for name, value in state.items() if isinstance(value, BaseIndex)]
+        for name in children:
+            state[name].save(os.path.join(path, name))
+        arrays = {name: value for name, value in state.items() if name not in children}
+        save_arrays(path, {"name": self.name, "config": config, "children": children}, arrays)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BaseIndex":
+        """
+        Load an index written by `save`, memory-mapping its arrays unless `mmap=False`.
+        Called on `BaseIndex` itself, the concrete class is picked from the saved name.
+        """
+        meta, arrays = load_arrays(path, mmap=mmap)
+        index_cls = cls._resolve(meta["name"], path)
+        for name in meta.get("children", []):
+            arrays[name] = BaseIndex.load(os.path.join(path, name), mmap=mmap)
+        index = index_cls(**meta["config"])
+        index._set_state(arrays)
+        return index
+
+    def to_config(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable description of this index's configuration, without any built
+        structure. `from_config` turns it back into an equivalent empty index.
+        """
+        config, state = self.empty_copy()._get_state()
+        children = {name: value.to_config() for name, value in state.items() if isinstance(value, BaseIndex)}
+        return {"name": self.name, "config": config, "children": children}
+
+    @classmethod
+    def from_config(cls, spec: Dict[str, Any]) -> "BaseIndex":
+        """
+        Create an empty, unbuilt index from the output of `to_config`.
+        """
+        index = cls._resolve(spec["name"], "index config")(**spec["config"])
+        children = {name: BaseIndex.from_config(child) for name, child in spec.get("children", {}).items()}
+        if children:
+            index._set_state(children)
+        return index
+
+    @classmethod
+    def _resolve(cls, name: str, source: str) -> type:
+        """The concrete class called `name`; on a subclass, only that class is accepted."""
+        if cls is not BaseIndex:
+            if name != cls.name:
+                raise ValueError(f"{source} holds a {name}, not a {cls.name}")
+            return cls
+        index_cls = next((sub for sub in _all_subclasses(BaseIndex) if sub.name == name), None)
+        if index_cls is None:
+            raise ValueError(f"Unknown index type {name!r} in {source}")
+        return index_cls
+
+
+def _all_subclasses(cls: type) -> List[type]:
+    return [sub for direct in cls.__subclasses__() for sub in (direct, *_all_subclasses(direct))]
@@ -1,29 +1,47 @@
 from __future__ import annotations
-from typing import List
-from uuid import UUID, uuid4
+from typing import Any, Dict, List, Sequence, Tuple
 from .BaseIndex import BaseIndex
 import numpy as np
 
 class BruteForceIndex(BaseIndex):
     """
     A super simple KNN index: store every vector and scan all at query timr.
+
+    With `dtype="float16"` the vectors are stored at half precision, halving memory,
+    scan bandwidth and snapshot size. Scans upcast `SCAN_BLOCK_ROWS` rows at a time to
+    float32 and accumulate in float32, so scores stay within float16 rounding of the
+    stored vectors (about 1e-3).
     """
 
     name = "BruteForceIndex"
 
-    def __init__(self, normalize: bool = True):
+    DTYPES = ("float32", "float16")
+
+    SCAN_BLOCK_ROWS = 4096
+    """
+    Rows upcast to float32 at a time when scanning float16 vectors; keeps the temporary
+    copy cache-sized instead of materializing the whole matrix in float32.
+    """
+
+    def __init__(self, normalize: bool = True, dtype: str = "float32"):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"dtype must be one of {self.DTYPES}, not {dtype!r}")
         self._vectors: np.ndarray | None = None
         self._norms: np.ndarray | None = None
-        self._ids: List[UUID] = []
+        self._ids: np.ndarray = np.empty(0, dtype=np.int32)
         self._normalize = normalize
+        self._dtype = dtype
+
+    def empty_copy(self) -> BruteForceIndex:
+        return BruteForceIndex(normalize=self._normalize, dtype=self._dtype)
 
-    def build(self, vectors: List[List[float]], ids: List[UUID]) -> None:
+    def build(self, vectors: List[List[float]], ids: Sequence[int]) -> None:
         if len(vectors) != len(ids):
             raise ValueError("Vectors and IDs must have the same length")
-        if not vectors:
-            self._vectors = np.empty([0, 0], dtype=np.float32).tolist()
-            self._norms = np.empty([0, 1], dtype=np.float32).tolist()
-            self._ids = []
+        if not len(vectors):
+            self._vectors = np.empty([0, 0], dtype=self._dtype)
+            self._norms = np.empty([0, 1], dtype=np.float32)
+            self._ids = np.empty(0, dtype=np.int32)
             return
         
         # (n, d) float32 matrix – copy=False avoids dup if already np.ndarray
@@ -35,25 +53,128 @@ class BruteForceIndex(BaseIndex):
             mat /= norms          # in-place; now every row has unit norm
             norms = np.ones_like(norms)
 
-        self._vectors, self._norms, self._ids = mat, norms, list(ids)
+        self._vectors = mat.astype(self._dtype, copy=False)
+        self._norms, self._ids = norms, np.asarray(ids, dtype=np.int32)
 
-    def search(self, query: List[float], k: int) -> List[tuple[UUID, float]]:
-        if self._vectors is None:
-            raise RuntimeError("Index has not been built yet")
+    def search(
+        self, query: List[float], k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[tuple[int, float]]:
         if k <= 0:
             raise ValueError("k must be a positive integer")
-        q = np.array(query).astype(np.float32, copy=False)
-        if (self._normalize):
-            q /= (np.linalg.norm(query) or 1.0)
-            similarities = np.dot(self._vectors, query)
-        else:
-            qnorm = (np.linalg.norm(query) or 1.0)
-            if self._norms is None:
-                raise RuntimeError("Index norms have not been computed. Build the index first.")
-            similarities = np.dot(self._vectors, query) / (self._norms.squeeze() * qnorm)
+        similarities = self._similarities(query)
+        if params.get("stats") is not None:
+            params["stats"].distance_computations += similarities.size
 
+        if exclude is not None:
+            similarities = np.where(exclude, -np.inf, similarities)
+            k = min(k, similarities.size - int(np.count_nonzero(exclude)))
+            if k <= 0:
+                return []
         k = min(k, similarities.size)
         idx_unsorted = np.argpartition(-similarities, k - 1)[:k]
         idx_sorted   = idx_unsorted[np.argsort(-similarities[idx_unsorted])]
 
-        return [(self._ids[i], float(similarities[i])) for i in idx_sorted]
\ No newline at end of file
+        return [(int(self._ids[i]), float(similarities[i])) for i in idx_sorted]
+
+    def _similarities(self, query: List[float]) -> np.ndarray:
+        """Cosine similarity of `query` to every stored vector."""
+        if self._vectors is None:
+            raise RuntimeError("Index has not been built yet")
+        q = np.array(query).astype(np.float32, copy=False)
+        if (self._normalize):
+            q /= (np.linalg.norm(query) or 1.0)
+            return self._scan(q)
+        qnorm = (np.linalg.norm(query) or 1.0)
+        if self._norms is None:
+            raise RuntimeError("Index norms have not been computed. Build the index first.")
+        return self._scan(q) / (self._norms.squeeze() * qnorm)
+
+    def _scan(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Dot products of float32 `queries` ((d,) or (m, d)) with every stored vector:
+        shape (n,) or (m, n). Half-precision vectors are upcast one block at a time.
+        """
+        vectors = self._vectors
+        n = len(vectors)
+        if n and vectors.dtype == np.float32:
+            return queries @ vectors.T
+        out = np.empty(queries.shape[:-1] + (n,), dtype=np.float32)
+        for start in range(0, n, self.SCAN_BLOCK_ROWS):
+            block = vectors[start:start + self.SCAN_BLOCK_ROWS].astype(np.float32)
+            out[..., start:start + len(block)] = queries @ block.T
+        return out
+
+    def range_search(
+        self,
+        query: List[float],
+        min_similarity: float,
+        limit: int | None = None,
+        exclude: np.ndarray | None = None,
+        **params,
+    ) -> List[tuple[int, float]]:
+        """One full scan, thresholded with a vectorized mask."""
+        if not len(self._ids):
+            return []
+        similarities = self._similarities(query)
+        mask = similarities >= min_similarity
+        if exclude is not None:
+            mask &= ~exclude
+        idx = np.flatnonzero(mask)
+        idx = idx[np.argsort(-similarities[idx], kind="stable")][:limit]
+        return [(int(self._ids[i]), float(similarities[i])) for i in idx]
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[List[tuple[int, float]]]:
+        """
+        Score all queries against all vectors with one (m, d) x (d, n) product, then take
+        each row's top-k.
+        """
+        if self._vectors is None:
+            raise RuntimeError("Index has not been built yet")
+        if k <= 0:
+            raise ValueError("k must be a positive integer")
+        Q = np.asarray(queries, dtype=np.float32)
+        if not len(self._ids):
+            return [[] for _ in Q]
+        qnorms = np.linalg.norm(Q, axis=1, keepdims=True)
+        qnorms[qnorms == 0] = 1.0
+        similarities = self._scan(Q / qnorms)
+        if params.get("stats") is not None:
+            params["stats"].distance_computations += similarities.size
+        if not self._normalize:
+            similarities /= self._norms.reshape(1, -1)
+
+        n_live = similarities.shape[1]
+        if exclude is not None:
+            similarities[:, exclude] = -np.inf
+            n_live -= int(np.count_nonzero(exclude))
+        k = min(k, n_live)
+        if k <= 0:
+            return [[] for _ in Q]
+        idx_unsorted = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(similarities, idx_unsorted, axis=1)
+        order = np.argsort(-top, axis=1)
+        idx_sorted = np.take_along_axis(idx_unsorted, order, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return [
+            [(int(self._ids[i]), float(s)) for i, s in zip(idx_row, top_row)]
+            for idx_row, top_row in zip(idx_sorted, top)
+        ]
+
+    def _get_state(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        config = {"normalize": self._normalize, "dtype": self._dtype}
+        if self._vectors is None:
+            return config, {}
+        arrays = {
+            "vectors": np.asarray(self._vectors, dtype=self._dtype),
+            "norms": np.asarray(self._norms, dtype=np.float32),
+            "ids": self._ids,
+        }
+        return config, arrays
+
+    def _set_state(self, arrays: Dict[str, np.ndarray]) -> None:
+        if "vectors" not in arrays:
+            return
+        self._vectors, self._norms = arrays["vectors"], arrays["norms"]
+        self._ids = arrays["ids"]
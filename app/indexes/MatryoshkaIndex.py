@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .BaseIndex import BaseIndex
+from .BruteForceIndex import BruteForceIndex
+
+
+def _truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Keep the first `dim` dimensions of each row and renormalize to unit length."""
+    prefix = np.array(vectors[..., :dim], dtype=np.float32)
+    norms = np.linalg.norm(prefix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return prefix / norms
+
+
+class MatryoshkaIndex(BaseIndex):
+    """
+    Coarse index over truncated Matryoshka embeddings.
+
+    Matryoshka-trained models (e.g. Cohere embed-v4) put most of the signal in a prefix
+    of the dimensions, so the first `dim` dimensions, renormalized, already rank
+    neighbours well. The inner index only ever sees those prefixes, which cuts its
+    memory and scan bandwidth by `EMBEDDING_DIM / dim`.
+
+    Scores are similarities between prefixes, so this is meant to be the first stage of
+    a `RerankingIndex`, which rescores the candidates on the full vectors.
+
+    Parameters
+    ----------
+    inner : BaseIndex | None
+        Index built over the truncated vectors. Defaults to a brute-force index.
+    dim : int
+        Number of leading dimensions to keep.
+    """
+
+    name = "MatryoshkaIndex"
+
+    def __init__(self, inner: BaseIndex | None = None, dim: int = 256) -> None:
+        if dim < 1:
+            raise ValueError("dim must be at least 1")
+        self.inner = inner if inner is not None else BruteForceIndex()
+        self.dim = dim
+
+    def empty_copy(self) -> MatryoshkaIndex:
+        return MatryoshkaIndex(inner=self.inner.empty_copy(), dim=self.dim)
+
+    def describe(self) -> str:
+        return f"{self.name}[{self.dim}]({self.inner.describe()})"
+
+    def build(self, vectors: List[List[float]], ids: Sequence[int]) -> None:
+        if not len(vectors):
+            self.inner.build([], ids)
+            return
+        mat = np.stack([np.asarray(v, dtype=np.float32) for v in vectors])
+        self.inner.build(_truncate(mat, self.dim), ids)
+
+    def search(
+        self, query: List[float], k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[Tuple[int, float]]:
+        q = _truncate(np.asarray(query, dtype=np.float32), self.dim)
+        return self.inner.search(q, k, exclude=exclude, **params)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: np.ndarray | None = None, **params
+    ) -> List[List[Tuple[int, float]]]:
+        return self.inner.search_batch(_truncate(np.asarray(queries), self.dim), k, exclude=exclude, **params)
+
+    def range_search(
+        self,
+        query: List[float],
+        min_similarity: float,
+        limit: int | None = None,
+        exclude: np.ndarray | None = None,
+        **params,
+    ) -> List[Tuple[int, float]]:
+        q = _truncate(np.asarray(query, dtype=np.float32), self.dim)
+        return self.inner.range_search(q, min_similarity, limit=limit, exclude=exclude, **params)
+
+    def _get_state(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray | BaseIndex]]:
+        return {"dim": self.dim}, {"inner": self.inner}
+
+    def _set_state(self, arrays: Dict[str, np.ndarray | BaseIndex]) -> None:
+        self.inner = arrays["inner"]
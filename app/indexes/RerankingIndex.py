@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .BaseIndex import BaseIndex
+from .BruteForceIndex import BruteForceIndex
+
+
+class RerankingIndex(BaseIndex):
+    """
+    Two-stage search around a fast, possibly approximate inner index.
+
+    The inner index (quantized, truncated-dimension, an approximate search budget...)
+    proposes `k * oversample` candidates, which are then rescored exactly against the
+    full-precision float32 vectors and cut down to the top-k. With a modest oversample
+    this recovers near-exact results while the first stage stays cheap.
+
+    The wrapper keeps no copy of the vectors: every search must pass `row_vectors`, a
+    callable mapping an int32 array of row ids to their full-precision vectors (a
+    Library reads them from its chunks).
+
+    Parameters
+    ----------
+    inner : BaseIndex | None
+        First-stage index. Defaults to a brute-force index.
+    oversample : int
+        Candidates fetched per result wanted; can be overridden per query.
+    """
+
+    name = "RerankingIndex"
+
+    def __init__(self, inner: BaseIndex | None = None, oversample: int = 4) -> None:
+        if oversample < 1:
+            raise ValueError("oversample must be at least 1")
+        self.inner = inner if inner is not None else BruteForceIndex()
+        self.oversample = oversample
+
+    def empty_copy(self) -> RerankingIndex:
+        return RerankingIndex(inner=self.inner.empty_copy(), oversample=self.oversample)
+
+    def describe(self) -> str:
+        return f"{self.name}({self.inner.describe()})"
+
+    def build(self, vectors: List[List[float]], ids: Sequence[int]) -> None:
+        if len(vectors) != len(ids):
+            raise ValueError("vectors and ids length mismatch")
+        self.inner.build(vectors, ids)
+
+    def search(
+        self,
+        query: List[float],
+        k: int,
+        exclude: np.ndarray | None = None,
+        oversample: int | None = None,
+        row_vectors: Callable[[np.ndarray], np.ndarray] | None = None,
+        **params,
+    ) -> List[Tuple[int, float]]:
+        """
+        Fetch `k * oversample` candidates from the inner index and return the exact top-k,
+        rescored on the vectors `row_vectors` returns for them. `params` (e.g. search
+        budgets) are passed through to the inner index.
+        """
+        if row_vectors is None:
+            raise ValueError("RerankingIndex.search needs row_vectors to rescore candidates")
+        if k <= 0:
+            return []
+        oversample = oversample or self.oversample
+        candidates = self.inner.search(query, k * oversample, exclude=exclude, **params)
+        if not candidates:
+            return []
+        rows = np.fromiter((row for row, _ in candidates), dtype=np.int32, count=len(candidates))
+        mat = np.asarray(row_vectors(rows), dtype=np.float32)
+        norms = np.linalg.norm(mat, axis=1)
+        norms[norms == 0] = 1.0
+        q = np.array(query, dtype=np.float32)
+        q /= (np.linalg.norm(q) or 1.0)
+        exact = (mat @ q) / norms
+        if params.get("stats") is not None:
+            params["stats"].distance_computations += len(rows)
+        top = np.argsort(-exact, kind="stable")[:k]
+        return [(int(rows[i]), float(exact[i])) for i in top]
+
+    def _get_state(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray | BaseIndex]]:
+        return {"oversample": self.oversample}, {"inner": self.inner}
+
+    def _set_state(self, arrays: Dict[str, np.ndarray | BaseIndex]) -> None:
+        self.inner = arrays["inner"]
@@ -2,7 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import FileResponse
+from app.api.debug_router import router as debug_router
 from app.api.library_router import router as library_router
+from app.api.metrics_router import router as metrics_router
+from app.api.middleware import MetricsMiddleware, TracingMiddleware
+from app.api.search_router import router as search_router
 from app.services import globals
 from app.services.VectorStore import VectorStore
 import os
@@ -23,12 +27,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 @app.get('/health')
 def health_check():
     return {"status": "ok"}
 
 app.include_router(library_router, prefix="/library", tags=["libraries"])
+app.include_router(search_router, tags=["search"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(debug_router, prefix="/debug", tags=["debug"])
 
 @app.on_event("startup")
 async def startup_event():
@@ -1,20 +1,39 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List
 from uuid import UUID
 from fastapi import HTTPException
 from app.core.Filter import Filter
-from app.core.Chunk import EMBEDDING_DIM, Chunk
+from app.core.Chunk import Chunk
 from app.core.Library import Library
 from app.indexes.BallTreeIndex import BallTreeIndex
+from app.indexes.BaseIndex import SearchStats
 from app.indexes.BruteForceIndex import BruteForceIndex
+from app.services.SearchBatcher import SearchBatcher
 from app.services.VectorStore import VectorStore
-from app.api.dto.Library import DeleteChunksDto, LibraryListItem, LibraryCreate, LibraryResponse, QueryDto, UpsertChunksDto
+from app.api.dto.Library import DeleteChunksDto, FederatedQueryDto, FederatedSearchHit, IndexName, LibraryListItem, LibraryCreate, LibraryResponse, QueryDto, RangeQueryDto, UpsertChunksDto, VectorDType
 from app.utils.filters import passes_filter
+from app.utils import tracing
 from app.utils.read_write_lock import ReadWriteLock
 # use this vector store to save everything in
-rw_lock = ReadWriteLock()
+rw_lock = ReadWriteLock("service")
 
 async def get_vector_store():
     return await VectorStore.get_instance()
 
+_search_batcher: SearchBatcher | None = None
+
+async def get_search_batcher() -> SearchBatcher | None:
+    """The shared search micro-batcher, or None unless SEARCH_BATCH_WINDOW_MS is set."""
+    global _search_batcher
+    if _search_batcher is None:
+        _search_batcher = SearchBatcher(await get_vector_store())
+    return _search_batcher if _search_batcher.window_ms > 0 else None
+
 async def get_library_lock(lib_id: str):
     vector_store = await get_vector_store()
     return vector_store.get_library_lock(UUID(lib_id))
@@ -44,8 +63,10 @@ async def get_library_by_id_service(lib_id: str):
             id=library.id,
             name=library.name,
             metadata=library.metadata,
-            total_chunks=len(library.chunks),
-            index_name=library.index_name
+            total_chunks=library.chunk_count,
+            index_name=library.index_name,
+            dimension=library.dimension,
+            dtype=library.dtype
         )
         return LibraryResponse.model_validate(library)
     except HTTPException:
@@ -61,32 +82,31 @@ async def create_library_service(libraryData: LibraryCreate):
     rw_lock.acquire_write()
     try:
         vector_store = await get_vector_store()
-        # Use the index_name if provided, else default
-        # index_instance = None
-        # index_name = None
-        # if hasattr(libraryData, 'index_name') and libraryData.index_name:
-        #     # Support both Enum and string
-        #     if hasattr(libraryData.index_name, 'value'):
-        #         index_name = libraryData.index_name.value
-        #     else:
-        #         index_name = str(libraryData.index_name)
-        #     if index_name == LibraryCreate.IndexNameEnum.BallTreeIndex.value:
-        #         index_instance = BallTreeIndex()
-        #     else:
-        #         index_instance = BruteForceIndex()
-        # else:
-        #     index_instance = BruteForceIndex()
+        index_name = (libraryData.index_name or IndexName.Auto).value
+        options = {}
+        if libraryData.dimension is not None:
+            options["dimension"] = libraryData.dimension
+        if libraryData.matryoshka_dim is not None:
+            options["matryoshka_dim"] = libraryData.matryoshka_dim
+        if libraryData.dtype is not None:
+            if libraryData.dtype == VectorDType.float16 and index_name == IndexName.BallTreeIndex.value:
+                raise HTTPException(status_code=400, detail="BallTreeIndex only stores float32 vectors.")
+            options["dtype"] = libraryData.dtype.value
         lib_id = vector_store.create_library(
-            libraryData.name, index_name="BallTreeIndex", metadata=libraryData.metadata)
+            libraryData.name, index_name=index_name, metadata=libraryData.metadata, **options)
         library = vector_store.get_library(lib_id)
         library = LibraryResponse(
             id=library.id,
             name=library.name,
             metadata=library.metadata,
-            total_chunks=len(library.chunks),
-            index_name=library.index_name
+            total_chunks=library.chunk_count,
+            index_name=library.index_name,
+            dimension=library.dimension,
+            dtype=library.dtype
         )
         return LibraryResponse.model_validate(library)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     finally:
@@ -156,6 +176,10 @@ async def upsert_chunks_service(upsertChunksDto: UpsertChunksDto, lib_id: str):
         hydrated_chunks = [
             Chunk.model_validate(obj=chunk) for chunk in upsertChunksDto.chunks
         ]
+        dimension = vector_store.get_library(UUID(lib_id)).dimension
+        if any(len(chunk.embedding) != dimension for chunk in hydrated_chunks):
+            raise HTTPException(
+                status_code=400, detail=f"Chunk embeddings must be of length {dimension}")
         filters = getattr(upsertChunksDto, 'filters', None)
         if filters:
             filter_obj = Filter(root=filters)
@@ -192,6 +216,7 @@ async def delete_chunks_by_library_service(deleteChunksDto: DeleteChunksDto, lib
         chunk_ids_to_delete = [chunk.id for chunk in filtered_chunks]
         if chunk_ids_to_delete:
             library.delete_chunks(chunk_ids_to_delete)
+            vector_store.schedule_rebuild(UUID(lib_id))
         return {"deleted": len(chunk_ids_to_delete)}
     except HTTPException:
         raise
@@ -218,36 +243,163 @@ async def count_chunks_by_library_service(lib_id: str):
     finally:
         lock.release_read()
 
-async def search_chunks_by_library_service(lib_id: str, queryDto: QueryDto, k: int = 5):
+def check_query_dimension(library: Library, query: List[float]) -> None:
+    """Reject a query vector whose length doesn't match the library's embedding dimension."""
+    if len(query) != library.dimension:
+        raise HTTPException(
+            status_code=400, detail=f"Query vector must be of length {library.dimension}")
+
+def explain_search(vector_store: VectorStore, lib_id: UUID, queryDto: QueryDto, k: int) -> Dict[str, Any]:
+    """
+    Run a search directly (never through the batcher) with a `SearchStats` attached, and
+    return the serialized results together with what the index did and where the time went.
+    """
+    start = time.perf_counter()
+    # pin one published version, so the row counts below describe the version searched;
+    # searches take no lock, so there is no lock wait to report
+    version = vector_store.get_library(lib_id).version
+    stats = SearchStats()
+    search_start = time.perf_counter()
+    candidates = vector_store.search(
+        lib_id, queryDto.query, k=k, version=version, stats=stats, **queryDto.search_params()
+    )
+    filter_start = time.perf_counter()
+    results = candidates
+    if queryDto.filters:
+        filter_obj = Filter(root=queryDto.filters)
+        with tracing.span("filter"):
+            results = [(chunk, score) for chunk, score in candidates if passes_filter(chunk.metadata, filter_obj)]
+    serialize_start = time.perf_counter()
+    payload = [[chunk.model_dump(mode="json"), score] for chunk, score in results]
+    end = time.perf_counter()
+    return {
+        "results": payload,
+        "explain": {
+            "index": version.index.describe(),
+            "indexed_rows": version.indexed_count,
+            "delta_rows": len(version.delta_rows),
+            "k": k,
+            "search_params": queryDto.search_params(),
+            **stats.to_dict(),
+            "candidates_before_filter": len(candidates),
+            "candidates_after_filter": len(results),
+            "timings_ms": {
+                "search": (filter_start - search_start) * 1000,
+                "filter": (serialize_start - filter_start) * 1000,
+                "serialization": (end - serialize_start) * 1000,
+                "total": (end - start) * 1000,
+            },
+        },
+    }
+
+async def search_chunks_by_library_service(lib_id: str, queryDto: QueryDto, k: int = 5, explain: bool = False):
     if not lib_id or not queryDto or not queryDto.query:
         raise HTTPException(status_code=422, detail="Library ID and query are required.")
-    lock = await get_library_lock(lib_id)
+    # no lock: searches run against the library's latest immutable version
     try:
-        lock.acquire_read()
         vector_store = await get_vector_store()
-        if len(queryDto.query) != EMBEDDING_DIM:
-            raise HTTPException(
-                status_code=400, detail=f"Query vector must be of length {EMBEDDING_DIM}")
         if not vector_store.has_library(UUID(lib_id)):
             raise HTTPException(status_code=404, detail="Library not found")
+        check_query_dimension(vector_store.get_library(UUID(lib_id)), queryDto.query)
+        if explain:
+            return explain_search(vector_store, UUID(lib_id), queryDto, k)
         filters = getattr(queryDto, 'filters', None)
         data = {"query": queryDto.query}
         if filters:
             data["filters"] = filters
-        results = vector_store.search(
-            UUID(lib_id), queryDto.query, k=k
-        )
+        batcher = await get_search_batcher()
+        if batcher is not None:
+            # the batch runs on a worker thread; time the whole wait here instead
+            with tracing.span("search"):
+                results = await batcher.search(
+                    UUID(lib_id), queryDto.query, k=k, **queryDto.search_params()
+                )
+        else:
+            results = vector_store.search(
+                UUID(lib_id), queryDto.query, k=k, **queryDto.search_params()
+            )
         if not filters:
             return results
         filter_obj = Filter(root=filters)
-        results = [
-            (chunk, score) for chunk, score in results
-            if passes_filter(chunk.metadata, filter_obj)
-        ]
+        with tracing.span("filter"):
+            results = [
+                (chunk, score) for chunk, score in results
+                if passes_filter(chunk.metadata, filter_obj)
+            ]
         return results
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    finally:
-        lock.release_read()
+
+async def range_search_chunks_by_library_service(lib_id: str, rangeQueryDto: RangeQueryDto):
+    """
+    Every chunk with similarity >= `min_similarity` to the query, best first.
+    Lock-free, like `search_chunks_by_library_service`.
+    """
+    try:
+        vector_store = await get_vector_store()
+        if not vector_store.has_library(UUID(lib_id)):
+            raise HTTPException(status_code=404, detail="Library not found")
+        check_query_dimension(vector_store.get_library(UUID(lib_id)), rangeQueryDto.query)
+        filters = rangeQueryDto.filters
+        # with filters, cap only after filtering or the limit would cut matches short
+        results = vector_store.range_search(
+            UUID(lib_id), rangeQueryDto.query, rangeQueryDto.min_similarity,
+            limit=None if filters else rangeQueryDto.limit,
+        )
+        if not filters:
+            return results
+        filter_obj = Filter(root=filters)
+        with tracing.span("filter"):
+            results = [
+                (chunk, score) for chunk, score in results
+                if passes_filter(chunk.metadata, filter_obj)
+            ]
+        return results[:rangeQueryDto.limit]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+async def search_libraries_service(queryDto: FederatedQueryDto, k: int = 5):
+    """
+    Search several libraries at once: every library is searched concurrently on the
+    default executor, and the per-library top-k lists are merged into a global top-k.
+    """
+    try:
+        vector_store = await get_vector_store()
+        lib_ids = list(dict.fromkeys(queryDto.library_ids))
+        missing = [str(lib_id) for lib_id in lib_ids if not vector_store.has_library(lib_id)]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Libraries not found: {', '.join(missing)}")
+        for lib_id in lib_ids:
+            check_query_dimension(vector_store.get_library(lib_id), queryDto.query)
+        filter_obj = Filter(root=queryDto.filters) if queryDto.filters else None
+        search_params = queryDto.search_params()
+        loop = asyncio.get_running_loop()
+        # run each search in a copy of this context so its spans land in the request's trace
+        per_library = await asyncio.gather(*(
+            loop.run_in_executor(
+                None, functools.partial(
+                    contextvars.copy_context().run, vector_store.search, lib_id, queryDto.query, k=k, **search_params
+                )
+            )
+            for lib_id in lib_ids
+        ))
+        # every per-library list is sorted best first, so a k-way heap merge yields the global order
+        tagged = (
+            [
+                FederatedSearchHit(library_id=lib_id, chunk=chunk, score=score)
+                for chunk, score in results
+                if filter_obj is None or passes_filter(chunk.metadata, filter_obj)
+            ]
+            for lib_id, results in zip(lib_ids, per_library)
+        )
+        # the filter runs lazily, as the merge pulls hits
+        with tracing.span("filter" if filter_obj is not None else "merge"):
+            return list(itertools.islice(heapq.merge(*tagged, key=lambda hit: -hit.score), k))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
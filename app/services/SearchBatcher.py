@@ -0,0 +1,91 @@
+from __future__ import annotations
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from app.core.Chunk import Chunk
+from app.services.VectorStore import VectorStore
+from app.utils import metrics
+
+# (library, k, search params): only queries that agree on all three can share a scan
+BatchKey = Tuple[UUID, int, Tuple[Tuple[str, Any], ...]]
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.queries: List[List[float]] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class SearchBatcher:
+    """
+    Coalesces concurrent single-query searches on the same library into one batched scan.
+
+    The first query for a library opens a batch; queries arriving within `window_ms`
+    join it, and the batch runs as soon as the window closes or it holds `max_batch`
+    queries. The batch is scored with one matrix-matrix product on a worker thread
+    (`VectorStore.search_batch`) and every waiting request gets its own results.
+
+    Opt-in: enabled by setting `SEARCH_BATCH_WINDOW_MS` to a positive value. A
+    batched query can wait up to the window before it starts, in exchange for much
+    higher throughput when many searches hit the same library at once.
+    """
+
+    def __init__(self, vector_store: VectorStore, window_ms: float | None = None,
+                 max_batch: int | None = None) -> None:
+        self._vector_store = vector_store
+        if window_ms is None:
+            window_ms = float(os.getenv("SEARCH_BATCH_WINDOW_MS") or 0)
+        self.window_ms = window_ms
+        self.max_batch = max_batch or int(os.getenv("SEARCH_BATCH_MAX_QUERIES") or 64)
+        self._open: Dict[BatchKey, _Batch] = {}
+        # batches being scored; the event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def search(
+        self, lib_id: UUID, query_vec: List[float], k: int = 5, **search_params
+    ) -> List[Tuple[Chunk, float]]:
+        """Same contract as `VectorStore.search`, but shares the scan with concurrent queries."""
+        key = (lib_id, k, tuple(sorted(search_params.items())))
+        loop = asyncio.get_running_loop()
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch()
+            batch.timer = loop.call_later(self.window_ms / 1000, self._flush, key, batch)
+        future = loop.create_future()
+        batch.queries.append(query_vec)
+        batch.futures.append(future)
+        metrics.EXECUTOR_QUEUE_DEPTH.labels("search-batcher").inc()
+        if len(batch.queries) >= self.max_batch:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: BatchKey, batch: _Batch) -> None:
+        """Close `batch` (if still open) and run it on the default executor."""
+        if self._open.get(key) is not batch:
+            return
+        del self._open[key]
+        metrics.EXECUTOR_QUEUE_DEPTH.labels("search-batcher").dec(len(batch.queries))
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.ensure_future(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: BatchKey, batch: _Batch) -> None:
+        lib_id, k, params = key
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                None, lambda: self._vector_store.search_batch(lib_id, batch.queries, k, **dict(params))
+            )
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
@@ -1,28 +1,63 @@
 from __future__ import annotations
 from typing import Dict, List, Optional, Tuple
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import numpy as np
 import pickle
 import aiofiles
 import asyncio
+import io
 import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from app.api.dto.Library import Chunk, IndexName
-from app.core.Chunk import Chunk
-from app.core.Library import Library
+from app.core.Chunk import EMBEDDING_DIM, Chunk
+from app.core.Library import Library, LibraryVersion
+from app.indexes.AutoIndex import AutoIndex
 from app.indexes.BallTreeIndex import BallTreeIndex
 from app.indexes.BaseIndex import BaseIndex
 from app.indexes.BruteForceIndex import BruteForceIndex
+from app.indexes.MatryoshkaIndex import MatryoshkaIndex
+from app.indexes.RerankingIndex import RerankingIndex
+from app.utils import metrics, tracing
 from app.utils.read_write_lock import ReadWriteLock
 
 
+class _RemovedClass:
+    """Placeholder for objects of app classes that no longer exist, see `_SnapshotUnpickler`."""
+
+    def __setstate__(self, state) -> None:
+        if isinstance(state, tuple):  # (dict, slots) from classes with __slots__
+            state = {k: v for part in state if part for k, v in part.items()}
+        self.__dict__.update(state or {})
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """
+    Snapshots written before indexes were saved separately pickle whole Library objects,
+    index internals included. Classes of this app that have since been removed (e.g. the
+    old ball tree's node class) load as `_RemovedClass`; those indexes are rebuilt anyway.
+    """
+
+    def find_class(self, module: str, name: str):
+        try:
+            return super().find_class(module, name)
+        except (AttributeError, ImportError):
+            if module == "app" or module.startswith("app."):
+                return _RemovedClass
+            raise
+
+
 class VectorStore:
     """
     A simple in-memory vector store that manages multiple `Libraries` and exposes a CRUD API to interact with them.
     """
     SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH') or './vectorstore_snapshot.pkl'
     SNAPSHOT_INTERVAL = 10  # seconds
+    REBUILD_WORKERS = 2  # background index rebuilds running at once
 
     _instance = None
     _instance_lock = asyncio.Lock()
@@ -30,19 +65,29 @@ class VectorStore:
     def __init__(self, index_factory=BruteForceIndex):
         self._libraries: Dict[UUID, Library] = {}
         self._index_factory = index_factory
-        # per-library helper: id -> Chunk (populated when index is (re)built)
-        self._chunk_lookup: Dict[UUID, Dict[UUID, Chunk]] = {}
         self._snapshot_lock = asyncio.Lock()
         self._library_locks: Dict[UUID, ReadWriteLock] = {}  # Per-library locks
-        self._global_lock = ReadWriteLock()  # For global operations
+        self._global_lock = ReadWriteLock("store")  # For global operations
+        # background index rebuilds; at most one in flight per library
+        self._rebuild_executor = ThreadPoolExecutor(
+            max_workers=self.REBUILD_WORKERS, thread_name_prefix="index-rebuild")
+        self._rebuilding: set[UUID] = set()
+        self._rebuilding_lock = threading.Lock()
+        # lib id -> (index object, dir under index_dir) it was last saved to
+        self._saved_indexes: Dict[UUID, Tuple[BaseIndex, str]] = {}
 
     @classmethod
     async def create(cls, index_factory=BruteForceIndex):
         store = cls(index_factory)
         await store.load_from_disk_async()
         store._start_snapshot_thread()
+        metrics.LIBRARY_CHUNKS.set_function(store._chunk_counts)
         return store
 
+    def _chunk_counts(self) -> Dict[Tuple[str], int]:
+        """Live chunks per library, for the `vectordb_library_chunks` gauge."""
+        return {(str(lib_id),): library.chunk_count for lib_id, library in list(self._libraries.items())}
+
     @classmethod
     async def get_instance(cls, index_factory=BruteForceIndex):
         if cls._instance is None:
@@ -53,15 +98,50 @@ class VectorStore:
 
     def get_library_lock(self, lib_id: UUID) -> ReadWriteLock:
         if lib_id not in self._library_locks:
-            self._library_locks[lib_id] = ReadWriteLock()
+            self._library_locks[lib_id] = ReadWriteLock(f"library:{lib_id}")
         return self._library_locks[lib_id]
 
-    def create_library(self, name: str, index_name: str, metadata: dict | None = None) -> UUID:
-        index = BruteForceIndex() if index_name == IndexName.BruteForceIndex.value else BallTreeIndex()
-        lib = Library(name=name, metadata=metadata or {}, index=index)
+    # index types a library can be created with, by `IndexName` value
+    INDEX_TYPES: Dict[str, type[BaseIndex]] = {
+        IndexName.BruteForceIndex.value: BruteForceIndex,
+        IndexName.BallTreeIndex.value: BallTreeIndex,
+        IndexName.Auto.value: AutoIndex,
+    }
+    # index types that can store their vectors at a library's dtype
+    DTYPE_INDEX_TYPES: Tuple[type[BaseIndex], ...] = (BruteForceIndex, AutoIndex)
+
+    def create_library(
+        self,
+        name: str,
+        index_name: str,
+        metadata: dict | None = None,
+        matryoshka_dim: int | None = None,
+        dtype: str = "float32",
+        dimension: int = EMBEDDING_DIM,
+    ) -> UUID:
+        """
+        Create an empty library for `dimension`-long embeddings. With `matryoshka_dim`, the
+        chosen index is built over the first `matryoshka_dim` dimensions only and its
+        candidates are rescored on the full vectors. `dtype` is the precision the library
+        and its brute-force scans store embeddings at.
+        """
+        if index_name not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_name!r}")
+        if matryoshka_dim is not None and matryoshka_dim > dimension:
+            raise ValueError(f"matryoshka_dim must not exceed the library dimension ({dimension})")
+        index_cls = self.INDEX_TYPES[index_name]
+        if dtype == "float32":
+            index = index_cls()
+        elif issubclass(index_cls, self.DTYPE_INDEX_TYPES):
+            index = index_cls(dtype=dtype)
+        else:
+            raise ValueError(f"{index_name} only stores float32 vectors")
+        if matryoshka_dim is not None:
+            index = RerankingIndex(MatryoshkaIndex(index, dim=matryoshka_dim))
+        lib = Library(name=name, metadata=metadata or {}, dimension=dimension, dtype=dtype, index=index)
         lib.build_index(index)
         self._libraries[lib.id] = lib
-        self._library_locks[lib.id] = ReadWriteLock()  # Add lock for new library
+        self._library_locks[lib.id] = ReadWriteLock(f"library:{lib.id}")  # Add lock for new library
         return lib.id
 
     def get_library(self, lib_id: UUID) -> Library:
@@ -75,8 +155,8 @@ class VectorStore:
         library = self._libraries[library_id]
         library.upsert_chunks(chunks)
 
-        # rebuild index and chunk lookup after upsert
-        self.build_index(library_id)
+        # new chunks are served from the library's delta buffer; the index catches up in the background
+        self.schedule_rebuild(library_id)
 
     def get_all_chunks(self, lib_id: UUID) -> List[Chunk]:
         """
@@ -90,8 +170,9 @@ class VectorStore:
         if lib_id not in self._libraries:
             raise KeyError(f"Library with ID {lib_id} does not exist.")
         self._libraries.pop(lib_id)
-        self._chunk_lookup.pop(lib_id, None)
         self._library_locks.pop(lib_id, None)  # Remove lock for deleted library
+        metrics.REGISTRY.forget(library=str(lib_id))
+        metrics.REGISTRY.forget(lock=f"library:{lib_id}")
 
     def get_all_libraries(self) -> Tuple[Library, ...]:
         """
@@ -107,69 +188,236 @@ class VectorStore:
 
     def build_index(self, lib_id: UUID, index_cls: type[BaseIndex] | None = None) -> None:
         """
-        (Re)build the index for one library and refresh its chunk-lookup table.
+        (Re)build the index for one library, keeping its current index type unless
+        `index_cls` is given.
         """
         lib = self._libraries[lib_id]
-        index = (index_cls or self._index_factory)()
+        if index_cls is not None:
+            index = index_cls()
+        elif lib.index is not None:
+            index = lib.index.empty_copy()
+        else:
+            index = self._index_factory()
+        start = time.perf_counter()
         lib.build_index(index)
+        metrics.INDEX_BUILD_SECONDS.labels(lib_id, index.describe()).observe(time.perf_counter() - start)
 
-        # rebuild quick lookup
-        self._chunk_lookup[lib_id] = {
-            chunk.id: chunk
-            for chunk in lib.chunks
-        }
+    def schedule_rebuild(self, lib_id: UUID, force: bool = False) -> None:
+        """
+        Rebuild a library's index in the background if its delta buffer has grown past the
+        threshold or too many of its rows are tombstoned (or unconditionally with `force`).
+        The rebuild doubles as compaction: it indexes only live chunks, renumbering rows.
+        Searches keep using the current index until the new one is swapped in.
+        """
+        library = self._libraries.get(lib_id)
+        if library is None or not (force or library.needs_rebuild):
+            return
+        with self._rebuilding_lock:
+            if lib_id in self._rebuilding:
+                return
+            self._rebuilding.add(lib_id)
+        metrics.EXECUTOR_QUEUE_DEPTH.labels("index-rebuild").inc()
+        self._rebuild_executor.submit(self._rebuild_in_background, lib_id)
+
+    def _rebuild_in_background(self, lib_id: UUID) -> None:
+        """
+        Snapshot the published version and build with no lock held, swap under the write lock.
+        """
+        metrics.EXECUTOR_QUEUE_DEPTH.labels("index-rebuild").dec()
+        rebuilt = False
+        try:
+            lock = self._library_locks.get(lib_id)
+            library = self._libraries.get(lib_id)
+            if lock is None or library is None:
+                return
+            seq, vectors, table, row_chunks = library.snapshot_for_rebuild()
+            index = library.index.empty_copy() if library.index else self._index_factory()
+            start = time.perf_counter()
+            index.build(vectors, np.arange(len(table), dtype=np.int32))
+            metrics.INDEX_BUILD_SECONDS.labels(lib_id, index.describe()).observe(time.perf_counter() - start)
+            with lock.write_lock():
+                # the library may have been deleted while we were building
+                if self._libraries.get(lib_id) is library:
+                    rebuilt = library.swap_index(index, seq, table, row_chunks)
+        except Exception as e:
+            # Log the error, but do not crash the background task
+            print(f"Something went wrong rebuilding the index for library {lib_id}: {e}")
+        finally:
+            with self._rebuilding_lock:
+                self._rebuilding.discard(lib_id)
+        if rebuilt:
+            # writes may have piled up again while we were building
+            self.schedule_rebuild(lib_id)
 
     def search(
-        self, lib_id: UUID, query_vec: List[float], k: int = 5
+        self, lib_id: UUID, query_vec: List[float], k: int = 5,
+        version: LibraryVersion | None = None, **search_params
     ) -> List[Tuple[Chunk, float]]:
         """
         Return [(Chunk, similarity)] sorted by similarity desc.
+
+        Runs against `version`, by default the library's latest published one, and takes
+        no lock: hits and the chunks they resolve to come from the same immutable snapshot.
+        Hits come back as row ids and are resolved to chunks with one gather on the row arena.
+        """
+        library = self._libraries[lib_id]
+        version = version or library.version
+        with metrics.INDEX_SEARCH_SECONDS.labels(lib_id, library.index_name, "search").time(), tracing.span("search"):
+            rows, scores = version.search_rows(query_vec, k, **search_params)
+        return list(zip(version.row_chunks[rows].tolist(), scores.tolist()))
+
+    def range_search(
+        self, lib_id: UUID, query_vec: List[float], min_similarity: float,
+        limit: int | None = None, **search_params
+    ) -> List[Tuple[Chunk, float]]:
+        """
+        Return [(Chunk, similarity)] for every chunk with similarity >= `min_similarity`,
+        sorted by similarity desc and capped at `limit`. Lock-free, like `search`.
+        """
+        library = self._libraries[lib_id]
+        version = library.version
+        with metrics.INDEX_SEARCH_SECONDS.labels(lib_id, library.index_name, "range_search").time(), tracing.span("search"):
+            rows, scores = version.range_search_rows(query_vec, min_similarity, limit, **search_params)
+        return list(zip(version.row_chunks[rows].tolist(), scores.tolist()))
+
+    def search_batch(
+        self, lib_id: UUID, query_vecs: List[List[float]], k: int = 5, **search_params
+    ) -> List[List[Tuple[Chunk, float]]]:
+        """
+        `search` for several queries against the same library, scanned as one batch.
+        Every query sees the same published version.
+        """
+        library = self._libraries[lib_id]
+        version = library.version
+        with metrics.INDEX_SEARCH_SECONDS.labels(lib_id, library.index_name, "search_batch").time(), tracing.span("search"):
+            batch = version.search_rows_batch(query_vecs, k, **search_params)
+        return [
+            list(zip(version.row_chunks[rows].tolist(), scores.tolist()))
+            for rows, scores in batch
+        ]
+
+    @property
+    def index_dir(self) -> str:
+        """Directory holding the saved indexes that the snapshot at SNAPSHOT_PATH refers to."""
+        return self.SNAPSHOT_PATH + '.indexes'
+
+    def _save_index(self, lib_id: UUID, index: BaseIndex) -> str:
+        """
+        Save a library's index under `index_dir` and return its sub-directory name.
+        Built indexes are never mutated, so one that was already saved is reused as-is.
         """
-        hits = self._libraries[lib_id].search(query_vec, k)
-        lookup = self._chunk_lookup.get(lib_id)  # populated by build_index()
-        if lookup is None:
-            raise RuntimeError("Index has not been built for this library")
-        return [(lookup[cid], score) for cid, score in hits]
+        saved = self._saved_indexes.get(lib_id)
+        if saved is not None and saved[0] is index and os.path.isdir(os.path.join(self.index_dir, saved[1])):
+            return saved[1]
+        dirname = f"{lib_id}-{uuid4().hex[:8]}"
+        path = os.path.join(self.index_dir, dirname)
+        index.save(path)
+        self._saved_indexes[lib_id] = (index, dirname)
+        metrics.SNAPSHOT_BYTES.labels("indexes").inc(sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+        ))
+        return dirname
+
+    def _prune_index_dirs(self, keep: set[str]) -> None:
+        """Remove saved indexes the current snapshot no longer refers to."""
+        if not os.path.isdir(self.index_dir):
+            return
+        for dirname in os.listdir(self.index_dir):
+            if dirname not in keep:
+                shutil.rmtree(os.path.join(self.index_dir, dirname), ignore_errors=True)
 
     async def save_to_disk_async(self):
-        # Lock all library locks and the global lock before saving
+        """
+        Snapshot the store: libraries (chunks and delta buffers) are pickled to SNAPSHOT_PATH,
+        and each index is written as raw NumPy arrays under `index_dir` so a restart can
+        memory-map it instead of rebuilding or unpickling it.
+        """
+        # Lock all library locks and the global lock before saving. Libraries can still be
+        # created or deleted while the index saves below are awaited (that goes through the
+        # service lock), so work from copies taken now, and release exactly what was acquired.
         self._global_lock.acquire_write()
-        for lock in self._library_locks.values():
+        locks = list(self._library_locks.values())
+        for lock in locks:
             lock.acquire_write()
+        libraries = list(self._libraries.items())
+        start = time.perf_counter()
         try:
             async with self._snapshot_lock:
+                index_dirs = {}
+                for lib_id, library in libraries:
+                    if library.index is not None:
+                        index_dirs[lib_id] = await asyncio.to_thread(self._save_index, lib_id, library.index)
+                payload = pickle.dumps({
+                    'libraries': {lib_id: library.to_snapshot() for lib_id, library in libraries},
+                    'index_dirs': index_dirs,
+                })
                 async with aiofiles.open(self.SNAPSHOT_PATH + '.tmp', 'wb') as f:
-                    await f.write(pickle.dumps({
-                        'libraries': self._libraries,
-                        'chunk_lookup': self._chunk_lookup
-                    }))
+                    await f.write(payload)
                 os.replace(self.SNAPSHOT_PATH + '.tmp', self.SNAPSHOT_PATH)
+                self._prune_index_dirs(set(index_dirs.values()))
+                metrics.SNAPSHOT_BYTES.labels("libraries").inc(len(payload))
+                metrics.SNAPSHOT_SECONDS.observe(time.perf_counter() - start)
         except Exception as e:
             # Log the error, but do not crash the background task
             print(f"Something went wrong trying to save the snapshot: {e}")
 
         finally:
-            for lock in self._library_locks.values():
+            for lock in locks:
                 lock.release_write()
             self._global_lock.release_write()
 
+    def _restore_library(self, lib_id: UUID, state: dict | Library, dirname: str | None) -> Library:
+        # snapshots written before indexes were saved separately hold whole Library objects
+        if isinstance(state, Library):
+            return self._restore_legacy_library(state)
+        index = None
+        if dirname is not None:
+            try:
+                index = BaseIndex.load(os.path.join(self.index_dir, dirname), mmap=True)
+                self._saved_indexes[lib_id] = (index, dirname)
+            except Exception as e:
+                print(f"Could not load the saved index for library {lib_id}, rebuilding it: {e}")
+        library = Library.from_snapshot(state, index)
+        if index is None or "row_chunks" not in state:
+            # rebuild with the library's own index configuration, when the snapshot has it
+            config = state.get("index_config")
+            library.build_index(BaseIndex.from_config(config) if config else self._index_factory())
+        return library
+
+    def _restore_legacy_library(self, legacy: Library) -> Library:
+        """
+        Rebuild a Library that an older version pickled whole. Its private state predates
+        the row table and delta buffer (it unpickles as None), so only the public fields
+        are kept and the index is rebuilt, as the same index type where that still exists.
+        """
+        fields = vars(legacy)
+        old_index = fields.get("index")
+        index = type(old_index)() if isinstance(old_index, BaseIndex) else self._index_factory()
+        library = Library(id=fields["id"], name=fields["name"], metadata=fields["metadata"], chunks=fields["chunks"])
+        library.build_index(index)
+        return library
+
     async def load_from_disk_async(self):
         # Lock all library locks and the global lock before loading
         self._global_lock.acquire_write()
-        for lock in self._library_locks.values():
+        locks = list(self._library_locks.values())
+        for lock in locks:
             lock.acquire_write()
         try:
             if os.path.exists(self.SNAPSHOT_PATH):
                 async with self._snapshot_lock:
                     async with aiofiles.open(self.SNAPSHOT_PATH, 'rb') as f:
                         file_content = await f.read()
-                        data = pickle.loads(file_content)
-                        self._libraries = data.get('libraries', {})
-                        self._chunk_lookup = data.get('chunk_lookup', {})
+                        data = _SnapshotUnpickler(io.BytesIO(file_content)).load()
+                        index_dirs = data.get('index_dirs', {})
+                        self._libraries = {
+                            lib_id: self._restore_library(lib_id, state, index_dirs.get(lib_id))
+                            for lib_id, state in data.get('libraries', {}).items()
+                        }
         except Exception as e:
             print("Something went wrong trying to load the snapshot", e)
         finally:
-            for lock in self._library_locks.values():
+            for lock in locks:
                 lock.release_write()
             self._global_lock.release_write()
 
@@ -182,4 +430,4 @@ class VectorStore:
                 except Exception as e:
                     # Log the error, but do not crash the background task
                     print(f"Something wentt wrong trying to start the snapshot task: {e}")
-        asyncio.create_task(snapshot_loop())
+        asyncio.create_task(snapshot_loop(), name="snapshot")
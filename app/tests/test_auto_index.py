@@ -0,0 +1,52 @@
+import numpy as np
+
+from ..indexes.AutoIndex import AutoIndex
+from ..indexes.BaseIndex import BaseIndex
+from ..indexes.BallTreeIndex import BallTreeIndex
+from ..indexes.BruteForceIndex import BruteForceIndex
+
+
+def _make_dataset(n: int, d: int = 16):
+    vecs = np.random.randn(n, d).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return list(vecs), list(range(n))
+
+
+def test_switches_to_tree_past_threshold():
+    vecs, ids = _make_dataset(40)
+    ix = AutoIndex(threshold=50)
+    ix.build(vecs, ids)
+    assert isinstance(ix._inner, BruteForceIndex)
+    assert ix.search(vecs[0], k=1)[0][0] == ids[0]
+
+    # a rebuild after the library grew migrates to the tree
+    bigger = ix.empty_copy()
+    more_vecs, more_ids = _make_dataset(60)
+    bigger.build(more_vecs, more_ids)
+    assert isinstance(bigger._inner, BallTreeIndex)
+    assert bigger.search(more_vecs[5], k=1)[0][0] == more_ids[5]
+
+
+def test_small_libraries_skip_calibration(monkeypatch):
+    from ..indexes import AutoIndex as auto_module
+
+    def fail(dim):
+        raise AssertionError("calibration should not run for small libraries")
+
+    monkeypatch.setattr(auto_module, "calibrate_threshold", fail)
+    vecs, ids = _make_dataset(10)
+    ix = AutoIndex()
+    ix.build(vecs, ids)
+    assert ix.inner_name == "BruteForceIndex"
+
+
+def test_save_and_load_keeps_inner_index(tmp_path):
+    vecs, ids = _make_dataset(60)
+    ix = AutoIndex(threshold=50)
+    ix.build(vecs, ids)
+    ix.save(str(tmp_path / "auto"))
+
+    loaded = BaseIndex.load(str(tmp_path / "auto"))
+    assert isinstance(loaded, AutoIndex) and loaded.threshold == 50
+    assert loaded.inner_name == "BallTreeIndex"
+    assert loaded.search(vecs[3], k=3) == ix.search(vecs[3], k=3)
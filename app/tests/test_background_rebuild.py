@@ -0,0 +1,53 @@
+import time
+import numpy as np
+import pytest
+
+from app.services.VectorStore import VectorStore
+from app.core.Chunk import EMBEDDING_DIM, Chunk
+from app.core.Library import Library
+from app.indexes.BallTreeIndex import BallTreeIndex
+
+
+def _random_chunks(n: int) -> list[Chunk]:
+    rng = np.random.default_rng(0)
+    return [Chunk(embedding=rng.standard_normal(EMBEDDING_DIM).tolist(), metadata={"text": str(i)}) for i in range(n)]
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_upsert_triggers_background_rebuild(monkeypatch):
+    monkeypatch.setattr(Library, "DELTA_REBUILD_THRESHOLD", 8)
+    store = VectorStore()
+    lib_id = store.create_library("bg", index_name="BallTreeIndex")
+    library = store.get_library(lib_id)
+    initial_index = library.index
+
+    chunks = _random_chunks(20)
+    store.upsert_chunks(lib_id, chunks)
+
+    # searches work straight away, served from the delta buffer
+    top_chunk, score = store.search(lib_id, chunks[3].embedding, k=1)[0]
+    assert top_chunk.id == chunks[3].id
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+    assert _wait_for(lambda: library.index is not initial_index and not library.needs_rebuild)
+    assert isinstance(library.index, BallTreeIndex)
+    assert store.search(lib_id, chunks[5].embedding, k=1)[0][0].id == chunks[5].id
+
+
+def test_small_upserts_do_not_rebuild():
+    store = VectorStore()
+    lib_id = store.create_library("bg", index_name="BruteForceIndex")
+    library = store.get_library(lib_id)
+    initial_index = library.index
+
+    store.upsert_chunks(lib_id, _random_chunks(3))
+    time.sleep(0.05)
+    assert library.index is initial_index
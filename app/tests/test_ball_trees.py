@@ -1,9 +1,10 @@
 # tests/test_ball_tree.py
 import numpy as np
 import pytest
-from uuid import uuid4
 
 from ..indexes.BallTreeIndex import BallTreeIndex
+from ..indexes.BaseIndex import SearchStats
+from ..indexes.BruteForceIndex import BruteForceIndex
 from ..core.Chunk import EMBEDDING_DIM
 
 
@@ -13,7 +14,7 @@ def _make_dataset(n: int = 200, d: int = EMBEDDING_DIM):
     """
     vecs = np.random.randn(n, d).astype(np.float32)
     vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
-    ids = [uuid4() for _ in range(n)]
+    ids = list(range(n))
     return vecs, ids
 
 
@@ -56,3 +57,172 @@ def test_empty_index_behaviour():
     bt.build([], [])
     with pytest.raises(RuntimeError):
         bt.search(np.zeros(8, dtype=np.float32), k=1)
+
+
+def test_top_k_matches_brute_force():
+    """
+    Best-first search must stay exact: the top-k ids and scores match a full scan.
+    """
+    vecs, ids = _make_dataset(n=500, d=64)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+
+    q = vecs[3] + 0.1 * np.random.randn(64).astype(np.float32)
+    brute_cos = vecs @ q / np.linalg.norm(q)
+    expected = np.argsort(-brute_cos)[:10]
+
+    top = bt.search(q, k=10)
+    assert [uid for uid, _ in top] == [ids[i] for i in expected]
+    assert np.allclose([s for _, s in top], brute_cos[expected], atol=1e-5)
+
+
+def test_random_queries_are_exact():
+    """
+    The pruning bound must never skip a true neighbour, whatever the query.
+    """
+    rng = np.random.default_rng(0)
+    vecs, ids = _make_dataset(n=300, d=16)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+
+    for q in rng.standard_normal((200, 16)).astype(np.float32):
+        expected = np.argsort(-(vecs @ q))[:10]
+        assert [uid for uid, _ in bt.search(q, k=10)] == [ids[i] for i in expected]
+
+
+def test_flat_layout_leaves_are_contiguous_ranges():
+    """
+    Every point lands in exactly one leaf, and each internal node's range is the
+    concatenation of its children's ranges.
+    """
+    vecs, ids = _make_dataset(n=300, d=16)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+
+    leaves = bt._left == -1
+    assert (bt._end[leaves] - bt._start[leaves]).sum() == 300
+    assert np.all(bt._end[leaves] - bt._start[leaves] <= 8)
+    internal = np.flatnonzero(~leaves)
+    assert np.all(bt._start[bt._left[internal]] == bt._start[internal])
+    assert np.all(bt._end[bt._left[internal]] == bt._start[bt._right[internal]])
+    assert np.all(bt._end[bt._right[internal]] == bt._end[internal])
+    assert sorted(bt._perm.tolist()) == list(range(300))
+
+
+def test_duplicate_vectors_do_not_recurse_forever():
+    """
+    Identical points can't be split by projection; they should end up in one leaf.
+    """
+    vec = np.random.randn(16).astype(np.float32)
+    ids = list(range(50))
+    bt = BallTreeIndex(leaf_size=4)
+    bt.build([vec] * 50, ids)
+    assert len(bt.search(vec, k=5)) == 5
+
+
+def test_search_budget_returns_best_so_far():
+    """
+    A leaf budget still yields k results, and an unconstrained search is at least as good.
+    """
+    vecs, ids = _make_dataset(n=400, d=32)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+
+    q = vecs[7]
+    exact = bt.search(q, k=5)
+    budgeted = bt.search(q, k=5, max_leaves=1)
+    assert len(budgeted) == 5
+    assert exact[-1][1] >= budgeted[-1][1] - 1e-6
+
+    assert len(bt.search(q, k=5, max_distance_evals=1)) == 5
+    assert len(bt.search(q, k=5, slack=10.0)) == 5
+    with pytest.raises(ValueError):
+        bt.search(q, k=5, slack=-1.0)
+
+
+def test_parallel_build_matches_serial_build():
+    """
+    Building subtrees on a thread pool must produce exactly the same tree.
+    """
+    vecs, ids = _make_dataset(n=1000, d=16)
+    serial = BallTreeIndex(leaf_size=8, n_jobs=1)
+    serial.build(list(vecs), ids)
+
+    parallel = BallTreeIndex(leaf_size=8, n_jobs=4)
+    parallel.PARALLEL_MIN_POINTS = 64
+    parallel.build(list(vecs), ids)
+
+    assert np.array_equal(serial._perm, parallel._perm)
+    assert np.array_equal(serial._left, parallel._left)
+    assert np.array_equal(serial._right, parallel._right)
+    assert np.allclose(serial._centers, parallel._centers)
+    assert serial.search(vecs[0], k=5) == parallel.search(vecs[0], k=5)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """
+    A saved tree loads back (memory-mapped) and answers queries identically.
+    """
+    vecs, ids = _make_dataset(n=200, d=32)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+    bt.save(str(tmp_path / "tree"))
+
+    loaded = BallTreeIndex.load(str(tmp_path / "tree"), mmap=True)
+    assert isinstance(loaded._vectors, np.memmap)
+    assert loaded.leaf_size == 8
+    assert loaded.search(vecs[1], k=5) == bt.search(vecs[1], k=5)
+
+
+def test_tombstoned_rows_are_never_returned():
+    """
+    Rows set in the exclude bitmap are skipped, and the top-k is filled from the rest.
+    """
+    vecs, ids = _make_dataset(n=300, d=16)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+
+    exclude = np.zeros(len(ids), dtype=bool)
+    exclude[::3] = True
+    live = [i for i in range(len(ids)) if not exclude[i]]
+    brute = BruteForceIndex()
+    brute.build([vecs[i] for i in live], [ids[i] for i in live])
+
+    got = bt.search(vecs[0], k=10, exclude=exclude)
+    excluded = {ids[i] for i in np.flatnonzero(exclude)}
+    assert len(got) == 10 and not excluded & {cid for cid, _ in got}
+    expected = brute.search(vecs[0], k=10)
+    assert [s for _, s in got] == pytest.approx([s for _, s in expected], abs=1e-5)
+
+
+def test_range_search_matches_threshold_scan():
+    """
+    Range search returns exactly the points above the threshold, best first.
+    """
+    vecs, ids = _make_dataset(n=400, d=8)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+
+    sims = vecs @ vecs[0]
+    expected = sorted(np.flatnonzero(sims >= 0.5), key=lambda i: -sims[i])
+    got = bt.range_search(vecs[0], min_similarity=0.5)
+    assert [row for row, _ in got] == [ids[i] for i in expected]
+    assert bt.range_search(vecs[0], min_similarity=0.5, limit=3) == got[:3]
+
+
+def test_search_stats_count_the_traversal():
+    vecs, ids = _make_dataset(n=256, d=32)
+    bt = BallTreeIndex(leaf_size=8)
+    bt.build(list(vecs), ids)
+
+    stats = SearchStats()
+    bt.search(vecs[0], k=3, stats=stats)
+    # every node is either expanded/scanned or skipped, never both
+    assert 0 < stats.nodes_visited + stats.nodes_pruned <= bt.node_count
+    assert stats.leaves_scanned >= 1
+    assert stats.distance_computations > stats.leaves_scanned
+
+    budgeted = SearchStats()
+    bt.search(vecs[0], k=3, max_leaves=1, stats=budgeted)
+    assert budgeted.leaves_scanned == 1
+    assert budgeted.nodes_pruned >= 1
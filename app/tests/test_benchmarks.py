@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+
+from benchmarks.__main__ import main
+from benchmarks.datasets import synthetic_dataset
+from benchmarks.indexes import run
+from benchmarks.load import parse_mix, run as run_load
+from benchmarks.recall import pareto_front, run as run_recall
+
+
+def test_synthetic_dataset_is_unit_norm_and_seeded():
+    vectors, queries = synthetic_dataset(100, 8, n_queries=5, clusters=4, seed=1)
+    assert vectors.shape == (100, 8) and queries.shape == (5, 8)
+    assert vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    again, _ = synthetic_dataset(100, 8, n_queries=5, clusters=4, seed=1)
+    assert np.array_equal(vectors, again)
+
+
+def test_index_benchmark_reports_every_metric():
+    report = run(n=300, d=16, n_queries=8, k=5, batch_size=4, indexes=["BruteForceIndex", "BallTreeIndex"])
+    assert [r["name"] for r in report["results"]] == ["BruteForceIndex", "BallTreeIndex"]
+    for result in report["results"]:
+        assert result["build_seconds"] >= 0
+        assert result["search"]["qps"] > 0
+        assert result["search"]["p50_ms"] <= result["search"]["p99_ms"]
+        assert result["batch_search"]["qps"] > 0
+        assert result["build_peak_bytes"] > 0
+
+
+def test_cli_writes_json(tmp_path):
+    out = tmp_path / "bench.json"
+    assert main(["indexes", "--n", "200", "--d", "8", "--queries", "4",
+                 "--index", "BruteForceIndex", "--no-memory", "--output", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert report["config"]["n"] == 200
+    assert "build_peak_bytes" not in report["results"][0]
+
+
+def test_recall_sweep_against_exact_ground_truth():
+    report = run_recall(n=400, d=16, n_queries=10, k=5, indexes=["BruteForceIndex", "BallTreeIndex"])
+    exact = [p for p in report["results"] if p["name"] == "BruteForceIndex"]
+    assert exact[0]["recall"] == 1.0
+    tree = {json.dumps(p["params"]): p["recall"] for p in report["results"] if p["name"] == "BallTreeIndex"}
+    assert tree["{}"] == 1.0  # unbudgeted ball-tree search is exact
+    assert tree['{"max_leaves": 1}'] <= 1.0
+    assert report["pareto"]
+
+
+def test_pareto_front_drops_dominated_points():
+    points = [
+        {"name": "a", "recall": 0.9, "qps": 100.0},
+        {"name": "b", "recall": 0.8, "qps": 50.0},   # slower and worse than a
+        {"name": "c", "recall": 1.0, "qps": 10.0},
+        {"name": "d", "recall": 0.5, "qps": 500.0},
+    ]
+    assert [p["name"] for p in pareto_front(points)] == ["d", "a", "c"]
+
+
+def test_load_generator_records_and_replays_in_process(tmp_path, monkeypatch):
+    from app.services.VectorStore import VectorStore
+    monkeypatch.setattr(VectorStore, "_instance", None)
+    monkeypatch.setattr(VectorStore, "SNAPSHOT_PATH", str(tmp_path / "snapshot.pkl"))
+
+    recording = tmp_path / "ops.jsonl"
+    report = run_load(libraries=2, seed_chunks=20, dim=8, concurrency=4, requests=40,
+                      mix=parse_mix("search=3,upsert=1,count=1,delete=1"), record=str(recording))
+    assert report["total"]["requests"] == 40
+    assert report["total"]["errors"] == 0
+    assert set(report["endpoints"]) <= {"search", "upsert", "count", "delete"}
+    assert report["endpoints"]["search"]["p50_ms"] > 0
+
+    monkeypatch.setattr(VectorStore, "_instance", None)
+    replayed = run_load(libraries=2, seed_chunks=20, dim=8, concurrency=2, replay=str(recording))
+    assert replayed["total"]["requests"] == 40
+    assert {name: e["requests"] for name, e in replayed["endpoints"].items()} == \
+        {name: e["requests"] for name, e in report["endpoints"].items()}
+
+
+def test_duration_bounded_recording_holds_exactly_the_issued_ops(tmp_path, monkeypatch):
+    from app.services.VectorStore import VectorStore
+    monkeypatch.setattr(VectorStore, "_instance", None)
+    monkeypatch.setattr(VectorStore, "SNAPSHOT_PATH", str(tmp_path / "snapshot.pkl"))
+
+    recording = tmp_path / "ops.jsonl"
+    report = run_load(libraries=1, seed_chunks=10, dim=8, concurrency=2, requests=None, duration=0.5,
+                      mix=parse_mix("search=1"), record=str(recording))
+    # ops are generated while the clock runs, not all up front and then driven unbounded
+    assert report["duration_seconds"] < 5
+    assert len(recording.read_text().splitlines()) == report["total"]["requests"] > 0
@@ -1,10 +1,10 @@
 import numpy as np
-from uuid import uuid4
 from pytest import approx
+from ..indexes.BaseIndex import BaseIndex
 from ..indexes.BruteForceIndex import BruteForceIndex
 
 def test_bruteforce_index_basic():
-    ids   = [uuid4() for _ in range(3)]
+    ids   = [10, 11, 12]
     vecs  = [np.array([1, 0, 0], dtype=np.float32),
              np.array([0, 1, 0], dtype=np.float32),
              np.array([0, 0, 1], dtype=np.float32)]
@@ -20,3 +20,69 @@ def test_bruteforce_index_basic():
     assert top[0][0] == ids[0] and approx(top[0][1], rel=1e-1) == 0.9
     # second neighbour should be the second vector (cos ~0.1)
     assert top[1][0] == ids[1]
+
+
+def test_bruteforce_save_and_load(tmp_path):
+    ids  = [10, 11, 12]
+    vecs = [np.array([1, 0, 0], dtype=np.float32),
+            np.array([0, 1, 0], dtype=np.float32),
+            np.array([0, 0, 1], dtype=np.float32)]
+    ix = BruteForceIndex(normalize=False)
+    ix.build(vecs, ids)
+    ix.save(str(tmp_path / "bf"))
+
+    # loading through the base class picks the concrete type from the saved metadata
+    loaded = BaseIndex.load(str(tmp_path / "bf"))
+    assert isinstance(loaded, BruteForceIndex) and not loaded._normalize
+    q = np.array([0.9, 0.1, 0], dtype=np.float32)
+    assert loaded.search(q, k=2) == ix.search(q, k=2)
+
+
+def test_bruteforce_skips_tombstoned_rows():
+    ids  = [10, 11, 12]
+    vecs = [np.array([1, 0, 0], dtype=np.float32),
+            np.array([0, 1, 0], dtype=np.float32),
+            np.array([0, 0, 1], dtype=np.float32)]
+    ix = BruteForceIndex()
+    ix.build(vecs, ids)
+
+    exclude = np.array([True, False, True])
+    assert [cid for cid, _ in ix.search(vecs[0], k=3, exclude=exclude)] == [ids[1]]
+
+
+def test_bruteforce_range_search():
+    ids  = [10, 11, 12]
+    vecs = [np.array([1, 0, 0], dtype=np.float32),
+            np.array([0.8, 0.6, 0], dtype=np.float32),
+            np.array([0, 0, 1], dtype=np.float32)]
+    ix = BruteForceIndex()
+    ix.build(vecs, ids)
+
+    assert [row for row, _ in ix.range_search(vecs[0], min_similarity=0.7)] == [10, 11]
+    assert [row for row, _ in ix.range_search(vecs[0], min_similarity=0.7, exclude=np.array([True, False, False]))] == [11]
+
+
+def test_bruteforce_float16_scans_match_float32(tmp_path):
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((300, 64)).astype(np.float32)
+    ids = list(range(300))
+    exact = BruteForceIndex()
+    exact.build(list(vecs), ids)
+    half = BruteForceIndex(dtype="float16")
+    half.SCAN_BLOCK_ROWS = 128  # scan in several blocks, the last one partial
+    half.build(list(vecs), ids)
+    assert half._vectors.dtype == np.float16
+
+    queries = vecs[:4]
+    for q, hits in zip(queries, half.search_batch(queries, k=5)):
+        single = half.search(q, k=5)
+        assert [row for row, _ in hits] == [row for row, _ in single]
+        expected = dict(exact.search(q, k=50))
+        for row, score in hits:
+            assert score == approx(expected[row], abs=2e-3)
+
+    half.save(str(tmp_path / "ix"))
+    loaded = BaseIndex.load(str(tmp_path / "ix"))
+    assert loaded._vectors.dtype == np.float16
+    assert loaded.empty_copy()._dtype == "float16"
+    assert loaded.search(vecs[0], k=3) == half.search(vecs[0], k=3)
@@ -3,6 +3,7 @@ import pytest
 from uuid import UUID
 
 from ..core.Chunk import Chunk, EMBEDDING_DIM  # adjust the import path as necessary
+from ..core.Library import Library
 
 
 def _random_embedding(dim: int = EMBEDDING_DIM):
@@ -20,10 +21,18 @@ def test_chunk_valid_creation():
 
 
 def test_chunk_invalid_embedding_length():
-    """Creating a chunk with a wrong‑sized embedding must raise a ValueError."""
-    short_emb = np.array([0.1, 0.2, 0.3]).tolist()  # obviously too short
+    """An empty embedding is rejected; other lengths are checked by the Library."""
     with pytest.raises(ValueError):
-        Chunk(embedding=short_emb, metadata={"text": "invalid embedding"})
+        Chunk(embedding=[], metadata={"text": "invalid embedding"})
+
+
+def test_library_rejects_chunks_of_another_dimension():
+    """Upserting a chunk whose embedding doesn't match the library's dimension must raise a ValueError."""
+    library = Library(name="small", dimension=384)
+    library.upsert_chunks([Chunk(embedding=_random_embedding(384), metadata={"text": "fits"})])
+    with pytest.raises(ValueError):
+        library.upsert_chunks([Chunk(embedding=_random_embedding(), metadata={"text": "too long"})])
+    assert library.chunk_count == 1
 
 
 def test_cosine_similarity_static():
@@ -3,6 +3,7 @@ import numpy as np
 from uuid import uuid4
 
 from ..core.Chunk import Chunk, EMBEDDING_DIM
+from ..core.ChunkArena import ChunkArena
 from ..core.Library import Library
 from ..indexes.BruteForceIndex import BruteForceIndex
 
@@ -49,3 +50,186 @@ def test_build_index_and_search():
     assert top[0][0] == c1.id # nearest neighbor should be chunk 1
     # TODO: revisit this tolerance
     assert pytest.approx(top[0][1], rel=1e-1) == 0.9
+
+
+def _unit(i: int) -> list[float]:
+    vec = np.zeros((EMBEDDING_DIM,), dtype=np.float32)
+    vec[i] = 1.0
+    return vec.tolist()
+
+
+def test_writes_are_searchable_before_rebuild():
+    lib = Library(name="Delta", index=BruteForceIndex())
+    c1 = Chunk(embedding=_unit(0), metadata={"text": "x"})
+    lib.upsert_chunks([c1])
+    lib.build_index(BruteForceIndex())
+
+    # new chunk only lives in the delta buffer
+    c2 = Chunk(embedding=_unit(1), metadata={"text": "y"})
+    lib.upsert_chunks([c2])
+    assert lib.search(_unit(1), k=1)[0][0] == c2.id
+
+    # re-embedding an indexed chunk must shadow its stale vector in the index
+    lib.upsert_chunks([Chunk(id=c1.id, embedding=_unit(2), metadata={"text": "x"})])
+    top = lib.search(_unit(0), k=2)
+    assert all(score < 0.5 for _, score in top)
+
+    # deleted chunks disappear from results without a rebuild
+    lib.delete_chunks([c2.id])
+    assert [cid for cid, _ in lib.search(_unit(1), k=5)] == [c1.id]
+
+
+def test_swap_index_keeps_writes_newer_than_snapshot():
+    lib = Library(name="Swap", index=BruteForceIndex())
+    c1 = Chunk(embedding=_unit(0), metadata={"text": "x"})
+    lib.upsert_chunks([c1])
+
+    seq, vectors, table, row_chunks = lib.snapshot_for_rebuild()
+    c2 = Chunk(embedding=_unit(1), metadata={"text": "y"})
+    lib.upsert_chunks([c2])  # arrives while the "background" build runs
+
+    index = BruteForceIndex()
+    index.build(vectors, np.arange(len(table), dtype=np.int32))
+    assert lib.swap_index(index, seq, table, row_chunks)
+    assert lib.search(_unit(1), k=1)[0][0] == c2.id
+    assert lib.search(_unit(0), k=1)[0][0] == c1.id
+
+    # an older snapshot must not replace a newer index
+    lib.build_index(BruteForceIndex())
+    assert not lib.swap_index(BruteForceIndex(), seq, table, row_chunks)
+
+
+def test_published_version_is_unaffected_by_later_writes():
+    lib = Library(name="MVCC", index=BruteForceIndex())
+    c1 = Chunk(embedding=_unit(0), metadata={"text": "x"})
+    lib.upsert_chunks([c1])
+    before = lib.version
+
+    c2 = Chunk(embedding=_unit(1), metadata={"text": "y"})
+    lib.upsert_chunks([c2])
+    lib.delete_chunks([c1.id])
+
+    # a search that started on the old version still sees the old state
+    assert [cid for cid, _ in before.search(_unit(0), k=5)] == [c1.id]
+    assert [c.id for c in before.get_all_chunks()] == [c1.id]
+    assert [cid for cid, _ in lib.version.search(_unit(0), k=5)] == [c2.id]
+    assert lib.version.seq > before.seq
+
+
+def test_old_versions_keep_their_chunks_across_many_writes():
+    lib = Library(name="Many", index=BruteForceIndex())
+    chunks = [Chunk(embedding=_unit(i), metadata={"text": str(i)}) for i in range(300)]
+    lib.upsert_chunks(chunks)
+    before = lib.version
+
+    lib.delete_chunks([chunk.id for chunk in chunks[:200]])
+
+    assert len(before.get_all_chunks()) == 300
+    assert {c.id for c in lib.version.get_all_chunks()} == {c.id for c in chunks[200:]}
+
+
+def test_writes_copy_only_the_arena_block_they_touch(monkeypatch):
+    monkeypatch.setattr(ChunkArena, "BLOCK_SIZE", 16)
+    lib = Library(name="Blocks", index=BruteForceIndex())
+    chunks = [Chunk(embedding=_unit(i), metadata={"text": str(i)}) for i in range(64)]
+    lib.upsert_chunks(chunks)
+    before = lib.version
+
+    lib.upsert_chunks([Chunk(id=chunks[20].id, embedding=_unit(20), metadata={"text": "new"})])
+
+    old_blocks, new_blocks = before.row_chunks._blocks, lib.version.row_chunks._blocks
+    assert [old is new for old, new in zip(old_blocks, new_blocks)] == [True, False, True, True]
+    assert before.row_chunks[20].metadata["text"] == "20"
+    assert lib.version.row_chunks[20].metadata["text"] == "new"
+
+
+def test_metadata_only_update_skips_reindexing():
+    lib = Library(name="Retag", index=BruteForceIndex())
+    c1 = Chunk(embedding=_unit(0), metadata={"text": "x", "tag": "old"})
+    lib.upsert_chunks([c1])
+    lib.build_index(BruteForceIndex())
+    index_before = lib.index
+
+    lib.upsert_chunks([Chunk(id=c1.id, embedding=_unit(0), metadata={"text": "x", "tag": "new"})])
+    assert not lib._delta and lib.version.tombstones is None
+    assert lib.index is index_before
+
+    # the index hit resolves to the re-tagged chunk
+    top_id, _ = lib.search(_unit(0), k=1)[0]
+    assert top_id == c1.id and lib.get_all_chunks()[0].metadata["tag"] == "new"
+    assert len(lib.get_all_chunks()) == 1
+
+
+def test_deletes_tombstone_index_rows_until_compaction(monkeypatch):
+    monkeypatch.setattr(Library, "COMPACTION_RATIO", 0.5)
+    lib = Library(name="Tombstones", index=BruteForceIndex())
+    chunks = [Chunk(embedding=_unit(i), metadata={"text": str(i)}) for i in range(4)]
+    lib.upsert_chunks(chunks)
+    lib.build_index(BruteForceIndex())
+    index_before = lib.index
+
+    lib.delete_chunks([chunks[0].id])
+    assert lib.index is index_before
+    assert lib.version.tombstones.tolist() == [True, False, False, False]
+    assert chunks[0].id not in [cid for cid, _ in lib.search(_unit(0), k=4)]
+    assert not lib.needs_rebuild
+
+    lib.delete_chunks([chunks[1].id])
+    assert lib.needs_compaction and lib.needs_rebuild
+
+    lib.build_index(lib.index.empty_copy())
+    assert lib.version.tombstones is None
+    assert lib._indexed_count == 2
+    assert {cid for cid, _ in lib.search(_unit(2), k=4)} == {chunks[2].id, chunks[3].id}
+
+
+def test_rows_are_renumbered_on_compaction():
+    lib = Library(name="Rows", index=BruteForceIndex())
+    chunks = [Chunk(embedding=_unit(i), metadata={"text": str(i)}) for i in range(3)]
+    lib.upsert_chunks(chunks)
+    lib.delete_chunks([chunks[0].id])
+    # re-embedding appends a new row; the old one is dead
+    lib.upsert_chunks([Chunk(id=chunks[1].id, embedding=_unit(5), metadata={"text": "1"})])
+    assert len(lib._table) == 4 and lib.chunk_count == 2
+
+    lib.build_index(BruteForceIndex())
+    assert len(lib._table) == 2 and lib.chunk_count == 2
+    assert lib._table.row(chunks[2].id) == 0 and lib._table.row(chunks[1].id) == 1
+    assert lib.search(_unit(5), k=1)[0][0] == chunks[1].id
+
+
+def test_range_search_covers_index_and_delta():
+    lib = Library(name="Range", index=BruteForceIndex())
+    c1, c2 = (Chunk(embedding=_unit(i), metadata={"text": str(i)}) for i in range(2))
+    lib.upsert_chunks([c1, c2])
+    lib.build_index(BruteForceIndex())
+    near = np.array(_unit(0)) + 0.1 * np.array(_unit(3))
+    c3 = Chunk(embedding=near.tolist(), metadata={"text": "near"})
+    lib.upsert_chunks([c3])  # delta only
+    lib.delete_chunks([c2.id])
+
+    rows, scores = lib.version.range_search_rows(_unit(0), min_similarity=0.9)
+    assert [lib.version.row_chunks[row].id for row in rows] == [c1.id, c3.id]
+    assert lib.version.range_search_rows(_unit(1), min_similarity=0.9)[0].size == 0
+
+
+def test_float16_library_keeps_delta_at_half_precision():
+    lib = Library(name="Half", dtype="float16", index=BruteForceIndex(dtype="float16"))
+    chunks = [Chunk(embedding=_unit(i), metadata={"text": str(i)}) for i in range(3)]
+    lib.upsert_chunks(chunks)
+    assert lib.version.delta_matrix.dtype == np.float16
+    assert lib.search(_unit(1), k=1)[0][0] == chunks[1].id
+
+    restored = Library.from_snapshot(lib.to_snapshot(), lib.index)
+    assert restored.dtype == "float16"
+    assert restored.search(_unit(2), k=1)[0][0] == chunks[2].id
+
+
+def test_arena_gathers_rows_across_blocks(monkeypatch):
+    monkeypatch.setattr(ChunkArena, "BLOCK_SIZE", 4)
+    arena = ChunkArena(range(40))
+    rng = np.random.default_rng(0)
+    for rows in (np.array([5, 6]), rng.integers(0, 40, 3), rng.integers(0, 40, 400), np.empty(0, dtype=np.int32)):
+        assert arena[rows].tolist() == rows.tolist()
+    with pytest.raises(IndexError):
+        arena[np.array([0, 40])]
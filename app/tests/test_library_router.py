@@ -1,3 +1,4 @@
+import json
 from typing import Any
 import numpy as np
 import pytest
@@ -127,7 +128,7 @@ def test_create_library(mock_vector_store, sample_library_id, sample_library):
     assert lib["name"] == "Test Library"
     assert lib["id"] == sample_library_id
     mock_vector_store.create_library.assert_called_once_with(
-        "Test Library", index_name="BallTreeIndex", metadata={"description": "Test library for unit tests"}
+        "Test Library", index_name="auto", metadata={"description": "Test library for unit tests"}
     )
 
 
@@ -150,6 +151,21 @@ def test_create_library_with_index_name(mock_vector_store, sample_library_id, sa
     )
 
 
+def test_create_library_with_float16_dtype(mock_vector_store, sample_library_id, sample_library):
+    mock_vector_store.create_library.return_value = UUID(sample_library_id)
+    mock_vector_store.get_library.return_value = sample_library
+
+    response = client.post("/library/", json={"name": "Test Library", "index_name": "BruteForceIndex", "dtype": "float16"})
+    assert response.status_code == 200
+    mock_vector_store.create_library.assert_called_with(
+        "Test Library", index_name="BruteForceIndex", metadata={}, dtype="float16"
+    )
+
+    response = client.post("/library/", json={"name": "Test Library", "index_name": "BallTreeIndex", "dtype": "float16"})
+    assert response.status_code == 400
+
+
+
 def test_delete_library_success(mock_vector_store, sample_library_id):
     # Setup
     mock_vector_store.has_library.return_value = True
@@ -707,3 +723,164 @@ def test_search_with_filters_api(mock_vector_store, sample_library_id, sample_li
     # (the service layer does the filtering after calling search)
     results = response.json()
     assert any("Chunk 1" in chunk[0]['metadata']['text'] for chunk in results)
+
+
+def test_search_passes_budget_to_index(mock_vector_store, sample_library_id, sample_library_with_chunks):
+    mock_vector_store.has_library.return_value = True
+    mock_vector_store.get_library.return_value = sample_library_with_chunks
+    mock_vector_store.search.return_value = []
+    query = np.random.rand(1536).tolist()
+    response = client.post(
+        f"/library/{sample_library_id}/search?k=3",
+        json={"query": query, "max_leaves": 4, "slack": 0.1, "oversample": 8}
+    )
+    assert response.status_code == 200
+    _, kwargs = mock_vector_store.search.call_args
+    assert kwargs == {"k": 3, "max_leaves": 4, "slack": 0.1, "oversample": 8}
+
+
+def test_search_rejects_invalid_budget(mock_vector_store, sample_library_id):
+    query = np.random.rand(1536).tolist()
+    response = client.post(
+        f"/library/{sample_library_id}/search",
+        json={"query": query, "max_leaves": 0}
+    )
+    assert response.status_code == 422
+
+
+def test_search_takes_no_library_lock(mock_vector_store, sample_library_id, sample_library):
+    mock_vector_store.has_library.return_value = True
+    mock_vector_store.get_library.return_value = sample_library
+    mock_vector_store.search.return_value = []
+    response = client.post(
+        f"/library/{sample_library_id}/search",
+        json={"query": np.random.rand(1536).tolist()}
+    )
+    assert response.status_code == 200
+    mock_vector_store.get_library_lock.assert_not_called()
+
+
+def test_create_library_honours_requested_index(mock_vector_store, sample_library_id, sample_library):
+    mock_vector_store.create_library.return_value = UUID(sample_library_id)
+    mock_vector_store.get_library.return_value = sample_library
+
+    response = client.post("/library/", json={"name": "Test Library", "index_name": "BruteForceIndex"})
+    assert response.status_code == 200
+    mock_vector_store.create_library.assert_called_once_with(
+        "Test Library", index_name="BruteForceIndex", metadata={}
+    )
+
+
+def test_federated_search_merges_libraries(mock_vector_store, sample_library_with_chunks):
+    lib_a, lib_b = uuid4(), uuid4()
+    chunk_a, chunk_b = sample_library_with_chunks.chunks
+    mock_vector_store.has_library.return_value = True
+    mock_vector_store.get_library.return_value = sample_library_with_chunks
+    mock_vector_store.search.side_effect = lambda lib_id, query, k, **params: {
+        lib_a: [(chunk_a, 0.7), (chunk_b, 0.2)],
+        lib_b: [(chunk_b, 0.9)],
+    }[lib_id]
+
+    response = client.post(
+        "/search?k=2",
+        json={"library_ids": [str(lib_a), str(lib_b)], "query": np.random.rand(1536).tolist()}
+    )
+    assert response.status_code == 200
+    hits = response.json()
+    assert [(hit["library_id"], hit["score"]) for hit in hits] == [(str(lib_b), 0.9), (str(lib_a), 0.7)]
+    assert hits[0]["chunk"]["id"] == str(chunk_b.id)
+
+
+def test_search_checks_query_against_library_dimension(mock_vector_store, sample_library_id):
+    mock_vector_store.has_library.return_value = True
+    mock_vector_store.get_library.return_value = Library(name="small", dimension=384)
+    mock_vector_store.search.return_value = []
+
+    response = client.post(f"/library/{sample_library_id}/search", json={"query": np.random.rand(1536).tolist()})
+    assert response.status_code == 400
+    assert "384" in response.json()["detail"]
+    response = client.post(f"/library/{sample_library_id}/search", json={"query": np.random.rand(384).tolist()})
+    assert response.status_code == 200
+
+
+def test_federated_search_unknown_library(mock_vector_store):
+    mock_vector_store.has_library.return_value = False
+    response = client.post(
+        "/search",
+        json={"library_ids": [str(uuid4())], "query": np.random.rand(1536).tolist()}
+    )
+    assert response.status_code == 404
+
+
+def test_range_search_streams_ndjson(mock_vector_store, sample_library_id, sample_library_with_chunks):
+    mock_vector_store.has_library.return_value = True
+    mock_vector_store.get_library.return_value = sample_library_with_chunks
+    chunk_a, chunk_b = sample_library_with_chunks.chunks
+    mock_vector_store.range_search.return_value = [(chunk_a, 0.97), (chunk_b, 0.93)]
+
+    response = client.post(
+        f"/library/{sample_library_id}/range_search",
+        json={"query": np.random.rand(1536).tolist(), "min_similarity": 0.92, "limit": 10}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["chunk"]["id"], line["score"]) for line in lines] == [(str(chunk_a.id), 0.97), (str(chunk_b.id), 0.93)]
+    args, kwargs = mock_vector_store.range_search.call_args
+    assert args[2] == 0.92 and kwargs == {"limit": 10}
+
+
+def test_search_explain_reports_index_work_and_timings(monkeypatch):
+    from app.services import LibraryService
+    from app.services.VectorStore import VectorStore
+    store = VectorStore()
+    async def fake_get_vector_store():
+        return store
+    monkeypatch.setattr(LibraryService, "get_vector_store", fake_get_vector_store)
+    lib_id = store.create_library("explain", index_name="BallTreeIndex", dimension=16)
+    vecs = np.random.default_rng(0).standard_normal((200, 16))
+    store.upsert_chunks(lib_id, [Chunk(embedding=v.tolist(), metadata={"even": i % 2 == 0}) for i, v in enumerate(vecs)])
+    store.build_index(lib_id)
+
+    response = client.post(
+        f"/library/{lib_id}/search?k=4&explain=true",
+        json={"query": vecs[0].tolist(), "filters": {"even": {"eq": True}}}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    explain = body["explain"]
+    assert explain["index"] == "BallTreeIndex"
+    assert explain["indexed_rows"] == 200 and explain["delta_rows"] == 0
+    assert explain["nodes_visited"] > 0 and explain["leaves_scanned"] > 0
+    assert explain["distance_computations"] >= 16
+    assert explain["candidates_before_filter"] == 4
+    assert explain["candidates_after_filter"] == len(body["results"])
+    assert body["results"][0][0]["metadata"]["even"] is True
+    assert set(explain["timings_ms"]) == {"search", "filter", "serialization", "total"}
+
+
+def test_search_explain_describes_the_version_it_searched(monkeypatch):
+    from app.services import LibraryService
+    from app.services.VectorStore import VectorStore
+    store = VectorStore()
+    async def fake_get_vector_store():
+        return store
+    monkeypatch.setattr(LibraryService, "get_vector_store", fake_get_vector_store)
+    lib_id = store.create_library("explain", index_name="BruteForceIndex", dimension=16)
+    vecs = np.random.default_rng(0).standard_normal((20, 16))
+    store.upsert_chunks(lib_id, [Chunk(embedding=v.tolist()) for v in vecs])
+    store.build_index(lib_id)
+
+    # a write publishes a new version after explain has read the row counts
+    search = store.search
+    def search_after_a_write(*args, **kwargs):
+        store.get_library(lib_id).upsert_chunks([Chunk(embedding=vecs[0].tolist())])
+        return search(*args, **kwargs)
+    monkeypatch.setattr(store, "search", search_after_a_write)
+
+    response = client.post(f"/library/{lib_id}/search?k=2&explain=true", json={"query": vecs[0].tolist()})
+    assert response.status_code == 200
+    explain = response.json()["explain"]
+    assert explain["indexed_rows"] == 20 and explain["delta_rows"] == 0
+    assert explain["candidates_before_filter"] == 2
+    assert explain["distance_computations"] == 20
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from ..core.Chunk import Chunk, EMBEDDING_DIM
+from ..indexes.BaseIndex import BaseIndex
+from ..indexes.BallTreeIndex import BallTreeIndex
+from ..indexes.BruteForceIndex import BruteForceIndex
+from ..indexes.MatryoshkaIndex import MatryoshkaIndex
+from ..indexes.RerankingIndex import RerankingIndex
+from ..services.VectorStore import VectorStore
+
+
+def _make_dataset(n: int = 400, d: int = 64):
+    # Matryoshka-like: the leading dimensions carry most of the energy
+    rng = np.random.default_rng(0)
+    scale = np.linspace(1.0, 0.1, d, dtype=np.float32)
+    vecs = rng.standard_normal((n, d)).astype(np.float32) * scale
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs, list(range(n))
+
+
+def test_scores_are_similarities_of_renormalized_prefixes():
+    vecs, ids = _make_dataset()
+    ix = MatryoshkaIndex(dim=16)
+    ix.build(list(vecs), ids)
+
+    prefix = vecs[:, :16] / np.linalg.norm(vecs[:, :16], axis=1, keepdims=True)
+    for row, score in ix.search(vecs[3], k=5):
+        assert score == pytest.approx(float(prefix[row] @ prefix[3]), abs=1e-5)
+
+
+def test_reranked_truncated_search_matches_exact_top_k():
+    vecs, ids = _make_dataset()
+    exact = BruteForceIndex()
+    exact.build(list(vecs), ids)
+    ix = RerankingIndex(MatryoshkaIndex(BruteForceIndex(), dim=32), oversample=8)
+    ix.build(list(vecs), ids)
+
+    for q in vecs[:10]:
+        expected = exact.search(q, k=5)
+        got = ix.search(q, k=5, row_vectors=vecs.__getitem__)
+        assert [row for row, _ in got] == [row for row, _ in expected]
+        assert [s for _, s in got] == pytest.approx([s for _, s in expected], abs=1e-5)
+
+
+def test_exclude_and_range_search_pass_through():
+    vecs, ids = _make_dataset()
+    ix = MatryoshkaIndex(dim=16)
+    ix.build(list(vecs), ids)
+
+    exclude = np.zeros(len(ids), dtype=bool)
+    exclude[0] = True
+    assert 0 not in [row for row, _ in ix.search(vecs[0], k=3, exclude=exclude)]
+    hits = ix.range_search(vecs[0], min_similarity=0.5)
+    assert hits and all(score >= 0.5 for _, score in hits)
+
+
+def test_save_load_roundtrip(tmp_path):
+    vecs, ids = _make_dataset()
+    ix = RerankingIndex(MatryoshkaIndex(BallTreeIndex(leaf_size=8), dim=16))
+    ix.build(list(vecs), ids)
+    ix.save(str(tmp_path / "ix"))
+
+    loaded = BaseIndex.load(str(tmp_path / "ix"))
+    assert loaded.describe() == "RerankingIndex(MatryoshkaIndex[16](BallTreeIndex))"
+    assert loaded.inner.dim == 16
+    params = {"row_vectors": vecs.__getitem__}
+    assert loaded.search(vecs[5], k=4, **params) == ix.search(vecs[5], k=4, **params)
+
+
+def test_config_round_trip_recreates_an_empty_index():
+    ix = RerankingIndex(MatryoshkaIndex(BruteForceIndex(dtype="float16"), dim=16), oversample=6)
+    ix.build(list(_make_dataset()[0]), list(range(400)))
+
+    copy = BaseIndex.from_config(ix.to_config())
+    assert copy.describe() == ix.describe()
+    assert copy.oversample == 6 and copy.inner.inner._dtype == "float16"
+    assert copy.inner.inner._vectors is None
+
+
+def test_vector_store_creates_matryoshka_library():
+    store = VectorStore()
+    lib_id = store.create_library("m", index_name="BruteForceIndex", matryoshka_dim=256)
+    library = store.get_library(lib_id)
+    assert library.index_name == "RerankingIndex(MatryoshkaIndex[256](BruteForceIndex))"
+
+    rng = np.random.default_rng(1)
+    vecs = rng.standard_normal((20, EMBEDDING_DIM)).astype(np.float32)
+    chunks = [Chunk(text=str(i), embedding=v.tolist()) for i, v in enumerate(vecs)]
+    store.upsert_chunks(lib_id, chunks)
+    library.build_index(library.index.empty_copy())
+
+    hits = store.search(lib_id, vecs[7].tolist(), k=1)
+    assert hits[0][0].id == chunks[7].id
+
+
+def test_float16_matryoshka_library_rescores_on_full_precision_chunks():
+    store = VectorStore()
+    lib_id = store.create_library("m16", index_name="BruteForceIndex", matryoshka_dim=64, dtype="float16")
+    rng = np.random.default_rng(2)
+    vecs = rng.standard_normal((30, EMBEDDING_DIM)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    chunks = [Chunk(text=str(i), embedding=v.tolist()) for i, v in enumerate(vecs)]
+    store.upsert_chunks(lib_id, chunks)
+    store.build_index(lib_id)
+
+    for chunk, score in store.search(lib_id, vecs[4].tolist(), k=3):
+        assert score == pytest.approx(float(np.asarray(chunk.embedding, dtype=np.float32) @ vecs[4]), abs=1e-6)
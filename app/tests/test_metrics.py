@@ -0,0 +1,68 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.core.Chunk import Chunk
+from app.main import app
+from app.services.VectorStore import VectorStore
+from app.utils.metrics import Counter, Gauge, Histogram, Registry, REGISTRY
+
+client = TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    h = registry.register(Histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        h.labels("read").observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{op="read",le="1"} 3' in lines
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in lines
+    assert 'op_seconds_count{op="read"} 4' in lines
+    assert 'op_seconds_sum{op="read"} 6.05' in lines
+
+
+def test_forget_drops_one_label_value_and_gauge_callbacks():
+    registry = Registry()
+    c = registry.register(Counter("hits_total", "Hits.", ("library", "kind")))
+    g = registry.register(Gauge("size", "Size.", ("library",)))
+    c.labels("a", "x").inc()
+    c.labels("b", "x").inc(2)
+    g.set_function(lambda: {("a",): 3})
+
+    registry.forget(library="a")
+    text = registry.render()
+    assert 'hits_total{library="a"' not in text
+    assert 'hits_total{library="b",kind="x"} 2' in text
+    assert 'size{library="a"} 3' in text
+
+
+def test_metrics_endpoint_reports_requests_by_route_template():
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'vectordb_http_requests_total{method="GET",route="/health",status="200"}' in response.text
+
+
+def test_vector_store_records_search_latency_and_forgets_deleted_libraries():
+    store = VectorStore()
+    lib_id = store.create_library("metrics", index_name="BruteForceIndex", dimension=8)
+    vecs = np.random.default_rng(0).standard_normal((5, 8))
+    store.upsert_chunks(lib_id, [Chunk(embedding=v.tolist()) for v in vecs])
+    store.search(lib_id, vecs[0].tolist(), k=2)
+
+    label = f'library="{lib_id}",index="BruteForceIndex",operation="search"'
+    assert f"vectordb_index_search_duration_seconds_count{{{label}}} 1" in REGISTRY.render()
+    store.delete_library(lib_id)
+    assert str(lib_id) not in REGISTRY.render()
+
+
+def test_debug_locks_lists_named_locks():
+    from app.services import LibraryService
+
+    response = client.get("/debug/locks")
+    assert response.status_code == 200
+    names = [lock["name"] for lock in response.json()]
+    assert LibraryService.rw_lock.name in names
@@ -192,3 +192,68 @@ def test_writer_blocks_new_readers():
 
     assert order == ['write', 'read']
     assert read_done.is_set()
+
+
+def test_second_waiting_writer_still_blocks_new_readers():
+    lock = ReadWriteLock()
+    order = []
+    lock.acquire_write()
+
+    def writer():
+        lock.acquire_write()
+        order.append('write')
+        time.sleep(0.05)
+        lock.release_write()
+
+    def reader():
+        lock.acquire_read()
+        order.append('read')
+        lock.release_read()
+
+    writers = [threading.Thread(target=writer) for _ in range(2)]
+    for t in writers:
+        t.start()
+    while lock.writers_waiting < 2:
+        time.sleep(0.01)
+    lock.release_write()
+    while lock.writers_waiting > 1:
+        time.sleep(0.001)
+    t_reader = threading.Thread(target=reader)
+    t_reader.start()
+    for t in writers + [t_reader]:
+        t.join()
+
+    assert order == ['write', 'write', 'read']
+
+
+def test_report_shows_holders_waiters_and_wait_times():
+    from app.utils.metrics import REGISTRY
+    from app.utils.read_write_lock import named_locks
+
+    lock = ReadWriteLock("test:report")
+    assert lock in named_locks()
+    lock.acquire_write()
+
+    def reader():
+        with lock.read_lock():
+            pass
+
+    t = threading.Thread(target=reader, name="blocked-reader")
+    t.start()
+    while not lock.report()["waiters"]:
+        time.sleep(0.01)
+
+    report = lock.report()
+    assert report["writer"] is True
+    assert [h["mode"] for h in report["holders"]] == ["write"]
+    assert report["waiters"][0]["owner"] == "blocked-reader"
+    time.sleep(0.05)
+    lock.release_write()
+    t.join()
+
+    report = lock.report()
+    assert report["holders"] == [] and report["waiters"] == [] and report["readers"] == 0
+    assert report["stats"]["read"]["acquisitions"] == 1
+    assert report["stats"]["read"]["max_wait_seconds"] >= 0.05
+    assert report["stats"]["write"]["hold_seconds"] >= 0.05
+    assert 'vectordb_lock_wait_seconds_count{lock="test:report",mode="read"} 1' in REGISTRY.render()
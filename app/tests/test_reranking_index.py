@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from ..indexes.BaseIndex import BaseIndex
+from ..indexes.BallTreeIndex import BallTreeIndex
+from ..indexes.BruteForceIndex import BruteForceIndex
+from ..indexes.RerankingIndex import RerankingIndex
+
+
+def _make_dataset(n: int = 500, d: int = 32):
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((n, d)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs, list(range(100, 100 + n))
+
+
+def _row_vectors(vecs: np.ndarray):
+    """`row_vectors` search param for an index built with `_make_dataset` ids."""
+    return lambda rows: vecs[rows - 100]
+
+
+def test_rerank_returns_exact_scores_for_build_rows():
+    vecs, ids = _make_dataset()
+    ix = RerankingIndex(BallTreeIndex(leaf_size=8))
+    ix.build(list(vecs), ids)
+
+    hits = ix.search(vecs[0], k=5, slack=1.0, row_vectors=_row_vectors(vecs))
+    scores = [s for _, s in hits]
+    assert scores == sorted(scores, reverse=True)
+    for row, score in hits:
+        assert score == pytest.approx(float(vecs[row - 100] @ vecs[0]), abs=1e-5)
+
+
+def test_oversampling_recovers_exact_top_k():
+    vecs, ids = _make_dataset()
+    exact = BruteForceIndex()
+    exact.build(list(vecs), ids)
+    ix = RerankingIndex(BallTreeIndex(leaf_size=8))
+    ix.build(list(vecs), ids)
+
+    expected = [row for row, _ in exact.search(vecs[1], k=5)]
+    # a candidate pool as large as the library makes even a sloppy first stage exact
+    got = ix.search(vecs[1], k=5, oversample=len(ids) // 5, slack=1.0, row_vectors=_row_vectors(vecs))
+    assert [row for row, _ in got] == expected
+
+
+def test_save_and_load_round_trip(tmp_path):
+    vecs, ids = _make_dataset(n=100)
+    ix = RerankingIndex(BallTreeIndex(leaf_size=8), oversample=3)
+    ix.build(list(vecs), ids)
+    ix.save(str(tmp_path / "rerank"))
+
+    loaded = BaseIndex.load(str(tmp_path / "rerank"))
+    assert isinstance(loaded, RerankingIndex) and isinstance(loaded.inner, BallTreeIndex)
+    assert loaded.oversample == 3
+    params = {"row_vectors": _row_vectors(vecs)}
+    assert loaded.search(vecs[2], k=4, **params) == ix.search(vecs[2], k=4, **params)
+
+
+def test_search_needs_row_vectors():
+    vecs, ids = _make_dataset(n=50)
+    ix = RerankingIndex(BruteForceIndex())
+    ix.build(list(vecs), ids)
+    with pytest.raises(ValueError):
+        ix.search(vecs[0], k=3)
@@ -0,0 +1,94 @@
+import asyncio
+import numpy as np
+import pytest
+
+from app.services.SearchBatcher import SearchBatcher
+from app.services.VectorStore import VectorStore
+from app.core.Chunk import EMBEDDING_DIM, Chunk
+from app.indexes.BruteForceIndex import BruteForceIndex
+
+
+def _random_chunks(n: int) -> list[Chunk]:
+    rng = np.random.default_rng(0)
+    return [Chunk(embedding=rng.standard_normal(EMBEDDING_DIM).tolist(), metadata={"text": str(i)}) for i in range(n)]
+
+
+def test_bruteforce_batch_matches_single_queries():
+    rng = np.random.default_rng(1)
+    vecs = rng.standard_normal((50, 16)).astype(np.float32)
+    ix = BruteForceIndex()
+    ix.build(list(vecs), list(range(50)))
+    exclude = np.zeros(50, dtype=bool)
+    exclude[[3, 7]] = True
+
+    batch = ix.search_batch(vecs[:5], k=4, exclude=exclude)
+    for query, hits in zip(vecs[:5], batch):
+        single = ix.search(query, k=4, exclude=exclude)
+        assert [row for row, _ in hits] == [row for row, _ in single]
+        assert [s for _, s in hits] == pytest.approx([s for _, s in single], abs=1e-5)
+
+
+def test_concurrent_searches_share_one_scan(monkeypatch):
+    store = VectorStore()
+    lib_id = store.create_library("batched", index_name="BruteForceIndex")
+    chunks = _random_chunks(30)
+    store.upsert_chunks(lib_id, chunks)
+    store.build_index(lib_id)
+
+    calls = []
+    search_batch = store.search_batch
+
+    def counting_search_batch(lib_id, queries, k, **params):
+        calls.append(len(queries))
+        return search_batch(lib_id, queries, k, **params)
+
+    monkeypatch.setattr(store, "search_batch", counting_search_batch)
+    batcher = SearchBatcher(store, window_ms=50, max_batch=64)
+
+    async def run():
+        return await asyncio.gather(*(batcher.search(lib_id, c.embedding, k=1) for c in chunks[:8]))
+
+    results = asyncio.run(run())
+    assert calls == [8]
+    assert [hits[0][0].id for hits in results] == [c.id for c in chunks[:8]]
+
+
+def test_full_batch_runs_before_the_window_closes():
+    store = VectorStore()
+    lib_id = store.create_library("batched", index_name="BruteForceIndex")
+    chunks = _random_chunks(10)
+    store.upsert_chunks(lib_id, chunks)
+    batcher = SearchBatcher(store, window_ms=60_000, max_batch=4)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.search(lib_id, c.embedding, k=1) for c in chunks[:4])), timeout=5
+        )
+
+    results = asyncio.run(run())
+    assert [hits[0][0].id for hits in results] == [c.id for c in chunks[:4]]
+
+
+def test_settings_are_read_when_the_batcher_is_created(monkeypatch):
+    monkeypatch.setenv("SEARCH_BATCH_WINDOW_MS", "3")
+    monkeypatch.setenv("SEARCH_BATCH_MAX_QUERIES", "16")
+    batcher = SearchBatcher(VectorStore())
+    assert batcher.window_ms == 3.0 and batcher.max_batch == 16
+
+
+def test_running_batches_are_referenced_until_done():
+    store = VectorStore()
+    lib_id = store.create_library("batched", index_name="BruteForceIndex")
+    chunks = _random_chunks(4)
+    store.upsert_chunks(lib_id, chunks)
+    batcher = SearchBatcher(store, window_ms=60_000, max_batch=2)
+
+    async def run():
+        searches = asyncio.gather(*(batcher.search(lib_id, c.embedding, k=1) for c in chunks[:2]))
+        await asyncio.sleep(0)
+        assert len(batcher._tasks) == 1
+        await searches
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert not batcher._tasks
@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.middleware import TracingMiddleware
+from app.main import app
+from app.services import LibraryService
+from app.services.VectorStore import VectorStore
+from app.utils import tracing
+
+client = TestClient(app)
+
+
+def _server_timing(response) -> dict:
+    entries = [entry.strip().split(";dur=") for entry in response.headers["server-timing"].split(",")]
+    return {name: float(ms) for name, ms in entries}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = VectorStore()
+    async def fake_get_vector_store():
+        return store
+    monkeypatch.setattr(LibraryService, "get_vector_store", fake_get_vector_store)
+    return store
+
+
+def test_spans_are_noops_outside_a_trace():
+    with tracing.span("search"):
+        pass
+    tracing.record("lock", 0.1)
+    assert tracing.current_trace() is None
+
+
+def test_server_timing_breaks_down_a_filtered_search(store):
+    lib_id = store.create_library("traced", index_name="BruteForceIndex", dimension=8)
+    vecs = np.random.default_rng(0).standard_normal((20, 8))
+    response = client.put(f"/library/{lib_id}/chunks", json={
+        "chunks": [{"embedding": v.tolist(), "metadata": {"i": i}} for i, v in enumerate(vecs)]
+    })
+    assert response.status_code == 200
+    assert "lock" in _server_timing(response)
+
+    response = client.post(f"/library/{lib_id}/search?k=5", json={
+        "query": vecs[0].tolist(), "filters": {"i": {"lt": 10}}
+    })
+    assert response.status_code == 200
+    timing = _server_timing(response)
+    assert list(timing) == ["parse", "search", "filter", "encode", "total"]
+    assert timing["total"] >= timing["search"] + timing["filter"]
+
+
+def test_sampled_requests_are_written_to_the_trace_log(tmp_path, monkeypatch):
+    log_path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(TracingMiddleware, "LOG_PATH", str(log_path))
+    monkeypatch.setattr(TracingMiddleware, "SAMPLE_RATE", 1.0)
+    client.get("/health")
+    monkeypatch.setattr(TracingMiddleware, "SAMPLE_RATE", 0.0)
+    client.get("/health")
+
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["route"] == "/health" and lines[0]["status"] == 200
+    assert lines[0]["spans"] == []
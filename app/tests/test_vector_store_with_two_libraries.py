@@ -1,13 +1,19 @@
+import asyncio
+import os
+import pickle
+import shutil
+import sys
 from datetime import datetime
 import numpy as np
 import pytest
-from uuid import UUID
+from uuid import UUID, uuid4
 from typing import Callable, List
 
 from app.services.VectorStore import VectorStore
 from app.indexes.BruteForceIndex import BruteForceIndex
 from app.indexes.BallTreeIndex import BallTreeIndex
 from app.core.Chunk import Chunk
+from app.core.Library import Library
 
 
 @pytest.fixture(scope="session")
@@ -76,3 +82,136 @@ def test_two_libraries_isolated(vector_store, fake_embed, index_cls):
     top_chunk, score = results[0]
     assert chunks_A[top_chunk.id] == target_text
     assert score > 0.9
+
+
+def test_snapshot_round_trip(tmp_path, fake_embed):
+    """
+    A saved snapshot loads back into a store that serves the same chunks.
+    """
+    store = VectorStore()
+    store.SNAPSHOT_PATH = str(tmp_path / "snapshot.pkl")
+    lib_id = store.create_library("A", index_name="BallTreeIndex")
+    chunks = _populate_library(store, lib_id, fake_embed, "A")
+    asyncio.run(store.save_to_disk_async())
+    assert os.path.exists(store.SNAPSHOT_PATH)
+
+    restored = VectorStore()
+    restored.SNAPSHOT_PATH = store.SNAPSHOT_PATH
+    asyncio.run(restored.load_from_disk_async())
+    target_text = next(iter(chunks.values()))
+    top_chunk, _ = restored.search(lib_id, fake_embed(target_text), k=1)[0]
+    assert chunks[top_chunk.id] == target_text
+
+
+def test_snapshot_round_trip_reuses_saved_indexes(tmp_path, fake_embed):
+    """
+    Indexes are saved as arrays and memory-mapped back on load; no rebuild happens.
+    """
+    store = VectorStore()
+    store.SNAPSHOT_PATH = str(tmp_path / "snapshot.pkl")
+    lib_id = store.create_library("A", index_name="BallTreeIndex")
+    chunks = _populate_library(store, lib_id, fake_embed, "A")
+    store.build_index(lib_id, index_cls=BallTreeIndex)
+    asyncio.run(store.save_to_disk_async())
+
+    restored = VectorStore()
+    restored.SNAPSHOT_PATH = store.SNAPSHOT_PATH
+    asyncio.run(restored.load_from_disk_async())
+
+    library = restored.get_library(lib_id)
+    assert isinstance(library.index, BallTreeIndex)
+    assert isinstance(library.index._vectors, np.memmap)
+    target_text = next(iter(chunks.values()))
+    top_chunk, _ = restored.search(lib_id, fake_embed(target_text), k=1)[0]
+    assert chunks[top_chunk.id] == target_text
+
+    # an unchanged index is not rewritten by the next snapshot
+    saved_dirs = set(os.listdir(restored.index_dir))
+    asyncio.run(restored.save_to_disk_async())
+    assert set(os.listdir(restored.index_dir)) == saved_dirs
+
+
+def test_snapshot_rebuilds_a_lost_index_with_its_configuration(tmp_path, fake_embed):
+    """
+    If a saved index can't be loaded, it is rebuilt as the library's own index type,
+    not the store's default.
+    """
+    store = VectorStore()
+    store.SNAPSHOT_PATH = str(tmp_path / "snapshot.pkl")
+    lib_id = store.create_library("A", index_name="BruteForceIndex", matryoshka_dim=64, dtype="float16")
+    chunks = _populate_library(store, lib_id, fake_embed, "A")
+    store.build_index(lib_id)
+    asyncio.run(store.save_to_disk_async())
+    shutil.rmtree(store.index_dir)
+
+    restored = VectorStore()
+    restored.SNAPSHOT_PATH = store.SNAPSHOT_PATH
+    asyncio.run(restored.load_from_disk_async())
+
+    index = restored.get_library(lib_id).index
+    assert index.describe() == "RerankingIndex(MatryoshkaIndex[64](BruteForceIndex))"
+    assert index.inner.inner._dtype == "float16"
+    target_text = next(iter(chunks.values()))
+    top_chunk, _ = restored.search(lib_id, fake_embed(target_text), k=1)[0]
+    assert chunks[top_chunk.id] == target_text
+
+
+class _OldBall:
+    """Stands in for an index class that existed when a snapshot was written."""
+
+
+def test_loads_snapshot_of_whole_pickled_libraries(tmp_path, fake_embed, monkeypatch):
+    """
+    Snapshots from before `Library.to_snapshot` pickle Library objects as they were then:
+    public fields only, no private state, and index internals that may no longer exist.
+    """
+    chunks = [Chunk(embedding=fake_embed(f"doc_{i}"), metadata={"text": f"doc_{i}"}) for i in range(5)]
+    old_index = BallTreeIndex.__new__(BallTreeIndex)
+    old_index.__dict__.update({"leaf_size": 16, "_root": _OldBall()})
+    legacy = Library.__new__(Library)
+    legacy.__setstate__({
+        "__dict__": {"id": uuid4(), "name": "old", "metadata": {}, "chunks": chunks, "index": old_index},
+        "__pydantic_extra__": None,
+        "__pydantic_fields_set__": {"name", "metadata", "chunks"},
+        "__pydantic_private__": None,
+    })
+    snapshot_path = tmp_path / "snapshot.pkl"
+    snapshot_path.write_bytes(pickle.dumps({"libraries": {legacy.id: legacy}, "chunk_lookup": {}}))
+    monkeypatch.delattr(sys.modules[__name__], "_OldBall")
+
+    store = VectorStore()
+    store.SNAPSHOT_PATH = str(snapshot_path)
+    asyncio.run(store.load_from_disk_async())
+
+    library = store.get_library(legacy.id)
+    assert isinstance(library.index, BallTreeIndex)
+    assert library.chunk_count == 5
+    top_chunk, score = store.search(legacy.id, chunks[3].embedding, k=1)[0]
+    assert top_chunk.id == chunks[3].id and score > 0.99
+
+
+def test_snapshot_survives_libraries_created_during_the_save(tmp_path, fake_embed, monkeypatch):
+    """
+    Creating a library while a snapshot is saving indexes neither aborts the snapshot nor
+    releases a lock the snapshot never took.
+    """
+    store = VectorStore()
+    store.SNAPSHOT_PATH = str(tmp_path / "snapshot.pkl")
+    lib_id = store.create_library("A", index_name="BruteForceIndex")
+    _populate_library(store, lib_id, fake_embed, "A")
+    created = []
+    save_index = store._save_index
+
+    def save_index_while_a_library_is_created(*args):
+        if not created:
+            created.append(store.create_library("B", index_name="BruteForceIndex"))
+            monkeypatch.setattr(store.get_library_lock(created[0]), "release_write",
+                                lambda: pytest.fail("released a lock the snapshot never acquired"))
+        return save_index(*args)
+
+    monkeypatch.setattr(store, "_save_index", save_index_while_a_library_is_created)
+    asyncio.run(store.save_to_disk_async())
+
+    assert os.path.exists(store.SNAPSHOT_PATH)
+    with open(store.SNAPSHOT_PATH, "rb") as f:
+        assert set(pickle.load(f)["libraries"]) == {lib_id}
@@ -0,0 +1,37 @@
+import json
+import os
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+META_FILE = "meta.json"
+
+
+def save_arrays(path: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Write `arrays` as one raw `.npy` file each under the directory `path`, plus a
+    `meta.json` with the JSON-serialisable `meta`. Raw `.npy` files (rather than
+    `.npz` or pickle) are what lets `load_arrays` memory-map them.
+    """
+    os.makedirs(path, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+    # meta last: a directory without it is an incomplete write
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump({**meta, "arrays": sorted(arrays)}, f)
+
+
+def load_arrays(path: str, mmap: bool = True) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """
+    Read back what `save_arrays` wrote. With `mmap`, arrays are read-only memory maps,
+    so loading costs no copy and pages are faulted in on first use.
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        for name in meta.pop("arrays")
+    }
+    return meta, arrays
+
@@ -0,0 +1,287 @@
+"""
+Minimal Prometheus-style metrics: counters, gauges and histograms rendered in the text
+exposition format served at `/metrics`.
+
+Everything here is cheap enough to leave on in production. Updates take no lock: a
+labeled child is looked up in a dict and a preallocated slot is incremented, relying on
+the GIL. Under heavy thread contention an increment can very occasionally be lost,
+which is fine for monitoring and far cheaper than a lock per observation.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# latency buckets in seconds, from 100µs to 10s
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    type_name: str
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: object):
+        """The child for one combination of label values, created on first use."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            # setdefault keeps the first child if two threads race to create it
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove_matching(self, **labels: str) -> None:
+        """Drop every child whose labels include all of `labels`, e.g. a deleted library's."""
+        positions = [(self.labelnames.index(name), value) for name, value in labels.items() if name in self.labelnames]
+        if not positions:
+            return
+        for key in list(self._children):
+            if all(key[i] == value for i, value in positions):
+                self._children.pop(key, None)
+
+    def _samples(self) -> Iterator[Tuple[str, LabelValues, Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, key, extra_names, value in self._samples():
+            names = self.labelnames + extra_names[:len(key) - len(self.labelnames)]
+            lines.append(f"{self.name}{suffix}{_format_labels(names, key)} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, e.g. requests served or bytes written."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabeled counter."""
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield "", key, (), child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. Either set directly, or computed at scrape time by a
+    callback returning `{label values: value}`, for values that already live elsewhere
+    (chunk counts, queue depths) and would be wasteful to mirror on every change.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._callback: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """Set the unlabeled gauge."""
+        self.labels().set(value)
+
+    def set_function(self, callback: Optional[Callable[[], Dict[LabelValues, float]]]) -> None:
+        """Compute this gauge's samples with `callback` at scrape time instead."""
+        self._callback = callback
+
+    def _samples(self):
+        if self._callback is not None:
+            for key, value in self._callback().items():
+                yield "", tuple(str(v) for v in key), (), value
+            return
+        for key, child in list(self._children.items()):
+            yield "", key, (), child.value
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]) -> None:
+        self._upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self._upper_bounds, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the wall time of the `with` block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observations (usually durations in seconds) over fixed buckets. Each
+    child preallocates its bucket counts; observing is one bisect and two increments.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Observe into the unlabeled histogram."""
+        self.labels().observe(value)
+
+    def _samples(self):
+        bounds = tuple(_format_value(b) for b in self.buckets) + ("+Inf",)
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, list(child.counts)):
+                cumulative += count
+                yield "_bucket", key + (bound,), ("le",), cumulative
+            yield "_sum", key, (), child.sum
+            yield "_count", key, (), cumulative
+
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def forget(self, **labels: str) -> None:
+        """Drop the children of every metric matching `labels`, e.g. `library=<id>`."""
+        for metric in self._metrics.values():
+            metric.remove_matching(**labels)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "vectordb_http_requests_total", "HTTP requests served, by route template and status.",
+    ("method", "route", "status"),
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "vectordb_http_request_duration_seconds", "HTTP request latency, by route template.",
+    ("method", "route"),
+))
+INDEX_SEARCH_SECONDS = REGISTRY.register(Histogram(
+    "vectordb_index_search_duration_seconds",
+    "Time spent searching a library's index and delta buffer, per search call.",
+    ("library", "index", "operation"),
+))
+INDEX_BUILD_SECONDS = REGISTRY.register(Histogram(
+    "vectordb_index_build_duration_seconds", "Time spent building a library's index.",
+    ("library", "index"),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+))
+SNAPSHOT_SECONDS = REGISTRY.register(Histogram(
+    "vectordb_snapshot_duration_seconds", "Time taken to write a snapshot of the store to disk.",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+))
+SNAPSHOT_BYTES = REGISTRY.register(Counter(
+    "vectordb_snapshot_bytes_written_total",
+    "Bytes written by snapshots: the pickled libraries, and index arrays that changed since the last snapshot.",
+    ("part",),
+))
+LIBRARY_CHUNKS = REGISTRY.register(Gauge(
+    "vectordb_library_chunks", "Live chunks per library.", ("library",),
+))
+EXECUTOR_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "vectordb_executor_queue_depth",
+    "Work queued and not yet started: index rebuilds waiting for a worker, and searches waiting in the micro-batcher.",
+    ("executor",),
+))
+LOCK_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "vectordb_lock_wait_seconds", "Time spent waiting to acquire a named ReadWriteLock.", ("lock", "mode"),
+))
+LOCK_HOLD_SECONDS = REGISTRY.register(Histogram(
+    "vectordb_lock_hold_seconds", "Time a named ReadWriteLock was held, per acquisition.", ("lock", "mode"),
+))
+LOCK_READERS = REGISTRY.register(Gauge(
+    "vectordb_lock_readers", "Readers currently holding a named ReadWriteLock.", ("lock",),
+))
+LOCK_WRITERS_WAITING = REGISTRY.register(Gauge(
+    "vectordb_lock_writers_waiting", "Writers currently waiting for a named ReadWriteLock.", ("lock",),
+))
@@ -1,41 +1,174 @@
+import asyncio
 import threading
+import time
+import weakref
 from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from app.utils import metrics, tracing
+
+# every named lock that is still alive, for the lock gauges and `/debug/locks`
+_NAMED_LOCKS: "weakref.WeakSet[ReadWriteLock]" = weakref.WeakSet()
+
+
+def _owner() -> str:
+    """Who is acquiring: the thread, and the asyncio task when called from one."""
+    thread = threading.current_thread().name
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return f"{thread}/{task.get_name()}" if task is not None else thread
+
+
+class _Entry:
+    """A holder or waiter of the lock, for reporting."""
+    __slots__ = ("mode", "owner", "ident", "since")
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        self.owner = _owner()
+        self.ident = threading.get_ident()
+        self.since = time.perf_counter()
+
+    def report(self, now: float) -> Dict[str, Any]:
+        return {"mode": self.mode, "owner": self.owner, "seconds": now - self.since}
+
+
+class _ModeStats:
+    __slots__ = ("acquisitions", "wait_seconds", "max_wait_seconds", "hold_seconds", "max_hold_seconds")
+
+    def __init__(self) -> None:
+        self.acquisitions = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+
 
 class ReadWriteLock:
-    def __init__(self):
+    """
+    Many readers or one writer, with waiting writers taking priority over new readers.
+
+    The lock also keeps contention statistics: how long acquisitions waited and how long
+    the lock was held, per mode, plus who holds it and who is waiting right now. Named
+    locks (`ReadWriteLock("library:<id>")`) additionally report wait and hold times to
+    the `/metrics` histograms and appear in `/debug/locks`.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
         self._read_ready = threading.Condition(threading.Lock())
         self._readers = 0
         self._writer = False
-        self._writer_waiting = False
+        self._writers_waiting = 0
+        self._holders: List[_Entry] = []
+        self._waiters: List[_Entry] = []
+        self._stats = {"read": _ModeStats(), "write": _ModeStats()}
+        self._metrics = None
+        if name is not None:
+            _NAMED_LOCKS.add(self)
+            self._metrics = {
+                mode: (metrics.LOCK_WAIT_SECONDS.labels(name, mode), metrics.LOCK_HOLD_SECONDS.labels(name, mode))
+                for mode in ("read", "write")
+            }
+
+    def _acquired(self, entry: _Entry) -> None:
+        """Move `entry` from the waiters to the holders; called under the condition."""
+        now = time.perf_counter()
+        wait = now - entry.since
+        self._waiters.remove(entry)
+        entry.since = now
+        self._holders.append(entry)
+        stats = self._stats[entry.mode]
+        stats.acquisitions += 1
+        stats.wait_seconds += wait
+        stats.max_wait_seconds = max(stats.max_wait_seconds, wait)
+        if self._metrics is not None:
+            self._metrics[entry.mode][0].observe(wait)
+        tracing.record("lock", wait)
+
+    def _released(self, mode: str) -> None:
+        """Drop the calling thread's oldest `mode` hold; called under the condition."""
+        ident = threading.get_ident()
+        entry = next((e for e in self._holders if e.mode == mode and e.ident == ident), None)
+        if entry is None:
+            # released from another thread than the one that acquired it
+            entry = next((e for e in self._holders if e.mode == mode), None)
+            if entry is None:
+                return
+        self._holders.remove(entry)
+        held = time.perf_counter() - entry.since
+        stats = self._stats[mode]
+        stats.hold_seconds += held
+        stats.max_hold_seconds = max(stats.max_hold_seconds, held)
+        if self._metrics is not None:
+            self._metrics[mode][1].observe(held)
 
     def acquire_read(self):
+        entry = _Entry("read")
         with self._read_ready:
+            self._waiters.append(entry)
             # if a writer is active or waiting, let it go first
-            while self._writer or self._writer_waiting:
+            while self._writer or self._writers_waiting:
                 self._read_ready.wait()
             # increment number of readers
             self._readers += 1
+            self._acquired(entry)
 
     def release_read(self):
         with self._read_ready:
             self._readers -= 1
+            self._released("read")
             if self._readers == 0:
                 # if no readers are left, notify anyone waiting for a write lock
                 self._read_ready.notify_all()
 
     def acquire_write(self):
+        entry = _Entry("write")
         with self._read_ready:
-            self._writer_waiting = True
+            self._waiters.append(entry)
+            self._writers_waiting += 1
             while self._readers > 0 or self._writer:
                 self._read_ready.wait()
-            self._writer_waiting = False
+            self._writers_waiting -= 1
             self._writer = True
+            self._acquired(entry)
 
     def release_write(self):
         with self._read_ready:
             self._writer = False
+            self._released("write")
             self._read_ready.notify_all()  # Wake up both readers and writers
 
+    @property
+    def readers(self) -> int:
+        """Readers currently holding the lock."""
+        return self._readers
+
+    @property
+    def writers_waiting(self) -> int:
+        """Writers currently blocked in `acquire_write`."""
+        return self._writers_waiting
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Current holders and waiters (longest first, with how long they have held or waited,
+        in seconds) and cumulative wait/hold statistics per mode.
+        """
+        with self._read_ready:
+            now = time.perf_counter()
+            return {
+                "name": self.name,
+                "readers": self._readers,
+                "writer": self._writer,
+                "writers_waiting": self._writers_waiting,
+                "holders": [e.report(now) for e in sorted(self._holders, key=lambda e: e.since)],
+                "waiters": [e.report(now) for e in sorted(self._waiters, key=lambda e: e.since)],
+                "stats": {mode: {name: getattr(s, name) for name in _ModeStats.__slots__}
+                          for mode, s in self._stats.items()},
+            }
+
     @contextmanager
     def read_lock(self):
         """Context manager for read operations. Usage: with lock.read_lock(): ..."""
@@ -53,3 +186,14 @@ class ReadWriteLock:
             yield
         finally:
             self.release_write()
+
+
+def named_locks() -> List[ReadWriteLock]:
+    """Every live named lock, sorted by name."""
+    return sorted(list(_NAMED_LOCKS), key=lambda lock: lock.name)
+
+
+metrics.LOCK_READERS.set_function(lambda: {(lock.name,): lock.readers for lock in list(_NAMED_LOCKS)})
+metrics.LOCK_WRITERS_WAITING.set_function(
+    lambda: {(lock.name,): lock.writers_waiting for lock in list(_NAMED_LOCKS)}
+)
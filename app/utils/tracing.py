@@ -0,0 +1,87 @@
+"""
+Lightweight per-request tracing.
+
+`TracingMiddleware` starts a `Trace` for every HTTP request and keeps it in a context
+variable; code anywhere below it (router, service, store, locks) records named spans with
+`span("search")` or `record("lock", seconds)`. Outside a request, or on a thread the
+request context was not copied to, both are no-ops. Spans are emitted as a `Server-Timing`
+response header and, for a sample of requests, as one JSON line in a trace log.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+class Trace:
+    """Spans recorded during one request, as (name, start offset, duration) in seconds."""
+
+    __slots__ = ("start", "spans", "endpoint")
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.endpoint: Optional[Tuple[float, float]] = None  # when the endpoint function ran
+
+    def add(self, name: str, start: float, duration: float) -> None:
+        self.spans.append((name, start - self.start, duration))
+
+    def totals(self) -> Dict[str, float]:
+        """Total seconds per span name, in the order the names first started."""
+        totals: Dict[str, float] = {}
+        for name, _, duration in sorted(self.spans, key=lambda s: s[1]):
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+    def server_timing(self, total: float) -> str:
+        """The `Server-Timing` header value, durations in milliseconds."""
+        entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.totals().items()]
+        entries.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spans": [
+                {"name": name, "start_ms": offset * 1000, "duration_ms": duration * 1000}
+                for name, offset, duration in self.spans
+            ],
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def start_trace() -> Tuple[Trace, Any]:
+    """Make a new trace current; returns it and the token to pass to `end_trace`."""
+    trace = Trace()
+    return trace, _current.set(trace)
+
+
+def end_trace(token: Any) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Record the `with` block as a span of the current trace, if there is one."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter() - start)
+
+
+def record(name: str, seconds: float) -> None:
+    """Record a span that just ended and lasted `seconds`, e.g. a measured lock wait."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - seconds, seconds)
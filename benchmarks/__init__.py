@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the vector store, runnable with `python -m benchmarks`.
+
+Everything runs on synthetic unit-norm data (see `datasets.synthetic_dataset`) and
+reports machine-readable JSON, so results can be diffed across commits and hosts.
+"""
@@ -0,0 +1,104 @@
+"""
+Command-line entry point: `python -m benchmarks <command> [options]`.
+
+    python -m benchmarks indexes --n 50000 --d 384 --output results.json
+    python -m benchmarks recall --n 50000 --d 384 --index BallTreeIndex
+    python -m benchmarks load --concurrency 32 --duration 30 --mix search=80,upsert=20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+from . import indexes, load, recall
+
+
+def _add_dataset_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--n", type=int, default=10_000, help="number of vectors (default: 10000)")
+    parser.add_argument("--d", type=int, default=256, help="vector dimension (default: 256)")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries (default: 200)")
+    parser.add_argument("--clusters", type=int, default=32,
+                        help="number of topic clusters; 0 for uniform random vectors (default: 32)")
+    parser.add_argument("--spread", type=float, default=0.5, help="cluster standard deviation (default: 0.5)")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+
+
+def _write_report(report: Dict[str, Any], output: str | None) -> None:
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"wrote {output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("indexes", help="build time, search QPS/latency and peak memory per index")
+    _add_dataset_args(bench)
+    bench.add_argument("--index", action="append", dest="indexes", choices=list(indexes.INDEX_FACTORIES),
+                       help="index to benchmark; repeat for several (default: all)")
+    bench.add_argument("--batch-size", type=int, default=64, help="queries per search_batch call (default: 64)")
+    bench.add_argument("--no-memory", action="store_true", help="skip the traced build that measures peak memory")
+    bench.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    sweep = commands.add_parser("recall", help="recall@k vs. latency of approximate modes, with the Pareto front")
+    _add_dataset_args(sweep)
+    sweep.add_argument("--index", action="append", dest="indexes", choices=list(indexes.INDEX_FACTORIES),
+                       help="index to sweep; repeat for several (default: every index in recall.SWEEPS)")
+    sweep.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    http = commands.add_parser("load", help="HTTP load against the API, in-process or against --url")
+    http.add_argument("--url", help="base URL of a running server (default: run the app in-process)")
+    http.add_argument("--libraries", type=int, default=4, help="libraries to create up front (default: 4)")
+    http.add_argument("--seed-chunks", type=int, default=1000, help="chunks to fill each library with (default: 1000)")
+    http.add_argument("--dim", type=int, default=1536, help="embedding dimension of the libraries (default: 1536)")
+    http.add_argument("--index-name", default="auto", help="index type of the libraries (default: auto)")
+    http.add_argument("--concurrency", type=int, default=16, help="requests in flight (default: 16)")
+    http.add_argument("--requests", type=int, default=2000, help="operations to issue (default: 2000)")
+    http.add_argument("--duration", type=float, help="stop after this many seconds instead")
+    http.add_argument("--mix", default=",".join(f"{name}={weight:g}" for name, weight in load.DEFAULT_MIX.items()),
+                      help="endpoint weights, e.g. search=80,upsert=20 (default: %(default)s)")
+    http.add_argument("--batch-size", type=int, default=16, help="chunks per upsert (default: 16)")
+    http.add_argument("--k", type=int, default=10, help="neighbours per search (default: 10)")
+    http.add_argument("--replay", help="replay the operations recorded in this JSON-lines file")
+    http.add_argument("--record", help="save the generated operations to this JSON-lines file")
+    http.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    http.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    args = parser.parse_args(argv)
+    if args.command == "indexes":
+        report = indexes.run(
+            n=args.n, d=args.d, n_queries=args.queries, clusters=args.clusters, spread=args.spread,
+            k=args.k, batch_size=args.batch_size, indexes=args.indexes,
+            measure_memory=not args.no_memory, seed=args.seed,
+        )
+        _write_report(report, args.output)
+    elif args.command == "recall":
+        report = recall.run(
+            n=args.n, d=args.d, n_queries=args.queries, clusters=args.clusters, spread=args.spread,
+            k=args.k, indexes=args.indexes, seed=args.seed,
+        )
+        print("Pareto front (recall vs. QPS):\n" + recall.format_table(report["pareto"]), file=sys.stderr)
+        _write_report(report, args.output)
+    elif args.command == "load":
+        report = load.run(
+            url=args.url, libraries=args.libraries, seed_chunks=args.seed_chunks, dim=args.dim,
+            index_name=args.index_name, concurrency=args.concurrency,
+            requests=None if args.duration else args.requests, duration=args.duration,
+            mix=load.parse_mix(args.mix), batch_size=args.batch_size, k=args.k,
+            replay=args.replay, record=args.record, seed=args.seed,
+        )
+        _write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Synthetic embedding datasets for the benchmarks.
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+
+def _normalize(points: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(points, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (points / norms).astype(np.float32, copy=False)
+
+
+def synthetic_dataset(
+    n: int,
+    d: int,
+    n_queries: int = 100,
+    clusters: int = 32,
+    spread: float = 0.5,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `n` unit-norm `d`-dimensional vectors and `n_queries` queries drawn from the same
+    distribution, both float32.
+
+    With `clusters > 0` the points are Gaussian blobs of standard deviation `spread`
+    around that many random topic centers, which is roughly how real embeddings look and
+    what lets tree indexes prune. `clusters=0` draws uniformly from the sphere, the worst
+    case for any index.
+    """
+    rng = np.random.default_rng(seed)
+
+    def draw(count: int) -> np.ndarray:
+        if clusters <= 0:
+            return _normalize(rng.standard_normal((count, d), dtype=np.float32))
+        picks = rng.integers(0, clusters, count)
+        noise = rng.standard_normal((count, d), dtype=np.float32)
+        return _normalize(centers[picks] + spread * noise)
+
+    centers = rng.standard_normal((max(clusters, 0), d), dtype=np.float32)
+    return draw(n), draw(n_queries)
@@ -0,0 +1,129 @@
+"""
+Build and search benchmarks for every `BaseIndex` implementation.
+"""
+from __future__ import annotations
+
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+from app.indexes.AutoIndex import AutoIndex, calibrate_threshold
+from app.indexes.BallTreeIndex import BallTreeIndex
+from app.indexes.BaseIndex import BaseIndex
+from app.indexes.BruteForceIndex import BruteForceIndex
+from app.indexes.MatryoshkaIndex import MatryoshkaIndex
+from app.indexes.RerankingIndex import RerankingIndex
+
+from .datasets import synthetic_dataset
+from .stats import environment, latency_summary
+
+# index configurations to benchmark, by name; each factory gets the vector dimension
+INDEX_FACTORIES: Dict[str, Callable[[int], BaseIndex]] = {
+    "BruteForceIndex": lambda d: BruteForceIndex(),
+    "BruteForceIndex[float16]": lambda d: BruteForceIndex(dtype="float16"),
+    "BallTreeIndex": lambda d: BallTreeIndex(),
+    "AutoIndex": lambda d: AutoIndex(),
+    "RerankingIndex(BallTreeIndex)": lambda d: RerankingIndex(BallTreeIndex()),
+    "RerankingIndex(MatryoshkaIndex)": lambda d: RerankingIndex(MatryoshkaIndex(dim=max(1, d // 4))),
+}
+
+
+def _peak_build_bytes(factory: Callable[[int], BaseIndex], vectors: np.ndarray, ids: np.ndarray) -> int:
+    """Peak memory allocated while building a fresh index, measured with tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        factory(vectors.shape[1]).build(vectors, ids)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_index(
+    factory: Callable[[int], BaseIndex],
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    batch_size: int = 64,
+    measure_memory: bool = True,
+) -> Dict[str, Any]:
+    """
+    Build an index over `vectors` and time it: build seconds, single-query latency
+    percentiles and QPS, batched QPS (`search_batch` over `batch_size` queries at a
+    time) and, with `measure_memory`, the peak bytes allocated by a second, traced build.
+    Timings are taken without tracemalloc running, since tracing slows allocations down.
+    """
+    ids = np.arange(len(vectors), dtype=np.int32)
+    # rows are positions in `vectors`; lets reranking indexes rescore without a copy
+    row_vectors = vectors.__getitem__
+    index = factory(vectors.shape[1])
+    start = time.perf_counter()
+    index.build(vectors, ids)
+    build_seconds = time.perf_counter() - start
+
+    index.search(queries[0], k, row_vectors=row_vectors)  # warm-up
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, k, row_vectors=row_vectors)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for lo in range(0, len(queries), batch_size):
+        index.search_batch(queries[lo:lo + batch_size], k, row_vectors=row_vectors)
+    batch_seconds = time.perf_counter() - start
+
+    result: Dict[str, Any] = {
+        "index": index.describe(),
+        "build_seconds": build_seconds,
+        "search": {"qps": len(queries) / (sum(latencies) or float("inf")), **latency_summary(latencies)},
+        "batch_search": {"batch_size": batch_size, "qps": len(queries) / (batch_seconds or float("inf"))},
+    }
+    if measure_memory:
+        del index
+        result["build_peak_bytes"] = _peak_build_bytes(factory, vectors, ids)
+    return result
+
+
+def run(
+    n: int = 10_000,
+    d: int = 256,
+    n_queries: int = 200,
+    clusters: int = 32,
+    spread: float = 0.5,
+    k: int = 10,
+    batch_size: int = 64,
+    indexes: Iterable[str] | None = None,
+    measure_memory: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Benchmark the named indexes (default: all of `INDEX_FACTORIES`) on one synthetic
+    dataset and return a JSON-serialisable report.
+    """
+    names = list(indexes) if indexes else list(INDEX_FACTORIES)
+    unknown = [name for name in names if name not in INDEX_FACTORIES]
+    if unknown:
+        raise ValueError(f"Unknown index {unknown[0]!r}; choose from {', '.join(INDEX_FACTORIES)}")
+    vectors, queries = synthetic_dataset(n, d, n_queries, clusters=clusters, spread=spread, seed=seed)
+    # AutoIndex calibrates once per dimension per process; keep that out of its build time
+    if "AutoIndex" in names:
+        calibrate_threshold(d)
+    results: List[Dict[str, Any]] = []
+    for name in names:
+        print(f"benchmarking {name} on n={n} d={d}", file=sys.stderr)
+        results.append({"name": name, **bench_index(
+            INDEX_FACTORIES[name], vectors, queries, k=k, batch_size=batch_size, measure_memory=measure_memory
+        )})
+    return {
+        "config": {
+            "n": n, "d": d, "queries": n_queries, "clusters": clusters, "spread": spread,
+            "k": k, "batch_size": batch_size, "seed": seed,
+        },
+        "environment": environment(),
+        "results": results,
+    }
@@ -0,0 +1,294 @@
+"""
+End-to-end HTTP load generator for the REST API.
+
+Drives the FastAPI app either in-process (through httpx's ASGI transport, so no server
+is needed) or against a running server, with a weighted mix of operations at a fixed
+concurrency, and reports throughput, latency percentiles and error rates per endpoint.
+
+Workloads can be recorded to, and replayed from, JSON lines; one operation per line:
+
+    {"endpoint": "search", "method": "POST", "path": "/library/{lib_id}/search?k=10",
+     "json": {"query": [...]}, "library": 2}
+
+`{lib_id}` in a path is filled in with the id of setup library number `library`
+(modulo the number of libraries), so recordings replay against a fresh store.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, TextIO
+
+import httpx
+import numpy as np
+
+from .stats import environment, latency_summary
+
+# endpoint name -> (method, path template)
+ENDPOINTS: Dict[str, tuple[str, str]] = {
+    "create": ("POST", "/library/"),
+    "upsert": ("PUT", "/library/{lib_id}/chunks"),
+    "search": ("POST", "/library/{lib_id}/search?k={k}"),
+    "delete": ("POST", "/library/{lib_id}/chunks/delete"),
+    "count": ("GET", "/library/{lib_id}/count"),
+}
+
+DEFAULT_MIX: Dict[str, float] = {"search": 70, "upsert": 20, "count": 5, "delete": 4, "create": 1}
+
+
+@dataclass
+class Op:
+    """One HTTP request of a workload."""
+    endpoint: str
+    method: str
+    path: str
+    json: Any = None
+    library: int = 0
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, seconds: float, status: int | None) -> None:
+        self.latencies.append(seconds)
+        key = str(status) if status is not None else "exception"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        count = len(self.latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "rps": count / elapsed if elapsed else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+            **latency_summary(self.latencies),
+        }
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse `"search=70,upsert=20,count=10"` into endpoint weights."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The operation mix needs at least one positive weight")
+    return mix
+
+
+class Workload:
+    """
+    Generates random operations in the proportions of `mix` over `n_libraries` libraries
+    of `dim`-dimensional embeddings. Every upsert tags its chunks with a batch number,
+    and deletes remove one earlier batch by filter, so the library sizes stay bounded.
+    """
+
+    def __init__(
+        self,
+        mix: Dict[str, float],
+        n_libraries: int,
+        dim: int,
+        batch_size: int = 16,
+        k: int = 10,
+        index_name: str = "auto",
+        seed: int = 0,
+    ) -> None:
+        self.names = list(mix)
+        weights = np.array([mix[name] for name in self.names], dtype=np.float64)
+        self.probabilities = weights / weights.sum()
+        self.n_libraries, self.dim, self.batch_size, self.k = n_libraries, dim, batch_size, k
+        self.index_name = index_name
+        self.rng = np.random.default_rng(seed)
+        self._batches = 0
+        self._created = 0
+
+    def _vectors(self, count: int) -> List[List[float]]:
+        v = self.rng.standard_normal((count, self.dim)).astype(np.float32)
+        v /= np.linalg.norm(v, axis=1, keepdims=True)
+        return v.astype(np.float64).round(6).tolist()
+
+    def upsert(self, library: int, count: int) -> Op:
+        self._batches += 1
+        chunks = [{"embedding": vec, "metadata": {"batch": self._batches}} for vec in self._vectors(count)]
+        method, path = ENDPOINTS["upsert"]
+        return Op("upsert", method, path, {"chunks": chunks}, library)
+
+    def next_op(self) -> Op:
+        name = self.names[self.rng.choice(len(self.names), p=self.probabilities)]
+        library = int(self.rng.integers(self.n_libraries))
+        method, path = ENDPOINTS[name]
+        if name == "upsert":
+            return self.upsert(library, self.batch_size)
+        if name == "search":
+            return Op(name, method, path.replace("{k}", str(self.k)), {"query": self._vectors(1)[0]}, library)
+        if name == "delete":
+            batch = int(self.rng.integers(1, self._batches + 1)) if self._batches else 0
+            return Op(name, method, path, {"filters": {"batch": {"eq": batch}}}, library)
+        if name == "create":
+            self._created += 1
+            body = {"name": f"load-{self._created}", "dimension": self.dim, "index_name": self.index_name}
+            return Op(name, method, path, body, library)
+        return Op(name, method, path, None, library)
+
+    def ops(self, requests: int | None = None, duration: float | None = None) -> Iterator[Op]:
+        """Up to `requests` operations, or as many as are asked for within `duration` seconds."""
+        deadline = time.perf_counter() + duration if duration else None
+        issued = 0
+        while (requests is None or issued < requests) and (deadline is None or time.perf_counter() < deadline):
+            issued += 1
+            yield self.next_op()
+
+
+def read_ops(path: str) -> List[Op]:
+    """Load a recorded workload (see the module docstring)."""
+    with open(path) as f:
+        return [Op(**json.loads(line)) for line in f if line.strip()]
+
+
+def recorded(ops: Iterable[Op], f: TextIO) -> Iterator[Op]:
+    """Pass `ops` through, writing each one to the open recording `f` as it is issued."""
+    for op in ops:
+        f.write(json.dumps(asdict(op)) + "\n")
+        yield op
+
+
+@contextlib.asynccontextmanager
+async def open_client(url: str | None = None) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    An HTTP client for the server at `url`, or, without one, for the app itself running
+    in this process. In-process runs snapshot to a temporary directory unless
+    `SNAPSHOT_PATH` is set, so they never touch a real store.
+    """
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=60.0) as client:
+            yield client
+        return
+    from app.services.VectorStore import VectorStore
+    with tempfile.TemporaryDirectory() as tmp:
+        if VectorStore._instance is None and not os.getenv("SNAPSHOT_PATH"):
+            VectorStore.SNAPSHOT_PATH = os.path.join(tmp, "vectorstore_snapshot.pkl")
+        from app.main import app
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=60.0) as client:
+            yield client
+
+
+async def setup_libraries(
+    client: httpx.AsyncClient, workload: Workload, seed_chunks: int
+) -> List[str]:
+    """Create the workload's libraries and fill each with `seed_chunks` chunks; not measured."""
+    library_ids = []
+    for i in range(workload.n_libraries):
+        resp = await client.post("/library/", json={
+            "name": f"load-{i}", "dimension": workload.dim, "index_name": workload.index_name,
+        })
+        resp.raise_for_status()
+        library_ids.append(resp.json()["id"])
+        for lo in range(0, seed_chunks, 256):
+            op = workload.upsert(i, min(256, seed_chunks - lo))
+            resp = await client.put(op.path.format(lib_id=library_ids[-1]), json=op.json)
+            resp.raise_for_status()
+    return library_ids
+
+
+async def drive(
+    client: httpx.AsyncClient, ops: Iterable[Op], library_ids: List[str], concurrency: int
+) -> Dict[str, Any]:
+    """Issue `ops` with `concurrency` requests in flight and summarize them per endpoint."""
+    stats: Dict[str, EndpointStats] = {}
+    it = iter(ops)
+
+    async def worker() -> None:
+        for op in it:
+            path = op.path.format(lib_id=library_ids[op.library % len(library_ids)]) if library_ids else op.path
+            start = time.perf_counter()
+            try:
+                resp = await client.request(op.method, path, json=op.json)
+                status: int | None = resp.status_code
+            except httpx.HTTPError:
+                status = None
+            stats.setdefault(op.endpoint, EndpointStats()).record(time.perf_counter() - start, status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    total = EndpointStats()
+    for endpoint_stats in stats.values():
+        total.latencies.extend(endpoint_stats.latencies)
+        total.errors += endpoint_stats.errors
+        for status, count in endpoint_stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+    return {
+        "duration_seconds": elapsed,
+        "total": total.summary(elapsed),
+        "endpoints": {name: stats[name].summary(elapsed) for name in sorted(stats)},
+    }
+
+
+async def run_async(
+    url: str | None = None,
+    libraries: int = 4,
+    seed_chunks: int = 1000,
+    dim: int = 1536,
+    index_name: str = "auto",
+    concurrency: int = 16,
+    requests: int | None = 2000,
+    duration: float | None = None,
+    mix: Dict[str, float] | None = None,
+    batch_size: int = 16,
+    k: int = 10,
+    replay: str | None = None,
+    record: str | None = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Set up `libraries` libraries of `seed_chunks` chunks each, then drive either the
+    recorded workload in `replay` or a generated one (`mix`, bounded by `requests` and/or
+    `duration`), and return a JSON-serialisable report. With `record`, the generated
+    operations are saved there as they are issued, so the exact same run can be replayed
+    later.
+    """
+    workload = Workload(mix or DEFAULT_MIX, libraries, dim, batch_size=batch_size, k=k,
+                        index_name=index_name, seed=seed)
+    async with open_client(url) as client:
+        print(f"setting up {libraries} libraries of {seed_chunks} chunks", file=sys.stderr)
+        library_ids = await setup_libraries(client, workload, seed_chunks)
+        with contextlib.ExitStack() as files:
+            if replay:
+                ops: Iterable[Op] = read_ops(replay)
+            else:
+                ops = workload.ops(requests=requests, duration=duration)
+                if record:
+                    ops = recorded(ops, files.enter_context(open(record, "w")))
+            print(f"driving load at concurrency {concurrency}", file=sys.stderr)
+            results = await drive(client, ops, library_ids, concurrency)
+    return {
+        "config": {
+            "target": url or "in-process", "libraries": libraries, "seed_chunks": seed_chunks, "dim": dim,
+            "index_name": index_name, "concurrency": concurrency, "requests": requests, "duration": duration,
+            "mix": None if replay else (mix or DEFAULT_MIX), "batch_size": batch_size, "k": k,
+            "replay": replay, "seed": seed,
+        },
+        "environment": environment(),
+        **results,
+    }
+
+
+def run(**kwargs: Any) -> Dict[str, Any]:
+    """Synchronous wrapper around `run_async`."""
+    return asyncio.run(run_async(**kwargs))
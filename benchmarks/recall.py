@@ -0,0 +1,131 @@
+"""
+Recall-vs-latency evaluation of approximate search modes against exact ground truth.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from app.indexes.BruteForceIndex import BruteForceIndex
+
+from .datasets import synthetic_dataset
+from .indexes import INDEX_FACTORIES
+from .stats import environment, latency_summary
+
+# search parameters to sweep per index configuration (names from `INDEX_FACTORIES`);
+# `{}` is each index's default operating point
+SWEEPS: Dict[str, List[Dict[str, Any]]] = {
+    "BruteForceIndex": [{}],  # the exact baseline every approximate point has to beat
+    "BallTreeIndex": (
+        [{}]
+        + [{"max_leaves": leaves} for leaves in (1, 2, 4, 8, 16, 32, 64)]
+        + [{"slack": slack} for slack in (0.1, 0.25, 0.5, 1.0)]
+    ),
+    "BruteForceIndex[float16]": [{}],
+    "RerankingIndex(BallTreeIndex)": [
+        {"max_leaves": leaves, "oversample": oversample}
+        for leaves in (2, 8, 32) for oversample in (1, 4)
+    ],
+    "RerankingIndex(MatryoshkaIndex)": [{"oversample": oversample} for oversample in (1, 2, 4, 8)],
+}
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Ground truth: the exact top-k rows of every query, from a brute-force scan."""
+    exact = BruteForceIndex()
+    exact.build(vectors, np.arange(len(vectors), dtype=np.int32))
+    return [{row for row, _ in hits} for hits in exact.search_batch(queries, k)]
+
+
+def recall_at_k(hits: List[List[tuple]], truth: List[set], k: int) -> float:
+    """Mean fraction of each query's exact top-k found among its returned hits."""
+    found = [len(truth_rows & {row for row, _ in query_hits[:k]}) for query_hits, truth_rows in zip(hits, truth)]
+    return float(np.mean(found)) / k if found else 0.0
+
+
+def pareto_front(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The operating points no other point beats on both recall and QPS, fastest first.
+    """
+    front: List[Dict[str, Any]] = []
+    best_recall = -1.0
+    for point in sorted(points, key=lambda p: (-p["qps"], -p["recall"])):
+        if point["recall"] > best_recall:
+            front.append(point)
+            best_recall = point["recall"]
+    return front
+
+
+def format_table(points: List[Dict[str, Any]]) -> str:
+    """Fixed-width text table of operating points."""
+    lines = [f"{'index':<34} {'params':<36} {'recall':>7} {'qps':>10} {'p50 ms':>8} {'p99 ms':>8}"]
+    for p in points:
+        params = ", ".join(f"{key}={value}" for key, value in p["params"].items()) or "default"
+        lines.append(
+            f"{p['name']:<34} {params:<36} {p['recall']:>7.3f} {p['qps']:>10.1f} {p['p50_ms']:>8.3f} {p['p99_ms']:>8.3f}"
+        )
+    return "\n".join(lines)
+
+
+def sweep_index(
+    name: str, vectors: np.ndarray, queries: np.ndarray, truth: List[set], k: int
+) -> List[Dict[str, Any]]:
+    """Build the named index once and measure recall@k and latency at every point of its sweep."""
+    index = INDEX_FACTORIES[name](vectors.shape[1])
+    index.build(vectors, np.arange(len(vectors), dtype=np.int32))
+    points = []
+    for params in SWEEPS.get(name, [{}]):
+        search_params = {**params, "row_vectors": vectors.__getitem__}
+        index.search(queries[0], k, **search_params)  # warm-up
+        hits, latencies = [], []
+        for q in queries:
+            start = time.perf_counter()
+            hits.append(index.search(q, k, **search_params))
+            latencies.append(time.perf_counter() - start)
+        points.append({
+            "name": name,
+            "index": index.describe(),
+            "params": params,
+            "recall": recall_at_k(hits, truth, k),
+            "qps": len(queries) / (sum(latencies) or float("inf")),
+            **latency_summary(latencies),
+        })
+    return points
+
+
+def run(
+    n: int = 10_000,
+    d: int = 256,
+    n_queries: int = 200,
+    clusters: int = 32,
+    spread: float = 0.5,
+    k: int = 10,
+    indexes: Iterable[str] | None = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Sweep the named indexes (default: every index in `SWEEPS`) on one synthetic dataset
+    and return a JSON-serialisable report with every operating point and the recall/QPS
+    Pareto front across all of them.
+    """
+    names = list(indexes) if indexes else list(SWEEPS)
+    unknown = [name for name in names if name not in INDEX_FACTORIES]
+    if unknown:
+        raise ValueError(f"Unknown index {unknown[0]!r}; choose from {', '.join(INDEX_FACTORIES)}")
+    vectors, queries = synthetic_dataset(n, d, n_queries, clusters=clusters, spread=spread, seed=seed)
+    truth = exact_top_k(vectors, queries, k)
+    points: List[Dict[str, Any]] = []
+    for name in names:
+        print(f"sweeping {name} on n={n} d={d}", file=sys.stderr)
+        points.extend(sweep_index(name, vectors, queries, truth, k))
+    return {
+        "config": {
+            "n": n, "d": d, "queries": n_queries, "clusters": clusters, "spread": spread, "k": k, "seed": seed,
+        },
+        "environment": environment(),
+        "results": points,
+        "pareto": pareto_front(points),
+    }
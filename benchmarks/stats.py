@@ -0,0 +1,31 @@
+"""
+Shared measurement helpers: latency percentiles and a description of the host.
+"""
+from __future__ import annotations
+
+import os
+import platform
+import sys
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """Mean and p50/p95/p99 of per-operation latencies, in milliseconds."""
+    if not len(seconds):
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"mean_ms": float(ms.mean()), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def environment() -> Dict[str, Any]:
+    """What the numbers were measured on, so results from different hosts can be told apart."""
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
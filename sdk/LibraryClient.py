@@ -1,3 +1,4 @@
+import json
 import httpx
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -32,12 +33,15 @@ class LibraryClient:
         resp.raise_for_status()
         return resp.json()
 
-    async def create_library(self, name: str, metadata: Optional[Dict[str, Any]] = None, index_name: Optional[str] = None) -> Dict[str, Any]:
+    async def create_library(self, name: str, metadata: Optional[Dict[str, Any]] = None, index_name: Optional[str] = None, matryoshka_dim: Optional[int] = None, dtype: Optional[str] = None, dimension: Optional[int] = None) -> Dict[str, Any]:
         """
         Create a new library.
         :param name: Name of the library
         :param metadata: Optional metadata dict
         :param index_name: Optional index name (e.g., 'BruteForceIndex', 'BallTreeIndex')
+        :param matryoshka_dim: Optional number of leading dimensions to search first, rescoring on the full embedding
+        :param dtype: Optional storage precision for embeddings ('float32' or 'float16')
+        :param dimension: Optional embedding length for this library (defaults to 1536 on the server)
         :return: Created library info
         """
         data: Dict[str, Any] = {"name": name}
@@ -45,6 +49,12 @@ class LibraryClient:
             data["metadata"] = metadata
         if index_name:
             data["index_name"] = index_name
+        if matryoshka_dim:
+            data["matryoshka_dim"] = matryoshka_dim
+        if dtype:
+            data["dtype"] = dtype
+        if dimension:
+            data["dimension"] = dimension
         print(data, "data")
         resp = await self._client.post(f"{self.base_url}/library/", json=data)
         resp.raise_for_status()
@@ -93,22 +103,80 @@ class LibraryClient:
         resp.raise_for_status()
         return resp.json().get("count", 0)
 
-    async def search(self, library_id: str, query_vector: List[float], k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+    async def search(self, library_id: str, query_vector: List[float], k: int = 5, filters: Optional[Dict[str, Any]] = None, **search_params: Any) -> List[Tuple[str, float]]:
         """
         Search the vector index for the top-k most similar chunks, with optional filters.
         :param library_id: Library UUID
         :param query_vector: List of floats (embedding)
         :param k: Number of results to return
         :param filters: Optional filters dict
+        :param search_params: Optional approximate-search knobs (`max_leaves`, `max_distance_evals`, `slack`, `oversample`)
         :return: List of (chunk_id, similarity) tuples
         """
-        data: Dict[str, Any] = {"query": query_vector}
+        data: Dict[str, Any] = {"query": query_vector, **search_params}
         if filters:
             data["filters"] = filters
         resp = await self._client.post(f"{self.base_url}/library/{library_id}/search?k={k}", json=data)
         resp.raise_for_status()
         return resp.json()
 
+    async def explain_search(self, library_id: str, query_vector: List[float], k: int = 5, filters: Optional[Dict[str, Any]] = None, **search_params: Any) -> Dict[str, Any]:
+        """
+        Search with `explain=true`: the results plus execution statistics for the query.
+        :param library_id: Library UUID
+        :param query_vector: List of floats (embedding)
+        :param k: Number of results to return
+        :param filters: Optional filters dict
+        :param search_params: Optional approximate-search knobs (`max_leaves`, `max_distance_evals`, `slack`, `oversample`)
+        :return: {"results": [...], "explain": {...}}
+        """
+        data: Dict[str, Any] = {"query": query_vector, **search_params}
+        if filters:
+            data["filters"] = filters
+        resp = await self._client.post(f"{self.base_url}/library/{library_id}/search?k={k}&explain=true", json=data)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def range_search(self, library_id: str, query_vector: List[float], min_similarity: float, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Find every chunk whose cosine similarity to the query is at least `min_similarity`.
+        :param library_id: Library UUID
+        :param query_vector: List of floats (embedding)
+        :param min_similarity: Similarity threshold, between -1 and 1
+        :param limit: Optional cap on the number of results
+        :param filters: Optional filters dict
+        :return: List of {"chunk", "score"} dicts, best first
+        """
+        data: Dict[str, Any] = {"query": query_vector, "min_similarity": min_similarity}
+        if limit is not None:
+            data["limit"] = limit
+        if filters:
+            data["filters"] = filters
+        results = []
+        async with self._client.stream("POST", f"{self.base_url}/library/{library_id}/range_search", json=data) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line:
+                    results.append(json.loads(line))
+        return results
+
+    async def search_libraries(self, library_ids: List[str], query_vector: List[float], k: int = 5, filters: Optional[Dict[str, Any]] = None, **search_params: Any) -> List[Dict[str, Any]]:
+        """
+        Search several libraries at once and get back one merged top-k.
+        :param library_ids: Library UUIDs to search
+        :param query_vector: List of floats (embedding)
+        :param k: Number of results to return across all libraries
+        :param filters: Optional filters dict, applied in every library
+        :param search_params: Optional approximate-search knobs (`max_leaves`, `max_distance_evals`, `slack`, `oversample`)
+        :return: List of {"library_id", "chunk", "score"} dicts, best first
+        """
+        data: Dict[str, Any] = {"library_ids": library_ids, "query": query_vector, **search_params}
+        if filters:
+            data["filters"] = filters
+        resp = await self._client.post(f"{self.base_url}/search?k={k}", json=data)
+        resp.raise_for_status()
+        return resp.json()
+
     async def library_exists(self, library_id: str) -> bool:
         """
         Check if a library exists by its ID.